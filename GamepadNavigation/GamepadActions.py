@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Actions
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsProject
+
+_3D_SUPPORT = True
+try:
+    from qgis._3d import Qgs3DMapScene
+except:
+    _3D_SUPPORT = False
+
+from GamepadNavigation.GamepadBridge import deviceEntry
+from GamepadNavigation.GamepadGestures import GESTURE_NAMES
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import pyqtSignal, QObject
+
+GESTURE_NAME_SET = frozenset(GESTURE_NAMES)
+
+class GamepadAction:
+
+    action_type = ''
+    details = ''
+
+    def __init__(self, details: str):
+        self.details = details
+
+    def trigger(self, canvas_type: str, canvas_name: str, canvas, fly_to=None):
+        pass
+
+    def description(self):
+        return 'Error: wrong/corrupted action string, please re-assign'
+
+class GamepadBookmarkAction(GamepadAction):
+
+    action_type = 'bookmark'
+    extent = None
+    name = ''
+
+    def __init__(self, details: str, extent=None, name: str = ''):
+        super().__init__(details)
+        self.extent = extent
+        self.name = name
+
+    def trigger(self, canvas_type: str, canvas_name: str, canvas, fly_to=None):
+        if self.extent is None:
+            return
+        if canvas_type == '2d' and fly_to is not None:
+            fly_to(canvas, self.extent)
+        elif canvas_type == '2d':
+            canvas.setExtent(self.extent)
+            canvas.refresh()
+        elif _3D_SUPPORT and canvas_type == '3d':
+            canvas.setViewFrom2DExtent(self.extent)
+
+    def description(self):
+        if self.extent is None:
+            return 'Error: action bookmark missing'
+        return 'Go to bookmark \'{}\''.format(self.name)
+
+class GamepadMapThemeAction(GamepadAction):
+
+    action_type = 'map_theme'
+    available = False
+
+    def __init__(self, details: str, iface, project: QgsProject):
+        super().__init__(details)
+        self.iface = iface
+        self.project = project
+        self.available = project.mapThemeCollection().hasMapTheme(details)
+
+    def trigger(self, canvas_type: str, canvas_name: str, canvas, fly_to=None):
+        if not self.available:
+            return
+        if canvas_type == '2d' and canvas_name != 'theMapCanvas':
+            canvas.setTheme(self.details)
+        elif _3D_SUPPORT and canvas_type == '3d':
+            canvas.mapSettings().setTerrainMapTheme(self.details)
+        else:
+            root = self.project.layerTreeRoot()
+            model = self.iface.layerTreeView().layerTreeModel()
+            self.project.mapThemeCollection().applyTheme(self.details, root, model)
+
+    def description(self):
+        return 'Set map theme to \'{}\''.format(self.details)
+
+class GamepadActionTable(QObject):
+    """
+    Compiled gesture to action dispatch table, built when a project is loaded
+    and kept in sync with mapping entries, bookmarks and map themes.
+    """
+
+    # emitted when gestures got mapped or unmapped
+    mappingChanged = pyqtSignal()
+
+    iface = None
+    project = None
+
+    def __init__(self, iface, slot: int = 0, parent: QObject = None):
+        super(GamepadActionTable, self).__init__(parent)
+        self.iface = iface
+        self.slot = slot
+        self.project = QgsProject.instance()
+        self._actions = {}
+
+        self._bookmark_managers = [self.project.bookmarkManager(), QgsApplication.instance().bookmarkManager()]
+        for manager in self._bookmark_managers:
+            manager.bookmarkAdded.connect(self.updateBookmark)
+            manager.bookmarkChanged.connect(self.updateBookmark)
+            manager.bookmarkRemoved.connect(self.updateBookmark)
+        self._map_theme_collection = None
+        self.project.mapThemeCollectionChanged.connect(self.mapThemeCollectionChanged)
+        self.mapThemeCollectionChanged()
+        self.project.readProject.connect(self.reload)
+        self.project.cleared.connect(self.reload)
+
+        self.reload()
+
+    def unload(self):
+        for manager in self._bookmark_managers:
+            manager.bookmarkAdded.disconnect(self.updateBookmark)
+            manager.bookmarkChanged.disconnect(self.updateBookmark)
+            manager.bookmarkRemoved.disconnect(self.updateBookmark)
+        self.project.mapThemeCollectionChanged.disconnect(self.mapThemeCollectionChanged)
+        if self._map_theme_collection is not None and not sip.isdeleted(self._map_theme_collection):
+            self._map_theme_collection.mapThemesChanged.disconnect(self.updateMapThemes)
+        self.project.readProject.disconnect(self.reload)
+        self.project.cleared.disconnect(self.reload)
+        self._actions = {}
+
+    def action(self, button: str):
+        return self._actions.get(button)
+
+    def actions(self):
+        return list(self._actions.values())
+
+    def gestures(self):
+        return set(self._actions.keys())
+
+    def reload(self):
+        self._actions = {}
+        # only read the entries stored in the slot's project keys rather than every gesture
+        keys = self.project.entryList('GamepadNavigation', deviceEntry(self.slot, '').rstrip('/'))
+        for button in GESTURE_NAME_SET.intersection(keys):
+            self._updateButton(button)
+        self.mappingChanged.emit()
+
+    def updateButton(self, button: str):
+        """
+        Recompiles the action mapped to a button or gesture name.
+        """
+        mapped = button in self._actions
+        self._updateButton(button)
+        if mapped != (button in self._actions):
+            self.mappingChanged.emit()
+
+    def _updateButton(self, button: str):
+        (action_string, found) = self.project.readEntry('GamepadNavigation', deviceEntry(self.slot, button), '')
+        if not found:
+            self._actions.pop(button, None)
+            return
+
+        action = self.compile(action_string)
+        if action is None:
+            QgsMessageLog.logMessage('Ignoring wrong/corrupted action string \'{}\' assigned to {}'.format(action_string, button), 'GamepadNavigation', Qgis.Warning)
+            # keep an inert action so the button is not reported as unassigned
+            action = GamepadAction(action_string)
+        self._actions[button] = action
+
+    def updateBookmark(self, bookmark_id: str):
+        for (button, action) in self._actions.items():
+            if action.action_type == 'bookmark' and action.details == bookmark_id:
+                self._actions[button] = self.compileBookmark(bookmark_id)
+
+    def mapThemeCollectionChanged(self):
+        # projects replace their map theme collection when cleared
+        if self._map_theme_collection is not None and not sip.isdeleted(self._map_theme_collection):
+            self._map_theme_collection.mapThemesChanged.disconnect(self.updateMapThemes)
+        self._map_theme_collection = self.project.mapThemeCollection()
+        self._map_theme_collection.mapThemesChanged.connect(self.updateMapThemes)
+        self.updateMapThemes()
+
+    def updateMapThemes(self):
+        for action in self._actions.values():
+            if action.action_type == 'map_theme':
+                action.available = self.project.mapThemeCollection().hasMapTheme(action.details)
+
+    def compile(self, action_string: str):
+        (action_type, separator, action_details) = action_string.partition(':')
+        if not separator:
+            return None
+        if action_type == 'bookmark':
+            return self.compileBookmark(action_details)
+        elif action_type == 'map_theme':
+            return GamepadMapThemeAction(action_details, self.iface, self.project)
+        return None
+
+    def compileBookmark(self, bookmark_id: str):
+        bookmark = self.project.bookmarkManager().bookmarkById(bookmark_id)
+        if not bookmark.id():
+            bookmark = QgsApplication.instance().bookmarkManager().bookmarkById(bookmark_id)
+        if not bookmark.id():
+            return GamepadBookmarkAction(bookmark_id)
+        return GamepadBookmarkAction(bookmark_id, bookmark.extent(), bookmark.name())
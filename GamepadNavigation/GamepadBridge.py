@@ -15,45 +15,123 @@ __revision__ = '$Format:%H$'
 
 import os
 import signal
+import time
+
+from array import array
 
 from qgis.PyQt.QtCore import pyqtSlot, pyqtProperty, pyqtSignal, Qt, QObject
 
+AXES = ['axisLeftX', 'axisLeftY', 'axisRightX', 'axisRightY', 'buttonL2', 'buttonR2']
+BUTTONS = ['buttonL1', 'buttonL3', 'buttonR1', 'buttonR3',
+           'buttonA', 'buttonB', 'buttonX', 'buttonY',
+           'buttonUp', 'buttonDown', 'buttonLeft', 'buttonRight',
+           'buttonSelect', 'buttonStart']
+# order of the values packed into a gamepad state
+FIELDS = AXES + BUTTONS
+FIELD_INDEX = {name: index for (index, name) in enumerate(FIELDS)}
+
+# maximum number of gamepads driving canvases simultaneously
+MAX_DEVICES = 4
+
+def deviceEntry(slot: int, key: str):
+    """
+    Returns the project entry key of a gamepad slot's setting, the first slot using
+    plain keys so projects configured for a single gamepad keep working.
+    """
+    return key if slot == 0 else 'device{}/{}'.format(slot + 1, key)
+
+class GamepadState:
+    """
+    Immutable snapshot of all gamepad axes and buttons, with the buttons pressed and
+    released since the previous snapshot (in BUTTONS order, keeping edge handling
+    deterministic). Values are readable by name, e.g. state.axisLeftX.
+
+    The timestamp is the perf_counter() time the state reached the bridge, the source
+    delay the time elapsed between the input source's change and that arrival (0 when
+    the source does not report it).
+    """
+
+    __slots__ = ('values', 'sequence', 'timestamp', 'source_delay', 'pressed', 'released')
+
+    def __init__(self, values: array = None, sequence: int = 0, timestamp: float = 0.0, pressed: tuple = (), released: tuple = (), source_delay: float = 0.0):
+        self.values = values if values is not None else array('d', [0.0] * len(FIELDS))
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.source_delay = source_delay
+        self.pressed = pressed
+        self.released = released
+
+    def __getattr__(self, name):
+        try:
+            return self.values[FIELD_INDEX[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+    def axisMaximum(self):
+        return max(abs(self.values[0]), abs(self.values[1]), abs(self.values[2]), abs(self.values[3]), self.values[4], self.values[5])
+
 class GamepadBridge(QObject):
 
     connectedChanged = pyqtSignal()
     deviceIdChanged = pyqtSignal()
+    stateChanged = pyqtSignal()
     axisLeftChanged = pyqtSignal()
     axisRightChanged = pyqtSignal()
     buttonL2Changed = pyqtSignal()
     buttonR2Changed = pyqtSignal()
     buttonPressed = pyqtSignal(str)
+    buttonReleased = pyqtSignal(str)
 
     _connected = False
     _deviceId = 0
-    _axisLeftX = 0.0
-    _axisLeftY = 0.0
-    _axisRightX = 0.0
-    _axisRightY = 0.0
-    _buttonR1 = False
-    _buttonR2 = 0.0
-    _buttonR3 = False
-    _buttonL1 = False
-    _buttonL2 = 0.0
-    _buttonL3 = False
-    _buttonA = False
-    _buttonB = False
-    _buttonX = False
-    _buttonY = False
-    _buttonUp = False
-    _buttonDown = False
-    _buttonLeft = False
-    _buttonRight = False
-    _buttonSelect = False
-    _buttonStart = False
 
     def __init__(self, iface, parent: QObject = None):
         super(GamepadBridge, self).__init__(parent)
         self.iface =  iface
+        self._state = GamepadState()
+
+    def state(self):
+        return self._state
+
+    @pyqtSlot('QVariantList')
+    @pyqtSlot('QVariantList', float)
+    def setState(self, values, source_time: float = 0.0):
+        """
+        Replaces the whole gamepad state at once, values being ordered as FIELDS. The
+        optional source time is the wall clock time, in milliseconds since the epoch,
+        at which the input source registered the change.
+        """
+        source_delay = max(0.0, time.time() - source_time / 1000) if source_time > 0 else 0.0
+        self._pushState(array('d', (float(value) for value in values)), source_delay)
+
+    def _setField(self, name: str, value):
+        values = array('d', self._state.values)
+        values[FIELD_INDEX[name]] = float(value)
+        self._pushState(values)
+
+    def _pushState(self, values: array, source_delay: float = 0.0):
+        previous = self._state.values
+        if values == previous:
+            return
+
+        pressed = tuple(name for name in BUTTONS if values[FIELD_INDEX[name]] and not previous[FIELD_INDEX[name]])
+        released = tuple(name for name in BUTTONS if previous[FIELD_INDEX[name]] and not values[FIELD_INDEX[name]])
+        self._state = GamepadState(values, self._state.sequence + 1, time.perf_counter(), pressed, released, source_delay)
+        self.stateChanged.emit()
+
+        # per-property signals, kept for compatibility
+        if values[0:2] != previous[0:2]:
+            self.axisLeftChanged.emit()
+        if values[2:4] != previous[2:4]:
+            self.axisRightChanged.emit()
+        if values[4] != previous[4]:
+            self.buttonL2Changed.emit()
+        if values[5] != previous[5]:
+            self.buttonR2Changed.emit()
+        for name in pressed:
+            self.buttonPressed.emit(name)
+        for name in released:
+            self.buttonReleased.emit(name)
 
     @pyqtProperty(bool)
     def connected(self):
@@ -75,185 +153,129 @@ class GamepadBridge(QObject):
 
     @pyqtProperty(float)
     def axisLeftX(self):
-        return self._axisLeftX
+        return self._state.axisLeftX
     @axisLeftX.setter
     def axisLeftX(self, value):
-        if self._axisLeftX != value:
-            self._axisLeftX = value
-            self.axisLeftChanged.emit()
+        self._setField('axisLeftX', value)
 
     @pyqtProperty(float)
     def axisLeftY(self):
-        return self._axisLeftY
+        return self._state.axisLeftY
     @axisLeftY.setter
     def axisLeftY(self, value):
-        if self._axisLeftY != value:
-            self._axisLeftY = value
-            self.axisLeftChanged.emit()
+        self._setField('axisLeftY', value)
 
     @pyqtProperty(float)
     def axisRightX(self):
-        return self._axisRightX
+        return self._state.axisRightX
     @axisRightX.setter
     def axisRightX(self, value):
-        if self._axisRightX != value:
-            self._axisRightX = value
-            self.axisRightChanged.emit()
+        self._setField('axisRightX', value)
 
     @pyqtProperty(float)
     def axisRightY(self):
-        return self._axisRightY
+        return self._state.axisRightY
     @axisRightY.setter
     def axisRightY(self, value):
-        if self._axisRightY != value:
-            self._axisRightY = value
-            self.axisRightChanged.emit()
+        self._setField('axisRightY', value)
 
     @pyqtProperty(bool)
     def buttonR1(self):
-        return self._buttonR1
+        return bool(self._state.buttonR1)
     @buttonR1.setter
     def buttonR1(self, value):
-        if self._buttonR1 != value:
-            self._buttonR1 = value
-            if self._buttonR1:
-                self.buttonPressed.emit('buttonR1')
+        self._setField('buttonR1', value)
     @pyqtProperty(float)
     def buttonR2(self):
-        return self._buttonR2
+        return self._state.buttonR2
     @buttonR2.setter
     def buttonR2(self, value):
-        if self._buttonR2 != value:
-            self._buttonR2 = value
-            if self._buttonR2:
-                self.buttonR2Changed.emit()
+        self._setField('buttonR2', value)
     @pyqtProperty(bool)
     def buttonR3(self):
-        return self._buttonR3
+        return bool(self._state.buttonR3)
     @buttonR3.setter
     def buttonR3(self, value):
-        if self._buttonR3 != value:
-            self._buttonR3 = value
-            if self._buttonR3:
-                self.buttonPressed.emit('buttonR3')
+        self._setField('buttonR3', value)
 
     @pyqtProperty(bool)
     def buttonL1(self):
-        return self._buttonL1
+        return bool(self._state.buttonL1)
     @buttonL1.setter
     def buttonL1(self, value):
-        if self._buttonL1 != value:
-            self._buttonL1 = value
-            if self._buttonL1:
-                self.buttonPressed.emit('buttonL1')
+        self._setField('buttonL1', value)
     @pyqtProperty(float)
     def buttonL2(self):
-        return self._buttonL2
+        return self._state.buttonL2
     @buttonL2.setter
     def buttonL2(self, value):
-        if self._buttonL2 != value:
-            self._buttonL2 = value
-            if self._buttonL2:
-                self.buttonL2Changed.emit()
+        self._setField('buttonL2', value)
     @pyqtProperty(bool)
     def buttonL3(self):
-        return self._buttonL3
+        return bool(self._state.buttonL3)
     @buttonL3.setter
     def buttonL3(self, value):
-        if self._buttonL3 != value:
-            self._buttonL3 = value
-            if self._buttonL3:
-                self.buttonPressed.emit('buttonL3')
+        self._setField('buttonL3', value)
 
     @pyqtProperty(bool)
     def buttonA(self):
-        return self._buttonA
+        return bool(self._state.buttonA)
     @buttonA.setter
     def buttonA(self, value):
-        if self._buttonA != value:
-            self._buttonA = value
-            if self._buttonA:
-                self.buttonPressed.emit('buttonA')
+        self._setField('buttonA', value)
     @pyqtProperty(bool)
     def buttonB(self):
-        return self._buttonB
+        return bool(self._state.buttonB)
     @buttonB.setter
     def buttonB(self, value):
-        if self._buttonB != value:
-            self._buttonB = value
-            if self._buttonB:
-                self.buttonPressed.emit('buttonB')
+        self._setField('buttonB', value)
     @pyqtProperty(bool)
     def buttonX(self):
-        return self._buttonX
+        return bool(self._state.buttonX)
     @buttonX.setter
     def buttonX(self, value):
-        if self._buttonX != value:
-            self._buttonX = value
-            if self._buttonX:
-                self.buttonPressed.emit('buttonX')
+        self._setField('buttonX', value)
     @pyqtProperty(bool)
     def buttonY(self):
-        return self._buttonY
+        return bool(self._state.buttonY)
     @buttonY.setter
     def buttonY(self, value):
-        if self._buttonY != value:
-            self._buttonY = value
-            if self._buttonY:
-                self.buttonPressed.emit('buttonY')
+        self._setField('buttonY', value)
 
     @pyqtProperty(bool)
     def buttonUp(self):
-        return self._buttonUp
+        return bool(self._state.buttonUp)
     @buttonUp.setter
     def buttonUp(self, value):
-        if self._buttonUp != value:
-            self._buttonUp = value
-            if self._buttonUp:
-                self.buttonPressed.emit('buttonUp')
+        self._setField('buttonUp', value)
     @pyqtProperty(bool)
     def buttonDown(self):
-        return self._buttonDown
+        return bool(self._state.buttonDown)
     @buttonDown.setter
     def buttonDown(self, value):
-        if self._buttonDown != value:
-            self._buttonDown = value
-            if self._buttonDown:
-                self.buttonPressed.emit('buttonDown')
+        self._setField('buttonDown', value)
     @pyqtProperty(bool)
     def buttonLeft(self):
-        return self._buttonLeft
+        return bool(self._state.buttonLeft)
     @buttonLeft.setter
     def buttonLeft(self, value):
-        if self._buttonLeft != value:
-            self._buttonLeft = value
-            if self._buttonLeft:
-                self.buttonPressed.emit('buttonLeft')
+        self._setField('buttonLeft', value)
     @pyqtProperty(bool)
     def buttonRight(self):
-        return self._buttonRight
+        return bool(self._state.buttonRight)
     @buttonRight.setter
     def buttonRight(self, value):
-        if self._buttonRight != value:
-            self._buttonRight = value
-            if self._buttonRight:
-                self.buttonPressed.emit('buttonRight')
+        self._setField('buttonRight', value)
 
     @pyqtProperty(bool)
     def buttonSelect(self):
-        return self._buttonSelect
+        return bool(self._state.buttonSelect)
     @buttonSelect.setter
     def buttonSelect(self, value):
-        if self._buttonSelect != value:
-            self._buttonSelect = value
-            if self._buttonSelect:
-                self.buttonPressed.emit('buttonSelect')
+        self._setField('buttonSelect', value)
     @pyqtProperty(bool)
     def buttonStart(self):
-        return self._buttonStart
+        return bool(self._state.buttonStart)
     @buttonStart.setter
     def buttonStart(self, value):
-        if self._buttonStart != value:
-            self._buttonStart = value
-            if self._buttonStart:
-                self.buttonPressed.emit('buttonStart')
+        self._setField('buttonStart', value)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Camera Driver
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+
+class GamepadCameraDriver:
+    """
+    Drives a 3D scene's camera from walk and look rates, computing a single camera
+    change per frame. Rates are smoothed with an exponential filter so motion glides
+    between frames, changes too small to be visible are skipped and the camera
+    controller only signals the change once.
+    """
+
+    # time constant of the rate smoothing, in seconds
+    DEFAULT_SMOOTHING = 0.08
+    # smallest walk (in scene units) and look (in degrees) displacement applied
+    MIN_MOVE = 1e-6
+    MIN_ROTATION = 1e-4
+
+    def __init__(self, smoothing: float = DEFAULT_SMOOTHING):
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        # walk x, y, z and look pitch, yaw rates per second
+        self.rates = [0.0] * 5
+
+    def update(self, scene, elapsed: float, move_x: float, move_y: float, move_z: float, pitch: float, yaw: float, lift: float = 0.0):
+        """
+        Steps the camera of a 3D scene by elapsed seconds towards the target rates,
+        returning False when the resulting change was too small to be applied. The
+        lift is an unsmoothed vertical displacement added to the step, e.g. to follow
+        the terrain.
+        """
+        targets = (move_x, move_y, move_z, pitch, yaw)
+        if self.smoothing > 0:
+            alpha = 1 - math.exp(-elapsed / self.smoothing)
+            self.rates = [rate + (target - rate) * alpha for (rate, target) in zip(self.rates, targets)]
+        else:
+            self.rates = list(targets)
+
+        (walk_x, walk_y, walk_z, look_pitch, look_yaw) = [rate * elapsed for rate in self.rates]
+        walk_z += lift
+        operations = []
+        if abs(walk_x) > self.MIN_MOVE or abs(walk_y) > self.MIN_MOVE or abs(walk_z) > self.MIN_MOVE:
+            operations.append(lambda controller: controller.walkView(walk_x, walk_y, walk_z))
+        if abs(look_pitch) > self.MIN_ROTATION or abs(look_yaw) > self.MIN_ROTATION:
+            operations.append(lambda controller: controller.rotateCamera(look_pitch, look_yaw))
+        if not operations:
+            return False
+
+        # only the last operation signals the camera change, triggering a single
+        # chunk visibility update of the scene
+        controller = scene.cameraController()
+        for operation in operations[:-1]:
+            controller.blockSignals(True)
+            try:
+                operation(controller)
+            finally:
+                controller.blockSignals(False)
+        operations[-1](controller)
+        return True
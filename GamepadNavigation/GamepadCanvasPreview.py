@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Canvas Preview
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsMapRendererCustomPainterJob, QgsMapRendererParallelJob
+from qgis.gui import QgsMapCanvas, QgsMapCanvasItem
+
+from GamepadNavigation.GamepadRenderCache import renderContext
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QObject, QPointF, QRectF
+from qgis.PyQt.QtGui import QImage, QPainter, QPolygonF, QTransform
+
+# z value of the canvas item painting the canvas' map image
+MAP_ITEM_Z = -10
+
+def mapImage(canvas: QgsMapCanvas):
+    """
+    Returns an image of a 2D canvas' map content alone, without canvas items and
+    decorations: composed from the canvas' render cache when it holds every layer,
+    else grabbed from the viewport with the canvas items hidden.
+    """
+    settings = canvas.mapSettings()
+    cache = canvas.cache()
+    if cache is not None and all(cache.hasCacheImage(layer.id()) for layer in settings.layers()):
+        image = QImage(settings.deviceOutputSize(), settings.outputImageFormat())
+        image.setDevicePixelRatio(settings.devicePixelRatio())
+        image.fill(settings.backgroundColor())
+        painter = QPainter(image)
+        job = QgsMapRendererCustomPainterJob(settings, painter)
+        job.setCache(cache)
+        job.renderSynchronously()
+        painter.end()
+        return image
+
+    hidden = [item for item in canvas.scene().items() if item.isVisible() and item.zValue() > MAP_ITEM_Z]
+    for item in hidden:
+        item.setVisible(False)
+    try:
+        return canvas.viewport().grab().toImage()
+    finally:
+        for item in hidden:
+            item.setVisible(True)
+
+class GamepadPreviewItem(QgsMapCanvasItem):
+    """
+    Canvas item painting a rendered map image transformed from the map settings
+    it was rendered with to the canvas' current map settings.
+    """
+
+    def __init__(self, canvas: QgsMapCanvas):
+        super(GamepadPreviewItem, self).__init__(canvas)
+        self.canvas = canvas
+        self.image = None
+        self.settings = None
+        # above the canvas' map image, below any other canvas item
+        self.setZValue(-5)
+
+    def setImage(self, image, settings):
+        self.image = image
+        self.settings = settings
+        self.update()
+
+    def boundingRect(self):
+        return QRectF(self.canvas.viewport().rect())
+
+    def updatePosition(self):
+        self.prepareGeometryChange()
+        self.setPos(0, 0)
+
+    def paint(self, painter, option=None, widget=None):
+        if self.image is None:
+            return
+
+        current_settings = self.canvas.mapSettings()
+        painter.fillRect(self.boundingRect(), current_settings.backgroundColor())
+
+        width = self.image.width() / self.image.devicePixelRatio()
+        height = self.image.height() / self.image.devicePixelRatio()
+        source = QPolygonF([QPointF(0, 0), QPointF(width, 0), QPointF(width, height), QPointF(0, height)])
+        destination = QPolygonF()
+        for corner in source:
+            point = self.settings.mapToPixel().toMapCoordinates(corner.x(), corner.y())
+            destination.append(current_settings.mapToPixel().transform(point).toQPointF())
+
+        transform = QTransform()
+        if not QTransform.quadToQuad(source, destination, transform):
+            return
+
+        painter.save()
+        painter.setTransform(transform, True)
+        painter.drawImage(QRectF(0, 0, width, height), self.image)
+        painter.restore()
+
+class GamepadCanvasPreview(QObject):
+    """
+    Keeps the last rendered map image of a frozen 2D canvas on screen while
+    navigating, re-rendering it in the background only when motion slows down.
+    """
+
+    DEFAULT_THRESHOLD = 0.35
+
+    def __init__(self, cache=None, parent: QObject = None):
+        super(GamepadCanvasPreview, self).__init__(parent)
+        self.cache = cache
+        self.canvas = None
+        self.item = None
+        self.job = None
+        self.threshold = self.DEFAULT_THRESHOLD
+
+    def isActive(self):
+        return self.canvas is not None
+
+    def start(self, canvas: QgsMapCanvas, threshold: float = DEFAULT_THRESHOLD):
+        self.stop()
+
+        self.canvas = canvas
+        self.threshold = threshold
+        self.canvas.stopRendering()
+
+        self.item = GamepadPreviewItem(self.canvas)
+        self.item.setImage(mapImage(self.canvas), self.canvas.mapSettings())
+        self.canvas.freeze(True)
+
+    def update(self, magnitude: float):
+        """
+        Repaints the preview for the canvas' current view, a full quality render
+        is started when the input magnitude falls below the preview threshold.
+        """
+        if self.canvas is None or sip.isdeleted(self.canvas):
+            return
+
+        self.item.update()
+        if magnitude < self.threshold:
+            self.render()
+
+    def render(self):
+        if self.job is not None:
+            return
+
+        settings = self.canvas.mapSettings()
+        if settings.visibleExtent() == self.item.settings.visibleExtent() and settings.rotation() == self.item.settings.rotation():
+            return
+
+        if self.showCached(settings, 0.99):
+            return
+
+        self.job = QgsMapRendererParallelJob(settings)
+        self.job.finished.connect(self.renderFinished)
+        self.job.start()
+
+    def renderFinished(self):
+        job = self.job
+        self.job = None
+        if self.item is not None:
+            self.item.setImage(job.renderedImage(), job.mapSettings())
+        if self.cache is not None:
+            self.cache.insert(renderContext(job.mapSettings()), job.mapSettings(), job.renderedImage())
+        job.deleteLater()
+
+    def showCached(self, settings, min_coverage: float = 0.9):
+        """
+        Swaps the preview image for a cached render covering the given view, if any.
+        """
+        if self.cache is None:
+            return False
+        entry = self.cache.match(renderContext(settings), settings, min_coverage)
+        if entry is None:
+            return False
+        if entry[0] is not self.item.settings:
+            self.item.setImage(entry[1], entry[0])
+        return True
+
+    def stop(self):
+        """
+        Unfreezes and refreshes the canvas, the preview remains visible until the
+        canvas has completed its refresh.
+        """
+        if self.job is not None:
+            # let the cancelled job wind down in its own time rather than blocking
+            self.job.finished.disconnect(self.renderFinished)
+            self.job.finished.connect(self.job.deleteLater)
+            sip.transferto(self.job, None)
+            self.job.cancelWithoutBlocking()
+            self.job = None
+
+        if self.canvas is None:
+            return
+
+        canvas = self.canvas
+        item = self.item
+        self.canvas = None
+        self.item = None
+        if sip.isdeleted(canvas):
+            return
+
+        # display the navigation's destination from cache while the canvas refreshes
+        settings = canvas.mapSettings()
+        if self.cache is not None and not sip.isdeleted(item):
+            entry = self.cache.match(renderContext(settings), settings)
+            if entry is not None:
+                item.setImage(entry[1], entry[0])
+
+        def refreshed():
+            canvas.mapCanvasRefreshed.disconnect(refreshed)
+            if not sip.isdeleted(item):
+                canvas.scene().removeItem(item)
+
+        canvas.mapCanvasRefreshed.connect(refreshed)
+        canvas.freeze(False)
+        canvas.refresh()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Canvas Resolver
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsProject
+
+from GamepadNavigation.GamepadBridge import deviceEntry
+
+_3D_SUPPORT = True
+try:
+    from qgis._3d import Qgs3DMapScene
+except:
+    _3D_SUPPORT = False
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import pyqtSignal, QObject, QElapsedTimer
+
+def findCanvas(iface, canvas_type: str, canvas_name: str):
+    """
+    Returns the open 2D map canvas or 3D scene of the given type and name, or None.
+    """
+    if canvas_type == '2d':
+        for map_canvas in iface.mapCanvases():
+            if map_canvas.objectName() == canvas_name:
+                return map_canvas
+    elif _3D_SUPPORT and canvas_type == '3d':
+        return Qgs3DMapScene.openScenes().get(canvas_name)
+    return None
+
+class GamepadCanvasResolver(QObject):
+    """
+    Resolves the project's gamepad-driven canvas once and caches it until the
+    project entry is rewritten, the canvas is destroyed or the project changes.
+    """
+
+    canvasChanged = pyqtSignal()
+
+    # QGIS does not signal the opening of map canvases nor 3D scenes, a failed
+    # lookup is therefore only retried after this many milliseconds
+    MISS_RETRY_INTERVAL = 1000
+
+    iface = None
+    project = None
+
+    def __init__(self, iface, slot: int = 0, parent: QObject = None):
+        super(GamepadCanvasResolver, self).__init__(parent)
+        self.iface = iface
+        self.slot = slot
+        self.project = QgsProject.instance()
+
+        self._canvas_type = ''
+        self._canvas_name = ''
+        self._canvas = None
+        self._resolved = False
+        self._miss_timer = QElapsedTimer()
+
+        self.project.readProject.connect(self.invalidate)
+        self.project.cleared.connect(self.invalidate)
+
+    def unload(self):
+        self.project.readProject.disconnect(self.invalidate)
+        self.project.cleared.disconnect(self.invalidate)
+        self._release()
+
+    def invalidate(self):
+        self._release()
+        self._resolved = False
+        self._miss_timer.invalidate()
+        self.canvasChanged.emit()
+
+    def canvas(self):
+        if self._canvas is not None and sip.isdeleted(self._canvas):
+            self._release()
+            self._resolved = False
+
+        if not self._resolved or (self._canvas is None and self._miss_timer.isValid() and self._miss_timer.hasExpired(self.MISS_RETRY_INTERVAL)):
+            self._resolve()
+
+        if self._canvas is not None:
+            return (self._canvas_type, self._canvas_name, self._canvas)
+        else:
+            return ('', '', None)
+
+    def _resolve(self):
+        (canvas_string, found) = self.project.readEntry('GamepadNavigation', deviceEntry(self.slot, 'canvas'), '2d:theMapCanvas')
+        if not canvas_string == '':
+            (canvas_type, _, canvas_name) = canvas_string.partition(':')
+        else:
+            canvas_type = '2d'
+            canvas_name = 'theMapCanvas'
+
+        canvas = findCanvas(self.iface, canvas_type, canvas_name)
+
+        self._release()
+        self._resolved = True
+        if canvas is not None:
+            self._canvas_type = canvas_type
+            self._canvas_name = canvas_name
+            self._canvas = canvas
+            self._canvas.destroyed.connect(self.invalidate)
+            self._miss_timer.invalidate()
+        else:
+            self._miss_timer.start()
+
+    def _release(self):
+        if self._canvas is not None and not sip.isdeleted(self._canvas):
+            try:
+                self._canvas.destroyed.disconnect(self.invalidate)
+            except TypeError:
+                pass
+        self._canvas_type = ''
+        self._canvas_name = ''
+        self._canvas = None
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Devices
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsProject
+
+from GamepadNavigation.GamepadBridge import FIELDS, MAX_DEVICES, GamepadBridge
+from GamepadNavigation.GamepadCameraDriver import GamepadCameraDriver
+from GamepadNavigation.GamepadCanvasPreview import GamepadCanvasPreview
+from GamepadNavigation.GamepadCanvasResolver import GamepadCanvasResolver
+from GamepadNavigation.GamepadFlyTo import GamepadFlyTo
+from GamepadNavigation.GamepadGestures import GamepadGestureRecognizer
+from GamepadNavigation.GamepadInput import significantChange
+from GamepadNavigation.GamepadLinkedViews import GamepadLinkedViews
+from GamepadNavigation.GamepadPrefetcher import GamepadPrefetcher
+from GamepadNavigation.GamepadRenderCache import GamepadRenderCache
+from GamepadNavigation.GamepadTerrainFollower import GamepadTerrainFollower
+from GamepadNavigation.GamepadThemePrerender import GamepadThemePrerender
+from GamepadNavigation.GamepadViewTransform import GamepadViewTransform
+
+from qgis.PyQt.QtCore import pyqtSlot, pyqtSignal, QObject
+
+class GamepadDeviceManager(QObject):
+    """
+    Assigns connected QtGamepad devices to slots, each slot having its own bridge.
+    A device keeps its slot while connected, newly connected devices take the
+    lowest free slot. The first slot's bridge always exists.
+    """
+
+    # emitted with the slot of a newly created bridge
+    deviceAdded = pyqtSignal(int)
+    # emitted on connection changes and on states pressing or releasing a button or
+    # moving an axis by at least WAKE_THRESHOLD, to track input inactivity
+    activity = pyqtSignal()
+
+    def __init__(self, iface, parent: QObject = None):
+        super(GamepadDeviceManager, self).__init__(parent)
+        self.iface = iface
+        self._bridges = [GamepadBridge(iface, self)]
+        self._slots = {}
+        # per device values of the last state reported as activity
+        self._activity_values = {}
+
+    def bridge(self, slot: int):
+        return self._bridges[slot]
+
+    def bridges(self):
+        return list(self._bridges)
+
+    def slot(self, device_id: int):
+        return self._slots.get(device_id, -1)
+
+    @pyqtSlot(int, bool)
+    def setConnected(self, device_id: int, connected: bool):
+        if connected:
+            if device_id not in self._slots:
+                self.activity.emit()
+            slot = self._assign(device_id)
+            if slot >= 0:
+                self._bridges[slot].connected = True
+            return
+
+        self._activity_values.pop(device_id, None)
+        slot = self._slots.pop(device_id, -1)
+        if slot >= 0:
+            self.activity.emit()
+            # release all axes and buttons so nothing keeps moving once unplugged
+            self._bridges[slot].setState([0.0] * len(FIELDS))
+            self._bridges[slot].connected = False
+
+    @pyqtSlot(int, 'QVariantList')
+    @pyqtSlot(int, 'QVariantList', float)
+    def setState(self, device_id: int, values, source_time: float = 0.0):
+        # drifting sticks must not keep the input awake
+        if significantChange(values, self._activity_values.get(device_id, [0.0] * len(FIELDS))):
+            self._activity_values[device_id] = list(values)
+            self.activity.emit()
+        slot = self._slots.get(device_id, -1)
+        if slot >= 0:
+            self._bridges[slot].setState(values, source_time)
+
+    def _assign(self, device_id: int):
+        if device_id in self._slots:
+            return self._slots[device_id]
+
+        used_slots = set(self._slots.values())
+        free_slots = [slot for slot in range(MAX_DEVICES) if slot not in used_slots]
+        if not free_slots:
+            return -1
+        slot = free_slots[0]
+        self._slots[device_id] = slot
+        while len(self._bridges) <= slot:
+            self._bridges.append(GamepadBridge(self.iface, self))
+            self.deviceAdded.emit(len(self._bridges) - 1)
+        self._bridges[slot].deviceId = device_id
+        return slot
+
+class GamepadDevice:
+    """
+    Everything a gamepad slot needs to drive its own canvas: the bridge, the canvas
+    and button mappings and the state of the canvas' ongoing navigation.
+    """
+
+    def __init__(self, slot: int, bridge: GamepadBridge, iface, render_cache: GamepadRenderCache, action_table):
+        self.slot = slot
+        self.bridge = bridge
+        self.canvas_resolver = GamepadCanvasResolver(iface, slot)
+        # owned by the plugin, the mapping dialog previews mappings of unplugged gamepads
+        self.action_table = action_table
+        self.gestures = GamepadGestureRecognizer(bridge)
+        self.action_table.mappingChanged.connect(self.updateGestures)
+        self.updateGestures()
+        self.canvas_preview = GamepadCanvasPreview(render_cache)
+        self.prefetcher = GamepadPrefetcher(render_cache)
+        self.fly_to = GamepadFlyTo(render_cache)
+        self.theme_prerender = GamepadThemePrerender(render_cache)
+        # secondary canvases and scenes mirroring the driven canvas
+        self.linked_views = GamepadLinkedViews()
+        self.view_transform = GamepadViewTransform()
+        self.camera_driver = GamepadCameraDriver()
+        self.terrain_follower = GamepadTerrainFollower()
+        # the 3D camera keeps its clearance above the terrain while walking
+        self.terrain_following = False
+
+        self.navigating = False
+        self.canvas_type = ''
+        self.canvas = None
+        self.response_profile = None
+        self.response_profile_definitions = None
+        # reduced cost render settings used while navigating, if enabled
+        self.motion_profile = None
+
+    def updateGestures(self):
+        project = QgsProject.instance()
+        self.gestures.setTimings(project.readNumEntry('GamepadNavigation', 'gesture_long_press', GamepadGestureRecognizer.DEFAULT_LONG_PRESS)[0],
+                                 project.readNumEntry('GamepadNavigation', 'gesture_double_press', GamepadGestureRecognizer.DEFAULT_DOUBLE_PRESS)[0],
+                                 project.readNumEntry('GamepadNavigation', 'gesture_repeat_interval', GamepadGestureRecognizer.DEFAULT_REPEAT_INTERVAL)[0])
+        self.gestures.setMapped(self.action_table.gestures())
+
+    def unload(self):
+        self.action_table.mappingChanged.disconnect(self.updateGestures)
+        self.gestures.unload()
+        self.gestures.deleteLater()
+        self.canvas_preview.stop()
+        self.canvas_preview.deleteLater()
+        self.prefetcher.stop()
+        self.prefetcher.deleteLater()
+        self.fly_to.stop()
+        self.fly_to.cancelPrerender()
+        self.fly_to.deleteLater()
+        self.theme_prerender.stop()
+        self.theme_prerender.deleteLater()
+        self.linked_views.unlink()
+        self.linked_views.deleteLater()
+        self.canvas_resolver.unload()
+        self.canvas_resolver.deleteLater()
+        self.terrain_follower.release()
+        self.terrain_following = False
+        if self.motion_profile is not None:
+            self.motion_profile.release()
+            self.motion_profile = None
+        self.navigating = False
+        self.canvas = None
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Diagnostics Dialog
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import os
+
+from GamepadNavigation.GamepadInstrumentation import GamepadLatencyMonitor, GamepadStartupTimings
+
+from qgis.PyQt.QtCore import QTimer
+from qgis.PyQt.QtGui import QFontDatabase
+from qgis.PyQt.QtWidgets import QDialog, QDialogButtonBox, QWidget
+from qgis.PyQt.uic import loadUiType
+
+GamepadDiagnosticsDialogUi, _ = loadUiType(
+    os.path.join(os.path.dirname(__file__), "ui/gamepad_diagnostics_dialog.ui")
+)
+
+
+class GamepadDiagnosticsDialog(QDialog, GamepadDiagnosticsDialogUi):
+
+    latency_monitor = None
+    startup_timings = None
+    idle_manager = None
+    network_backend = None
+
+    def __init__(self, latency_monitor: GamepadLatencyMonitor, startup_timings: GamepadStartupTimings = None, parent: QWidget = None):
+        super(GamepadDiagnosticsDialog, self).__init__(parent=parent)
+        self.setupUi(self)
+
+        self.latency_monitor = latency_monitor
+        self.startup_timings = startup_timings
+
+        self.reportText.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.buttonBox.button(QDialogButtonBox.Close).clicked.connect(lambda:self.hide())
+        self.collectCheckBox.setChecked(self.latency_monitor.enabled)
+        self.collectCheckBox.toggled.connect(self.latency_monitor.setEnabled)
+        self.clearButton.released.connect(self.clearMeasurements)
+        self.logButton.released.connect(self.latency_monitor.logReport)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.updateReport)
+
+    def showEvent(self, event):
+        self.updateReport()
+        self.refresh_timer.start()
+        super(GamepadDiagnosticsDialog, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super(GamepadDiagnosticsDialog, self).hideEvent(event)
+
+    def clearMeasurements(self):
+        self.latency_monitor.clear()
+        self.updateReport()
+
+    def updateReport(self):
+        report = self.latency_monitor.report()
+        if self.idle_manager is not None:
+            report += '\n\n' + self.idle_manager.report()
+        if self.network_backend is not None:
+            report += '\n\n' + self.network_backend.report()
+        if self.startup_timings is not None:
+            report += '\n\n' + self.startup_timings.report()
+        self.reportText.setPlainText(report)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Elevation Cache
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import collections
+import math
+import threading
+
+from array import array
+
+from qgis.core import Qgis, QgsMessageLog, QgsRasterLayer, QgsRectangle
+
+_NUMPY_SUPPORT = True
+try:
+    import numpy
+except:
+    _NUMPY_SUPPORT = False
+
+# array typecodes of the raster data types converted in bulk, Int8 needing QGIS 3.30
+DATA_TYPECODES = {getattr(Qgis, name): typecode for (name, typecode) in (('Byte', 'B'), ('Int8', 'b'), ('UInt16', 'H'), ('Int16', 'h'),
+                                                                           ('UInt32', 'I'), ('Int32', 'i'), ('Float32', 'f'), ('Float64', 'd'))
+                  if hasattr(Qgis, name)}
+
+def noDataSample(typecode: str, value: float):
+    """
+    Returns a no data value as stored in samples of an array typecode, or None when
+    no sample can hold it.
+    """
+    try:
+        if typecode not in 'fd':
+            if value != int(value):
+                return None
+            value = int(value)
+        return array(typecode, [value])[0]
+    except (OverflowError, ValueError):
+        return None
+
+class GamepadElevationCache:
+    """
+    Elevations of a raster layer (e.g. a terrain DEM) sampled on a grid of square
+    tiles, loaded on a background thread from a clone of the layer's provider and
+    kept in a least recently used cache of bounded size. Lookups never read the
+    provider: a missing tile is queued for loading and the lookup reports no height.
+    """
+
+    # samples along a tile side
+    TILE_SIZE = 64
+    DEFAULT_MAX_TILES = 256
+    # seconds stop() waits for a tile being loaded, the thread winding down on its own past it
+    STOP_TIMEOUT = 1.0
+
+    def __init__(self, layer: QgsRasterLayer, band: int = 1, max_tiles: int = DEFAULT_MAX_TILES):
+        self.layer_id = layer.id()
+        self.crs = layer.crs()
+        self.band = band
+        self.max_tiles = max(1, max_tiles)
+        # map units between two samples, the layer's own resolution
+        self.resolution = max(layer.rasterUnitsPerPixelX(), layer.rasterUnitsPerPixelY())
+        self.tile_extent = self.TILE_SIZE * self.resolution
+        self.extent = layer.extent()
+
+        self._provider = layer.dataProvider().clone()
+        self._tiles = collections.OrderedDict()
+        self._queue = collections.deque()
+        self._queued = set()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='GamepadElevationCache', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        # a slow provider read must not hang the UI, the thread releases the provider once it returns
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._provider = None
+
+    def tileKey(self, x: float, y: float):
+        return (math.floor((x - self.extent.xMinimum()) / self.tile_extent), math.floor((y - self.extent.yMinimum()) / self.tile_extent))
+
+    def height(self, x: float, y: float):
+        """
+        Returns the bilinearly interpolated elevation at a point in the layer's CRS,
+        or None when the point has no data or its tile is not loaded yet.
+        """
+        if not self.extent.contains(x, y):
+            return None
+        key = self.tileKey(x, y)
+        with self._condition:
+            values = self._tiles.get(key)
+            if values is not None:
+                self._tiles.move_to_end(key)
+        if values is None:
+            self.request([key], urgent=True)
+            return None
+
+        # samples sit on the tile's grid lines, including the far edges
+        column = (x - self.extent.xMinimum()) / self.resolution - key[0] * self.TILE_SIZE
+        row = (key[1] + 1) * self.TILE_SIZE - (y - self.extent.yMinimum()) / self.resolution
+        (column_index, row_index) = (min(int(column), self.TILE_SIZE - 1), min(int(row), self.TILE_SIZE - 1))
+        (dx, dy) = (column - column_index, row - row_index)
+        stride = self.TILE_SIZE + 1
+        corners = [values[(row_index + j) * stride + column_index + i] for (i, j) in ((0, 0), (1, 0), (0, 1), (1, 1))]
+        weights = [(1 - dx) * (1 - dy), dx * (1 - dy), (1 - dx) * dy, dx * dy]
+        valid = [(value, weight) for (value, weight) in zip(corners, weights) if not math.isnan(value)]
+        total = sum(weight for (value, weight) in valid)
+        if total <= 0:
+            return None
+        return sum(value * weight for (value, weight) in valid) / total
+
+    def request(self, keys, urgent: bool = False):
+        with self._condition:
+            for key in keys:
+                if key in self._tiles or key in self._queued:
+                    if urgent and key in self._queued:
+                        # a tile needed right now jumps the warm up queue
+                        self._queue.remove(key)
+                        self._queue.appendleft(key)
+                    continue
+                self._queued.add(key)
+                if urgent:
+                    self._queue.appendleft(key)
+                else:
+                    self._queue.append(key)
+            # warm ups the camera outran are dropped, farthest along its way first
+            while len(self._queue) > self.max_tiles // 2 + 1:
+                self._queued.discard(self._queue.pop())
+            self._condition.notify()
+
+    def prefetch(self, x: float, y: float, end_x: float, end_y: float):
+        """
+        Queues the tiles around a point and along the segment to an end point, e.g.
+        where the camera will be in a few seconds.
+        """
+        keys = []
+        (center_x, center_y) = self.tileKey(x, y)
+        for j in (-1, 0, 1):
+            for i in (-1, 0, 1):
+                keys.append((center_x + i, center_y + j))
+        steps = int(math.hypot(end_x - x, end_y - y) / self.tile_extent) + 1
+        for step in range(1, steps + 1):
+            keys.append(self.tileKey(x + (end_x - x) * step / steps, y + (end_y - y) * step / steps))
+        self.request([key for key in dict.fromkeys(keys) if self._tileExists(key)])
+
+    def clear(self):
+        with self._condition:
+            self._tiles.clear()
+
+    def _tileExists(self, key: tuple):
+        return (0 <= key[0] * self.tile_extent < self.extent.width()) and (0 <= key[1] * self.tile_extent < self.extent.height())
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    self._provider = None
+                    return
+                key = self._queue.popleft()
+
+            try:
+                values = self._load(key)
+            except Exception as e:
+                # a tile failing to load has no heights, it is not retried
+                QgsMessageLog.logMessage('Elevation tile {} could not be loaded: {}'.format(key, e), 'GamepadNavigation', Qgis.Warning)
+                values = array('d', [math.nan]) * ((self.TILE_SIZE + 1) * (self.TILE_SIZE + 1))
+            with self._condition:
+                self._queued.discard(key)
+                self._tiles[key] = values
+                while len(self._tiles) > self.max_tiles:
+                    self._tiles.popitem(last=False)
+
+    def _load(self, key: tuple):
+        # one sample more per side so interpolation never needs a neighbour tile
+        x = self.extent.xMinimum() + key[0] * self.tile_extent
+        y = self.extent.yMinimum() + key[1] * self.tile_extent
+        half = self.resolution / 2
+        size = self.TILE_SIZE + 1
+        block = self._provider.block(self.band, QgsRectangle(x - half, y - half, x + self.tile_extent + half, y + self.tile_extent + half), size, size)
+        if block is None or not block.isValid():
+            return array('d', [math.nan]) * (size * size)
+
+        typecode = DATA_TYPECODES.get(block.dataType())
+        data = bytes(block.data()) if typecode is not None else b''
+        if typecode is None or len(data) != size * size * array(typecode).itemsize or (block.hasNoData() and not block.hasNoDataValue()):
+            # other data types and no data bitmaps are read sample by sample
+            return self._loadSamples(block, size)
+
+        nodata = noDataSample(typecode, block.noDataValue()) if block.hasNoDataValue() else None
+        if _NUMPY_SUPPORT:
+            samples = numpy.frombuffer(data, dtype=typecode)
+            values = samples.astype(numpy.float64)
+            if nodata is not None:
+                values[samples == nodata] = math.nan
+            return array('d', values.tobytes())
+
+        samples = array(typecode)
+        samples.frombytes(data)
+        if nodata is None:
+            return array('d', samples)
+        return array('d', [math.nan if sample == nodata else sample for sample in samples])
+
+    def _loadSamples(self, block, size: int):
+        values = array('d', [math.nan]) * (size * size)
+        for row in range(size):
+            for column in range(size):
+                if not block.isNoData(row, column):
+                    values[row * size + column] = block.value(row, column)
+        return values
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Evdev Backend
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import errno
+import glob
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+
+_FCNTL_SUPPORT = True
+try:
+    import fcntl
+except:
+    _FCNTL_SUPPORT = False
+
+from qgis.core import Qgis, QgsMessageLog
+
+from GamepadNavigation.GamepadBridge import FIELDS, FIELD_INDEX
+from GamepadNavigation.GamepadInput import GamepadThreadedInputBackend, significantChange
+
+from qgis.PyQt.QtCore import QObject
+
+# struct input_event (64-bit Linux layout): timeval seconds and microseconds, type, code, value
+EVENT = struct.Struct('llHHi')
+# struct input_absinfo: value, minimum, maximum, fuzz, flat, resolution
+ABS_INFO = struct.Struct('6i')
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0x00
+SYN_DROPPED = 0x03
+KEY_MAX = 0x2ff
+ABS_MAX = 0x3f
+BTN_GAMEPAD = 0x130
+
+# key codes of the Linux gamepad specification, the north and west buttons being
+# the upper (Y / Triangle) and left (X / Square) ones
+KEY_FIELDS = {
+    0x130: 'buttonA',       # BTN_SOUTH
+    0x131: 'buttonB',       # BTN_EAST
+    0x133: 'buttonY',       # BTN_NORTH
+    0x134: 'buttonX',       # BTN_WEST
+    0x136: 'buttonL1',      # BTN_TL
+    0x137: 'buttonR1',      # BTN_TR
+    0x138: 'buttonL2',      # BTN_TL2, digital triggers only
+    0x139: 'buttonR2',      # BTN_TR2, digital triggers only
+    0x13a: 'buttonSelect',  # BTN_SELECT
+    0x13b: 'buttonStart',   # BTN_START
+    0x13d: 'buttonL3',      # BTN_THUMBL
+    0x13e: 'buttonR3',      # BTN_THUMBR
+    0x220: 'buttonUp',      # BTN_DPAD_UP
+    0x221: 'buttonDown',    # BTN_DPAD_DOWN
+    0x222: 'buttonLeft',    # BTN_DPAD_LEFT
+    0x223: 'buttonRight',   # BTN_DPAD_RIGHT
+}
+ABS_STICKS = {
+    0x00: 'axisLeftX',      # ABS_X
+    0x01: 'axisLeftY',      # ABS_Y
+    0x03: 'axisRightX',     # ABS_RX
+    0x04: 'axisRightY',     # ABS_RY
+}
+ABS_TRIGGERS = {
+    0x02: 'buttonL2',       # ABS_Z
+    0x05: 'buttonR2',       # ABS_RZ
+}
+# directional pad hats, as (negative, positive) buttons
+ABS_HATS = {
+    0x10: ('buttonLeft', 'buttonRight'),    # ABS_HAT0X
+    0x11: ('buttonUp', 'buttonDown'),       # ABS_HAT0Y
+}
+# axis ranges used when a device cannot report them, e.g. a recorded event file
+DEFAULT_STICK_RANGE = (-32768, 32767)
+DEFAULT_TRIGGER_RANGE = (0, 255)
+
+def _ioctlRead(number: int, size: int):
+    return (2 << 30) | (size << 16) | (ord('E') << 8) | number
+
+def EVIOCGBIT(event_type: int, size: int):
+    return _ioctlRead(0x20 + event_type, size)
+
+def EVIOCGABS(axis: int):
+    return _ioctlRead(0x40 + axis, ABS_INFO.size)
+
+def packEvent(event_type: int, code: int, value: int, timestamp: float = 0.0):
+    """
+    Packs an input event, e.g. to write a fake event device file read through explicit backend paths.
+    """
+    seconds = int(timestamp)
+    return EVENT.pack(seconds, int((timestamp - seconds) * 1e6), event_type, code, value)
+
+def _hasBit(bits: bytes, bit: int):
+    return bit // 8 < len(bits) and bits[bit // 8] & (1 << (bit % 8))
+
+class GamepadEvdevDevice:
+    """
+    An opened event device, decoding its events into a state ordered as FIELDS.
+    """
+
+    def __init__(self, path: str, device_id: int, fd: int):
+        self.path = path
+        self.device_id = device_id
+        self.fd = fd
+        self.values = [0.0] * len(FIELDS)
+        # the state last reported to the device manager
+        self.delivered = list(self.values)
+        self.source_time = 0.0
+        self.changed = False
+        self.analog_triggers = True
+        self.ranges = {}
+        self._buffer = b''
+        self._dropped = False
+
+        try:
+            key_bits = bytearray((KEY_MAX + 8) // 8)
+            fcntl.ioctl(fd, EVIOCGBIT(EV_KEY, len(key_bits)), key_bits, True)
+            abs_bits = bytearray((ABS_MAX + 8) // 8)
+            fcntl.ioctl(fd, EVIOCGBIT(EV_ABS, len(abs_bits)), abs_bits, True)
+            self.is_gamepad = bool(_hasBit(key_bits, BTN_GAMEPAD))
+            self.analog_triggers = bool(_hasBit(abs_bits, 0x02) or _hasBit(abs_bits, 0x05))
+            for axis in list(ABS_STICKS) + list(ABS_TRIGGERS):
+                if _hasBit(abs_bits, axis):
+                    info = bytearray(ABS_INFO.size)
+                    fcntl.ioctl(fd, EVIOCGABS(axis), info, True)
+                    (value, minimum, maximum, fuzz, flat, resolution) = ABS_INFO.unpack(info)
+                    if maximum > minimum:
+                        self.ranges[axis] = (minimum, maximum)
+                        self._setAxis(axis, value)
+            self.is_event_device = True
+        except OSError:
+            # not a character device, e.g. a file or pipe of recorded events
+            self.is_gamepad = False
+            self.is_event_device = False
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+    def read(self):
+        """
+        Decodes the available events, returning True when a completed input frame
+        changed the state and None at the end of a file or pipe.
+        """
+        data = os.read(self.fd, EVENT.size * 64)
+        if not data:
+            return None
+        data = self._buffer + data
+        complete = len(data) - len(data) % EVENT.size
+        self._buffer = data[complete:]
+
+        frame_completed = False
+        for (seconds, microseconds, event_type, code, value) in EVENT.iter_unpack(data[0:complete]):
+            if event_type == EV_SYN:
+                if code == SYN_DROPPED:
+                    # the kernel buffer overran, ignore events until the next report
+                    self._dropped = True
+                elif code == SYN_REPORT:
+                    if self._dropped:
+                        self._dropped = False
+                    elif self.changed:
+                        self.source_time = seconds * 1000 + microseconds / 1000
+                        frame_completed = True
+            elif self._dropped:
+                continue
+            elif event_type == EV_KEY:
+                name = KEY_FIELDS.get(code)
+                if name is not None and not (self.analog_triggers and name in ('buttonL2', 'buttonR2')):
+                    self._setValue(name, 1.0 if value else 0.0)
+            elif event_type == EV_ABS:
+                if code in ABS_HATS:
+                    (negative, positive) = ABS_HATS[code]
+                    self._setValue(negative, 1.0 if value < 0 else 0.0)
+                    self._setValue(positive, 1.0 if value > 0 else 0.0)
+                else:
+                    self._setAxis(code, value)
+        return frame_completed
+
+    def _setAxis(self, axis: int, value: int):
+        if axis in ABS_STICKS:
+            (minimum, maximum) = self.ranges.get(axis, DEFAULT_STICK_RANGE)
+            self._setValue(ABS_STICKS[axis], max(-1.0, min(1.0, 2.0 * (value - minimum) / (maximum - minimum) - 1.0)))
+        elif axis in ABS_TRIGGERS:
+            (minimum, maximum) = self.ranges.get(axis, DEFAULT_TRIGGER_RANGE)
+            self._setValue(ABS_TRIGGERS[axis], max(0.0, min(1.0, (value - minimum) / (maximum - minimum))))
+
+    def _setValue(self, name: str, value: float):
+        index = FIELD_INDEX[name]
+        if self.values[index] != value:
+            self.values[index] = value
+            self.changed = True
+
+class GamepadEvdevBackend(GamepadThreadedInputBackend):
+    """
+    Input backend reading Linux event devices on a background thread, input frames
+    being coalesced per device.
+
+    Explicit paths (e.g. a file or pipe of events written with packEvent()) can be
+    given instead of scanning /dev/input for gamepads. The thread sleeps until
+    events arrive or the next scan is due, suspension slowing down scans.
+    """
+
+    name = 'evdev'
+
+    # seconds between scans for plugged or unplugged devices
+    SCAN_INTERVAL = 2.0
+    SUSPENDED_SCAN_INTERVAL = 10.0
+    # seconds waited when files or pipes have no more events to read
+    FILE_POLL_INTERVAL = 0.01
+
+    def __init__(self, device_manager, parent: QObject = None, paths: list = None):
+        super(GamepadEvdevBackend, self).__init__(device_manager, parent)
+        self.paths = paths
+        self._devices = {}
+        self._failed_paths = set()
+        self._stopping = threading.Event()
+        self._thread = None
+        # written to interrupt the thread's wait for events
+        self._wake_pipe = None
+
+    @staticmethod
+    def isSupported():
+        return sys.platform.startswith('linux') and _FCNTL_SUPPORT and os.path.isdir('/dev/input')
+
+    @staticmethod
+    def hasDevices():
+        # joystick nodes and udev joystick links exist for gamepads, no device is opened
+        return bool(glob.glob('/dev/input/js*') or glob.glob('/dev/input/by-id/*-event-joystick'))
+
+    def start(self):
+        """
+        Opens the gamepads plugged in and starts reading them, the backend staying
+        inactive when gamepads are plugged in but none of them can be opened.
+        """
+        if self._thread is not None:
+            return
+        self._scan()
+        if not self._devices and self.paths is None and self.hasDevices():
+            QgsMessageLog.logMessage('No gamepad event device could be opened, check the read permissions of /dev/input/event*', 'GamepadNavigation', Qgis.Warning)
+            self._failed_paths = set()
+            self._clearQueue()
+            return
+        self._stopping.clear()
+        self._wake_pipe = os.pipe()
+        os.set_blocking(self._wake_pipe[0], False)
+        self._thread = threading.Thread(target=self._run, name='GamepadEvdevBackend', daemon=True)
+        self._thread.start()
+        super(GamepadEvdevBackend, self).start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        for fd in self._wake_pipe:
+            os.close(fd)
+        self._wake_pipe = None
+        for device in self._devices.values():
+            device.close()
+            self.device_manager.setConnected(device.device_id, False)
+        self._devices = {}
+        self._failed_paths = set()
+        self._clearQueue()
+        super(GamepadEvdevBackend, self).stop()
+
+    def setSuspended(self, suspended: bool):
+        super(GamepadEvdevBackend, self).setSuspended(suspended)
+        if self._thread is not None:
+            # let the thread pick up the scan interval
+            self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_pipe[1], b'\0')
+        except OSError:
+            pass
+
+    def _run(self):
+        # start() scanned already
+        last_scan = time.monotonic()
+        while not self._stopping.is_set():
+            scan_interval = self.SUSPENDED_SCAN_INTERVAL if self._suspended else self.SCAN_INTERVAL
+            if time.monotonic() >= last_scan + scan_interval:
+                self._scan()
+                last_scan = time.monotonic()
+
+            devices = {device.fd: device for device in self._devices.values()}
+            timeout = max(0.0, last_scan + scan_interval - time.monotonic())
+            (readable, writable, exceptional) = select.select([self._wake_pipe[0]] + list(devices.keys()), [], [], timeout)
+            if self._wake_pipe[0] in readable:
+                readable.remove(self._wake_pipe[0])
+                try:
+                    os.read(self._wake_pipe[0], 64)
+                except OSError:
+                    pass
+            exhausted = 0
+            for fd in readable:
+                device = devices[fd]
+                try:
+                    frame_completed = device.read()
+                except OSError as error:
+                    if error.errno == errno.EAGAIN:
+                        continue
+                    self._close(device)
+                    continue
+                if frame_completed is None:
+                    exhausted += 1
+                elif frame_completed:
+                    device.changed = False
+                    if self._suspended and not significantChange(device.values, device.delivered):
+                        continue
+                    device.delivered = list(device.values)
+                    self._queue(device.device_id, state=(list(device.values), device.source_time))
+            if readable and exhausted == len(readable):
+                # files and pipes stay readable at their end, wait for more events
+                self._stopping.wait(self.FILE_POLL_INTERVAL)
+
+    def _scan(self):
+        if self.paths is not None:
+            paths = [(path, index) for (index, path) in enumerate(self.paths)]
+        else:
+            paths = []
+            for path in glob.glob('/dev/input/event*'):
+                match = re.search(r'event(\d+)$', path)
+                if match:
+                    paths.append((path, int(match.group(1))))
+
+        for (path, device_id) in paths:
+            if path in self._devices or path in self._failed_paths:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError:
+                # most likely a device the user has no permission to read
+                self._failed_paths.add(path)
+                continue
+            device = GamepadEvdevDevice(path, device_id, fd)
+            if not device.is_gamepad and (self.paths is None or device.is_event_device):
+                device.close()
+                self._failed_paths.add(path)
+                continue
+            self._devices[path] = device
+            self._queue(device_id, connected=True)
+            self._queue(device_id, state=(list(device.values), 0.0))
+
+        # devices unplugged since the previous scan are retried when they reappear
+        self._failed_paths = set(path for path in self._failed_paths if os.path.exists(path))
+
+    def _close(self, device: GamepadEvdevDevice):
+        device.close()
+        self._devices.pop(device.path, None)
+        self._queue(device.device_id, connected=False)
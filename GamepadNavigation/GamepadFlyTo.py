@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Fly To
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsMapRendererParallelJob, QgsMapSettings, QgsRectangle
+from qgis.gui import QgsMapCanvas
+
+from GamepadNavigation.GamepadCanvasPreview import GamepadPreviewItem, mapImage
+from GamepadNavigation.GamepadRenderCache import GamepadRenderCache, renderContext
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QEasingCurve, QObject, QVariantAnimation
+
+def destinationSettings(settings: QgsMapSettings, extent: QgsRectangle):
+    """
+    Returns a copy of the map settings showing the given extent.
+    """
+    destination = QgsMapSettings(settings)
+    destination.setExtent(extent)
+    return destination
+
+def interpolateExtent(start: QgsRectangle, end: QgsRectangle, t: float):
+    """
+    Returns the extent at ratio t of a flight from start to end, the center moving
+    linearly and the size geometrically so zooming appears at a constant pace.
+    """
+    center_x = start.center().x() + (end.center().x() - start.center().x()) * t
+    center_y = start.center().y() + (end.center().y() - start.center().y()) * t
+    width = pow(start.width(), 1 - t) * pow(end.width(), t)
+    height = pow(start.height(), 1 - t) * pow(end.height(), t)
+    return QgsRectangle(center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2)
+
+class GamepadFlyTo(QObject):
+    """
+    Animates a frozen 2D canvas to a destination extent, painting intermediate frames
+    from cached or scaled imagery while the destination renders in the background.
+    Destinations can also be pre-rendered into the render cache ahead of time.
+    """
+
+    DEFAULT_DURATION = 600
+
+    def __init__(self, cache: GamepadRenderCache, parent: QObject = None):
+        super(GamepadFlyTo, self).__init__(parent)
+        self.cache = cache
+        self.canvas = None
+        self.item = None
+        self.job = None
+        self.start_extent = None
+        self.destination = None
+        self.animation = QVariantAnimation(self)
+        self.animation.setStartValue(0.0)
+        self.animation.setEndValue(1.0)
+        self.animation.setEasingCurve(QEasingCurve.InOutCubic)
+        self.animation.valueChanged.connect(self.step)
+        self.animation.finished.connect(self.finish)
+
+        self._prerender_canvas = None
+        self._prerender_queue = []
+        self._prerender_job = None
+
+    def isActive(self):
+        return self.canvas is not None
+
+    def start(self, canvas: QgsMapCanvas, extent: QgsRectangle, duration: int = DEFAULT_DURATION):
+        # an interrupted flight's frame is the first frame, else the canvas' map content alone
+        if canvas is self.canvas and self.item is not None and not sip.isdeleted(self.item) and self.item.image is not None:
+            (image, image_settings) = (self.item.image, self.item.settings)
+        else:
+            (image, image_settings) = (None, None)
+        self.stop(canvas is not self.canvas)
+
+        self.canvas = canvas
+        self.canvas.stopRendering()
+        self.canvas.freeze(True)
+        settings = self.canvas.mapSettings()
+        self.start_extent = settings.visibleExtent()
+        self.destination = destinationSettings(settings, extent)
+
+        self.item = GamepadPreviewItem(self.canvas)
+        if image is None:
+            (image, image_settings) = (mapImage(self.canvas), settings)
+        self.item.setImage(image, image_settings)
+        self.renderDestination()
+
+        self.animation.setDuration(duration)
+        self.animation.start()
+
+    def renderDestination(self):
+        if self.cache is not None and self.cache.match(renderContext(self.destination), self.destination, 0.99) is not None:
+            return
+
+        self.job = QgsMapRendererParallelJob(self.destination)
+        self.job.finished.connect(self.renderFinished)
+        self.job.start()
+
+    def renderFinished(self):
+        job = self.job
+        self.job = None
+        if self.cache is not None:
+            self.cache.insert(renderContext(job.mapSettings()), job.mapSettings(), job.renderedImage())
+        job.deleteLater()
+
+    def step(self, t: float):
+        if self.canvas is None:
+            return
+        if sip.isdeleted(self.canvas):
+            self.stop()
+            return
+
+        self.canvas.setExtent(interpolateExtent(self.start_extent, self.destination.visibleExtent(), t))
+        if self.cache is not None:
+            settings = self.canvas.mapSettings()
+            entry = self.cache.match(renderContext(settings), settings)
+            if entry is not None and entry[0] is not self.item.settings:
+                self.item.setImage(entry[1], entry[0])
+        self.item.update()
+
+    def finish(self):
+        if self.canvas is None:
+            return
+        if not sip.isdeleted(self.canvas):
+            self.canvas.setExtent(self.destination.extent())
+        self.stop()
+
+    def stop(self, restore: bool = True):
+        """
+        Ends the flight where the canvas currently is. When restoring, the canvas is
+        unfrozen and refreshed, the last frame remaining visible until refreshed.
+        """
+        if self.animation.state() == QVariantAnimation.Running:
+            self.animation.finished.disconnect(self.finish)
+            self.animation.stop()
+            self.animation.finished.connect(self.finish)
+
+        if self.job is not None:
+            # let the cancelled job wind down in its own time rather than blocking
+            self.job.finished.disconnect(self.renderFinished)
+            self.job.finished.connect(self.job.deleteLater)
+            sip.transferto(self.job, None)
+            self.job.cancelWithoutBlocking()
+            self.job = None
+
+        if self.canvas is None:
+            return
+
+        canvas = self.canvas
+        item = self.item
+        self.canvas = None
+        self.item = None
+        if sip.isdeleted(canvas):
+            return
+        if not restore:
+            if not sip.isdeleted(item):
+                canvas.scene().removeItem(item)
+            return
+
+        # display the destination from cache while the canvas refreshes
+        settings = canvas.mapSettings()
+        if self.cache is not None and not sip.isdeleted(item):
+            entry = self.cache.match(renderContext(settings), settings, 0.99)
+            if entry is not None:
+                item.setImage(entry[1], entry[0])
+
+        def refreshed():
+            canvas.mapCanvasRefreshed.disconnect(refreshed)
+            if not sip.isdeleted(item):
+                canvas.scene().removeItem(item)
+
+        canvas.mapCanvasRefreshed.connect(refreshed)
+        canvas.freeze(False)
+        canvas.refresh()
+
+    def prerender(self, canvas: QgsMapCanvas, extents: list):
+        """
+        Renders the given destination extents of the canvas into the render cache one
+        after the other, once the canvas is done with its own rendering.
+        """
+        self.cancelPrerender()
+        if self.cache is None or not extents:
+            return
+
+        self._prerender_canvas = canvas
+        self._prerender_queue = list(extents)
+        if canvas.isDrawing():
+            canvas.mapCanvasRefreshed.connect(self.prerenderNext)
+        else:
+            self.prerenderNext()
+
+    def prerenderNext(self):
+        canvas = self._prerender_canvas
+        if canvas is None or sip.isdeleted(canvas):
+            self.cancelPrerender()
+            return
+        try:
+            canvas.mapCanvasRefreshed.disconnect(self.prerenderNext)
+        except TypeError:
+            pass
+
+        while self._prerender_queue:
+            settings = destinationSettings(canvas.mapSettings(), self._prerender_queue.pop(0))
+            if self.cache.match(renderContext(settings), settings, 0.99) is not None:
+                continue
+            self._prerender_job = QgsMapRendererParallelJob(settings)
+            self._prerender_job.finished.connect(self.prerenderFinished)
+            self._prerender_job.start()
+            return
+
+    def prerenderFinished(self):
+        job = self._prerender_job
+        self._prerender_job = None
+        self.cache.insert(renderContext(job.mapSettings()), job.mapSettings(), job.renderedImage())
+        job.deleteLater()
+        self.prerenderNext()
+
+    def cancelPrerender(self):
+        if self._prerender_job is not None:
+            self._prerender_job.finished.disconnect(self.prerenderFinished)
+            self._prerender_job.finished.connect(self._prerender_job.deleteLater)
+            sip.transferto(self._prerender_job, None)
+            self._prerender_job.cancelWithoutBlocking()
+            self._prerender_job = None
+
+        canvas = self._prerender_canvas
+        if canvas is not None and not sip.isdeleted(canvas):
+            try:
+                canvas.mapCanvasRefreshed.disconnect(self.prerenderNext)
+            except TypeError:
+                pass
+        self._prerender_queue = []
+        self._prerender_canvas = None
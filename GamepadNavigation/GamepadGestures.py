@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Gestures
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+import time
+
+from GamepadNavigation.GamepadBridge import BUTTONS, GamepadBridge
+
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QObject, QTimer
+
+# gestures of a single button, besides a plain press
+GESTURES = ['long', 'double', 'repeat']
+
+def chordName(modifier: str, button: str):
+    return 'chord_{}_{}'.format(modifier, button)
+
+def gestureName(button: str, gesture: str = ''):
+    """
+    Returns the mapping name of a button gesture: the button name for a plain press,
+    e.g. 'buttonA_long' for a button gesture or 'chord_buttonL1_buttonA' for a chord
+    gesture given as 'chord:buttonL1', pressing A while holding L1.
+    """
+    if not gesture:
+        return button
+    if gesture.startswith('chord:'):
+        return chordName(gesture[len('chord:'):], button)
+    return '{}_{}'.format(button, gesture)
+
+# every mappable gesture name
+GESTURE_NAMES = (BUTTONS
+                 + [gestureName(button, gesture) for button in BUTTONS for gesture in GESTURES]
+                 + [chordName(modifier, button) for modifier in BUTTONS for button in BUTTONS if modifier != button])
+
+class GamepadButtonGesture:
+    """
+    Recognition state of a single button, its pending timeouts being deadlines in seconds.
+    """
+
+    def __init__(self):
+        self.down = False
+        self.press_time = 0.0
+        # the press was turned into a chord or double press, its release is ignored
+        self.consumed = False
+        # a plain press waiting for its release or for the double press window to expire
+        self.press_pending = False
+        self.awaiting_double = False
+        self.hold_deadline = None
+        self.double_deadline = None
+        self.repeat_deadline = None
+
+    def stopTimers(self):
+        self.hold_deadline = None
+        self.double_deadline = None
+        self.repeat_deadline = None
+
+    def reset(self, down: bool):
+        self.stopTimers()
+        self.down = down
+        self.consumed = False
+        self.press_pending = False
+        self.awaiting_double = False
+
+class GamepadGestureMachine:
+    """
+    Recognizer of long presses, double presses, hold repeats and chords (a button
+    pressed while holding a modifier button) driven by button edges and timestamps
+    in seconds, each step returning the names of the gestures it recognized.
+
+    Only mapped gestures are recognized. A plain press is reported on the press itself
+    unless the button has a long or double press mapped or modifies a mapped chord,
+    in which case it is reported once the gesture is ruled out.
+    """
+
+    def __init__(self, long_press: int = 500, double_press: int = 250, repeat_interval: int = 100):
+        self.setTimings(long_press, double_press, repeat_interval)
+        self._mapped = set()
+        self._modifiers = set()
+        self._buttons = {button: GamepadButtonGesture() for button in BUTTONS}
+
+    def reset(self, down=()):
+        """
+        Drops pending gestures, the given buttons being held down.
+        """
+        for (button, state) in self._buttons.items():
+            state.reset(button in down)
+
+    def setTimings(self, long_press: int, double_press: int, repeat_interval: int):
+        """
+        Sets the long press and double press delays and the repeat interval, in milliseconds.
+        """
+        self.long_press = long_press / 1000
+        self.double_press = double_press / 1000
+        self.repeat_interval = max(1, repeat_interval) / 1000
+
+    def setMapped(self, names):
+        self._mapped = set(names)
+        self._modifiers = set(name.split('_')[1] for name in self._mapped if name.startswith('chord_'))
+
+    def isDeferred(self, button: str):
+        return (button in self._modifiers
+                or gestureName(button, 'long') in self._mapped
+                or gestureName(button, 'double') in self._mapped)
+
+    def nextDeadline(self):
+        """
+        Returns the time advance() must next be called at, None when nothing is pending.
+        """
+        deadlines = [deadline for state in self._buttons.values()
+                     for deadline in (state.hold_deadline, state.double_deadline, state.repeat_deadline) if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def press(self, button: str, now: float):
+        state = self._buttons[button]
+        state.down = True
+        state.press_time = now
+
+        # a press while holding a modifier forms a chord, the modifier's own press is dropped
+        for modifier in self._modifiers:
+            if modifier != button and self._buttons[modifier].down and chordName(modifier, button) in self._mapped:
+                modifier_state = self._buttons[modifier]
+                modifier_state.stopTimers()
+                modifier_state.press_pending = False
+                modifier_state.consumed = True
+                state.consumed = True
+                return [chordName(modifier, button)]
+
+        if state.awaiting_double:
+            state.double_deadline = None
+            state.awaiting_double = False
+            state.press_pending = False
+            state.consumed = True
+            return [gestureName(button, 'double')]
+
+        gestures = []
+        state.consumed = False
+        state.press_pending = self.isDeferred(button)
+        if not state.press_pending:
+            gestures.append(button)
+
+        if gestureName(button, 'long') in self._mapped or gestureName(button, 'repeat') in self._mapped:
+            state.hold_deadline = now + self.long_press
+        return gestures
+
+    def release(self, button: str, now: float):
+        state = self._buttons[button]
+        state.down = False
+        state.hold_deadline = None
+        state.repeat_deadline = None
+        if state.consumed:
+            state.consumed = False
+            return []
+        if not state.press_pending:
+            return []
+
+        # timestamps catch long presses whose deadline was held up by a busy event loop
+        if gestureName(button, 'long') in self._mapped and now - state.press_time >= self.long_press:
+            state.press_pending = False
+            return [gestureName(button, 'long')]
+        elif gestureName(button, 'double') in self._mapped:
+            state.awaiting_double = True
+            state.double_deadline = now + self.double_press
+            return []
+        state.press_pending = False
+        return [button]
+
+    def advance(self, now: float):
+        """
+        Fires the deadlines reached by now, in time order.
+        """
+        gestures = []
+        while True:
+            deadline = self.nextDeadline()
+            if deadline is None or deadline > now:
+                return gestures
+            for (button, state) in self._buttons.items():
+                if state.hold_deadline == deadline:
+                    state.hold_deadline = None
+                    gestures.extend(self._held(button, state, now))
+                elif state.repeat_deadline == deadline:
+                    # repeats missed by a busy event loop are skipped rather than caught up
+                    state.repeat_deadline = deadline + self.repeat_interval if deadline + self.repeat_interval > now else now + self.repeat_interval
+                    gestures.append(gestureName(button, 'repeat'))
+                elif state.double_deadline == deadline:
+                    state.double_deadline = None
+                    state.awaiting_double = False
+                    if state.press_pending:
+                        state.press_pending = False
+                        gestures.append(button)
+
+    def _held(self, button: str, state: GamepadButtonGesture, now: float):
+        if not state.down or state.consumed:
+            return []
+        gestures = []
+        if gestureName(button, 'long') in self._mapped:
+            state.press_pending = False
+            state.consumed = True
+            gestures.append(gestureName(button, 'long'))
+        if gestureName(button, 'repeat') in self._mapped:
+            state.repeat_deadline = now + self.repeat_interval
+            gestures.append(gestureName(button, 'repeat'))
+        return gestures
+
+class GamepadGestureRecognizer(QObject):
+    """
+    Recognizes gestures on a bridge's button edges through a GamepadGestureMachine,
+    a single timer firing at its next deadline.
+    """
+
+    DEFAULT_LONG_PRESS = 500
+    DEFAULT_DOUBLE_PRESS = 250
+    DEFAULT_REPEAT_INTERVAL = 100
+
+    gestureRecognized = pyqtSignal(str)
+
+    def __init__(self, bridge: GamepadBridge, parent: QObject = None):
+        super(GamepadGestureRecognizer, self).__init__(parent)
+        self.bridge = bridge
+        self.machine = GamepadGestureMachine(self.DEFAULT_LONG_PRESS, self.DEFAULT_DOUBLE_PRESS, self.DEFAULT_REPEAT_INTERVAL)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.timeout)
+
+        self.bridge.buttonPressed.connect(self.pressed)
+        self.bridge.buttonReleased.connect(self.released)
+
+    def unload(self):
+        self.bridge.buttonPressed.disconnect(self.pressed)
+        self.bridge.buttonReleased.disconnect(self.released)
+        self.reset()
+
+    def reset(self):
+        state = self.bridge.state()
+        self.machine.reset([button for button in BUTTONS if getattr(state, button)])
+        self.timer.stop()
+
+    def setTimings(self, long_press: int, double_press: int, repeat_interval: int):
+        """
+        Sets the long press and double press delays and the repeat interval, in milliseconds.
+        """
+        self.machine.setTimings(long_press, double_press, repeat_interval)
+
+    def setMapped(self, names):
+        self.machine.setMapped(names)
+        self.reset()
+
+    def isDeferred(self, button: str):
+        return self.machine.isDeferred(button)
+
+    def pressed(self, button: str):
+        self.recognized(self.machine.press(button, self.bridge.state().timestamp))
+
+    def released(self, button: str):
+        self.recognized(self.machine.release(button, self.bridge.state().timestamp))
+
+    def timeout(self):
+        self.recognized(self.machine.advance(time.perf_counter()))
+
+    def recognized(self, gestures):
+        for gesture in gestures:
+            self.gestureRecognized.emit(gesture)
+
+        deadline = self.machine.nextDeadline()
+        if deadline is None:
+            self.timer.stop()
+        else:
+            self.timer.start(max(0, math.ceil((deadline - time.perf_counter()) * 1000)))
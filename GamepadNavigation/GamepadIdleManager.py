@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Idle Manager
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import time
+
+from qgis.PyQt.QtCore import pyqtSignal, QObject, QTimer
+
+class GamepadIdleManager(QObject):
+    """
+    Suspends the input backend once no input was reported for a while, the next
+    significant state or device connection waking it up. Keeps track of the time
+    spent active and idle.
+    """
+
+    # seconds without input before suspending, 0 never suspends
+    DEFAULT_TIMEOUT = 60
+
+    idleChanged = pyqtSignal(bool)
+
+    def __init__(self, device_manager, backend=None, timeout: float = DEFAULT_TIMEOUT, is_busy=None, parent: QObject = None):
+        super(GamepadIdleManager, self).__init__(parent)
+        self.device_manager = device_manager
+        self.backend = backend
+        self.timeout = timeout
+        # returns whether suspending must wait, e.g. while navigating
+        self.is_busy = is_busy
+
+        self._idle = False
+        self._last_activity = time.monotonic()
+        self._since = self._last_activity
+        self._active_time = 0.0
+        self._idle_time = 0.0
+        self._suspensions = 0
+
+        # restarted on expiry rather than on every input frame
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._timeout)
+        self.device_manager.activity.connect(self.activity)
+        self._startTimer(self.timeout)
+
+    def unload(self):
+        self.timer.stop()
+        self.device_manager.activity.disconnect(self.activity)
+        if self._idle:
+            self.setIdle(False)
+
+    def isIdle(self):
+        return self._idle
+
+    def activity(self):
+        self._last_activity = time.monotonic()
+        if self._idle:
+            self.setIdle(False)
+
+    def setIdle(self, idle: bool):
+        if idle == self._idle:
+            return
+
+        now = time.monotonic()
+        if self._idle:
+            self._idle_time += now - self._since
+        else:
+            self._active_time += now - self._since
+        self._since = now
+        self._idle = idle
+
+        if idle:
+            self._suspensions += 1
+        else:
+            self._startTimer(self.timeout)
+        if self.backend is not None:
+            self.backend.setSuspended(idle)
+        self.idleChanged.emit(idle)
+
+    def dutyCycle(self):
+        """
+        Returns the (active, idle) seconds elapsed since creation.
+        """
+        elapsed = time.monotonic() - self._since
+        if self._idle:
+            return (self._active_time, self._idle_time + elapsed)
+        return (self._active_time + elapsed, self._idle_time)
+
+    def report(self):
+        (active_time, idle_time) = self.dutyCycle()
+        total = max(active_time + idle_time, 1e-9)
+        lines = ['Idle state: {}'.format('idle, input suspended' if self._idle else 'active'),
+                 'Suspends after: {}'.format('{:g} s without input'.format(self.timeout) if self.timeout > 0 else 'never'),
+                 'Duty cycle: active {:.0f} s ({:.1f} %), idle {:.0f} s ({:.1f} %), {} suspensions'.format(
+                     active_time, active_time / total * 100, idle_time, idle_time / total * 100, self._suspensions)]
+        return '\n'.join(lines)
+
+    def _startTimer(self, seconds: float):
+        if self.timeout > 0:
+            self.timer.start(int(seconds * 1000) + 1)
+
+    def _timeout(self):
+        remaining = self._last_activity + self.timeout - time.monotonic()
+        if remaining > 0:
+            self._startTimer(remaining)
+        elif self.is_busy is not None and self.is_busy():
+            self._startTimer(self.timeout)
+        else:
+            self.setIdle(True)
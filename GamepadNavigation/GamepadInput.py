@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Input
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import threading
+
+from qgis.core import Qgis, QgsMessageLog
+
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QObject
+
+# names of the input backends, in the order 'auto' tries them
+BACKENDS = ['evdev', 'qtgamepad']
+# smallest change of a state value waking a suspended backend
+WAKE_THRESHOLD = 0.1
+
+def significantChange(values, previous, threshold: float = WAKE_THRESHOLD):
+    """
+    Returns whether a state value moved by at least threshold, ignoring analog jitter.
+    """
+    return any(abs(value - previous_value) >= threshold for (value, previous_value) in zip(values, previous))
+
+class GamepadInputBackend(QObject):
+    """
+    Source of gamepad input, reporting device connections and whole device states
+    to a GamepadDeviceManager through its setConnected() and setState() slots.
+
+    A suspended backend keeps reporting connections but only reports states moving
+    a value by at least WAKE_THRESHOLD, sparing the UI thread from analog jitter, and
+    may lower its own polling.
+    """
+
+    name = ''
+
+    def __init__(self, device_manager, parent: QObject = None):
+        super(GamepadInputBackend, self).__init__(parent)
+        self.device_manager = device_manager
+        self._active = False
+        self._suspended = False
+
+    @staticmethod
+    def isSupported():
+        return False
+
+    @staticmethod
+    def hasDevices():
+        """
+        Returns whether a gamepad is plugged in, checked cheaply without starting the
+        backend, or None when the backend cannot tell before being started.
+        """
+        return None
+
+    def isActive(self):
+        return self._active
+
+    def start(self):
+        self._active = True
+
+    def stop(self):
+        self._active = False
+
+    def isSuspended(self):
+        return self._suspended
+
+    def setSuspended(self, suspended: bool):
+        self._suspended = suspended
+
+class GamepadThreadedInputBackend(GamepadInputBackend):
+    """
+    Input backend reading its input on a background thread. Connections and states
+    are queued from the thread, states being coalesced per device so the UI thread
+    only receives the latest state of each device once per event loop iteration.
+    """
+
+    _delivery = pyqtSignal()
+
+    def __init__(self, device_manager, parent: QObject = None):
+        super(GamepadThreadedInputBackend, self).__init__(device_manager, parent)
+        self._lock = threading.Lock()
+        self._states = {}
+        self._connections = []
+        self._delivery_pending = False
+        self._delivery.connect(self._deliver, Qt.QueuedConnection)
+
+    def _clearQueue(self):
+        with self._lock:
+            self._states = {}
+            self._connections = []
+
+    def _queue(self, device_id: int, connected: bool = None, state: tuple = None):
+        with self._lock:
+            if connected is not None:
+                self._connections.append((device_id, connected))
+                if not connected:
+                    self._states.pop(device_id, None)
+            if state is not None:
+                self._states[device_id] = state
+            schedule = not self._delivery_pending
+            self._delivery_pending = True
+        if schedule:
+            self._delivery.emit()
+
+    def _deliver(self):
+        with self._lock:
+            (connections, self._connections) = (self._connections, [])
+            (states, self._states) = (self._states, {})
+            self._delivery_pending = False
+        for (device_id, connected) in connections:
+            self.device_manager.setConnected(device_id, connected)
+        for (device_id, (values, source_time)) in states.items():
+            self.device_manager.setState(device_id, values, source_time)
+
+def inputBackendClass(name: str):
+    # backends are imported on demand, the QtGamepad one pulls in QtQuick
+    if name == 'evdev':
+        from GamepadNavigation.GamepadEvdevBackend import GamepadEvdevBackend
+        return GamepadEvdevBackend
+    elif name == 'qtgamepad':
+        from GamepadNavigation.GamepadQtGamepadBackend import GamepadQtGamepadBackend
+        return GamepadQtGamepadBackend
+    return None
+
+def selectInputBackend(name: str, excluded: list = ()):
+    """
+    Returns the class of the named input backend, 'auto' picking the first supported
+    one, falling back to other backends when the named one is not supported or is
+    excluded. Returns None when no backend is supported.
+    """
+    names = BACKENDS if name == 'auto' else [name] + [backend for backend in BACKENDS if backend != name]
+    for backend_name in names:
+        if backend_name in excluded:
+            continue
+        backend_class = inputBackendClass(backend_name)
+        if backend_class is not None and backend_class.isSupported():
+            if name not in ('auto', backend_name):
+                QgsMessageLog.logMessage('Gamepad input backend \'{}\' is not available, falling back to \'{}\''.format(name, backend_name), 'GamepadNavigation', Qgis.Warning)
+            return backend_class
+    return None
+
+def startInputBackend(name: str, device_manager, parent: QObject = None):
+    """
+    Creates and starts the named input backend as selectInputBackend() picks it,
+    falling back to the next one when a backend fails to start, e.g. evdev when the
+    event devices of plugged gamepads cannot be read. Returns None when no backend
+    could be started.
+    """
+    failed = []
+    backend_class = selectInputBackend(name)
+    while backend_class is not None:
+        backend = backend_class(device_manager, parent)
+        backend.start()
+        if backend.isActive():
+            return backend
+        backend.deleteLater()
+        failed.append(backend_class.name)
+        backend_class = selectInputBackend(name, failed)
+    return None
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Instrumentation
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+from qgis.core import Qgis, QgsMessageLog
+
+_FRAME_ACTION_SUPPORT = True
+try:
+    from PyQt5.Qt3DLogic import QFrameAction
+except:
+    _FRAME_ACTION_SUPPORT = False
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QEvent, QObject
+
+class GamepadHistogram:
+    """
+    Rolling window of the most recent samples of a measurement, in seconds.
+    """
+
+    def __init__(self, size: int = 1000):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, value: float):
+        self._samples.append(value)
+
+    def clear(self):
+        self._samples.clear()
+
+    def percentile(self, percentile: float):
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))]
+
+class GamepadStartupTimings:
+    """
+    Time spent in each plugin startup stage, separating the stages adding to the QGIS
+    launch from the ones deferred until after it or until first use.
+    """
+
+    def __init__(self):
+        # (stage, seconds, deferred) tuples, in the order stages completed
+        self.stages = []
+
+    def add(self, stage: str, seconds: float, deferred: bool = False):
+        self.stages.append((stage, seconds, deferred))
+
+    @contextmanager
+    def measure(self, stage: str, deferred: bool = False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, deferred)
+
+    def launchTime(self):
+        return sum(seconds for (stage, seconds, deferred) in self.stages if not deferred)
+
+    def report(self):
+        lines = ['{:<36} {:>8} {:>8}'.format('Startup stage (ms)', 'time', 'launch')]
+        for (stage, seconds, deferred) in self.stages:
+            lines.append('{:<36} {:>8.2f} {:>8}'.format(stage, seconds * 1000, 'no' if deferred else 'yes'))
+        lines.append('{:<36} {:>8.2f}'.format('Added to QGIS launch (total)', self.launchTime() * 1000))
+        return '\n'.join(lines)
+
+    def logReport(self):
+        QgsMessageLog.logMessage(self.report(), 'GamepadNavigation', Qgis.Info)
+
+class GamepadLatencyMonitor(QObject):
+    """
+    Measures the latency of each stage of the input to display pipeline: the QtGamepad
+    change reaching the bridge, the navigation tick consuming it, the canvas or camera
+    update applying it and the canvas paint or 3D frame displaying it.
+    """
+
+    STAGES = [
+        ('source_to_bridge', 'QtGamepad change to bridge'),
+        ('bridge_to_tick', 'Bridge to navigation tick'),
+        ('tick_to_apply', 'Navigation tick to canvas update'),
+        ('apply_to_display', 'Canvas update to display'),
+        ('input_to_display', 'Input to display (total)'),
+    ]
+
+    def __init__(self, parent: QObject = None):
+        super(GamepadLatencyMonitor, self).__init__(parent)
+        self.enabled = False
+        self.histograms = {stage: GamepadHistogram() for (stage, label) in self.STAGES}
+
+        self._last_sequence = -1
+        self._ticked = None
+        self._applied = None
+        self._canvas = None
+        self._frame_action = None
+        self._camera_controller = None
+
+    def setEnabled(self, enabled: bool):
+        self.enabled = enabled
+        self._ticked = None
+        self._applied = None
+
+    def clear(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+
+    def watch(self, canvas_type: str, canvas):
+        """
+        Starts listening to the displays of a 2D canvas or a 3D scene.
+        """
+        self.unwatch()
+        self._canvas = canvas
+        if canvas_type == '2d':
+            canvas.viewport().installEventFilter(self)
+        elif _FRAME_ACTION_SUPPORT:
+            self._frame_action = QFrameAction()
+            self._frame_action.triggered.connect(self.markDisplayed)
+            canvas.addComponent(self._frame_action)
+        else:
+            # without Qt3DLogic, the camera change is the closest observable display event
+            self._camera_controller = canvas.cameraController()
+            self._camera_controller.cameraChanged.connect(self.markDisplayed)
+
+    def unwatch(self):
+        if self._canvas is None:
+            return
+        if not sip.isdeleted(self._canvas):
+            if self._frame_action is not None:
+                self._frame_action.triggered.disconnect(self.markDisplayed)
+                self._canvas.removeComponent(self._frame_action)
+            elif self._camera_controller is not None:
+                self._camera_controller.cameraChanged.disconnect(self.markDisplayed)
+            else:
+                self._canvas.viewport().removeEventFilter(self)
+        self._canvas = None
+        self._frame_action = None
+        self._camera_controller = None
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            self.markDisplayed()
+        return False
+
+    def markTick(self, state):
+        if not self.enabled or state.sequence == self._last_sequence:
+            return
+        now = time.perf_counter()
+        self._last_sequence = state.sequence
+        if state.source_delay > 0:
+            self.histograms['source_to_bridge'].add(state.source_delay)
+        self.histograms['bridge_to_tick'].add(now - state.timestamp)
+        self._ticked = (state, now)
+
+    def markApplied(self):
+        if not self.enabled or self._ticked is None:
+            return
+        now = time.perf_counter()
+        (state, ticked) = self._ticked
+        self._ticked = None
+        self.histograms['tick_to_apply'].add(now - ticked)
+        self._applied = (state, now)
+
+    def markDisplayed(self, *args):
+        if not self.enabled or self._applied is None:
+            return
+        now = time.perf_counter()
+        (state, applied) = self._applied
+        self._applied = None
+        self.histograms['apply_to_display'].add(now - applied)
+        self.histograms['input_to_display'].add(now - state.timestamp + state.source_delay)
+
+    def report(self):
+        lines = ['{:<36} {:>8} {:>8} {:>8} {:>8}'.format('Stage (ms)', 'p50', 'p95', 'p99', 'samples')]
+        for (stage, label) in self.STAGES:
+            histogram = self.histograms[stage]
+            lines.append('{:<36} {:>8.2f} {:>8.2f} {:>8.2f} {:>8}'.format(label,
+                                                                   histogram.percentile(50) * 1000,
+                                                                   histogram.percentile(95) * 1000,
+                                                                   histogram.percentile(99) * 1000,
+                                                                   len(histogram)))
+        return '\n'.join(lines)
+
+    def logReport(self):
+        QgsMessageLog.logMessage(self.report(), 'GamepadNavigation', Qgis.Info)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Linked Views
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsCoordinateTransform, QgsCsException, QgsPointXY, QgsProject, QgsVector3D
+
+from GamepadNavigation.GamepadViewTransform import GamepadViewTransform
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QObject, QElapsedTimer, QTimer
+
+def viewOf(canvas_type: str, canvas):
+    """
+    Returns the (center, crs, size, heading, pitch) of a 2D canvas' or a 3D scene's
+    view, the size being the canvas scale or the camera distance, the heading the
+    bearing of the view's up direction in degrees and the pitch None in 2D.
+    """
+    if canvas_type == '2d':
+        return (canvas.center(), canvas.mapSettings().destinationCrs(), canvas.scale(), -canvas.rotation(), None)
+    controller = canvas.cameraController()
+    center = canvas.mapSettings().worldToMapCoordinates(controller.lookingAtPoint())
+    return (QgsPointXY(center.x(), center.y()), canvas.mapSettings().crs(), controller.distance(), controller.yaw(), controller.pitch())
+
+def angleDifference(angle: float, other: float):
+    return (angle - other + 180) % 360 - 180
+
+def changeSignal(canvas_type: str, canvas):
+    return canvas.extentsChanged if canvas_type == '2d' else canvas.cameraController().cameraChanged
+
+class GamepadLinkedView:
+    """
+    A view following the primary view, keeping the scale ratio and heading offset
+    it had relative to the primary when it was last changed on its own.
+    """
+
+    def __init__(self, canvas_type: str, canvas, timer: QTimer):
+        self.canvas_type = canvas_type
+        self.canvas = canvas
+        self.timer = timer
+        self.elapsed = QElapsedTimer()
+        # the follower is busy rendering, updated once done
+        self.waiting = False
+        self.ratio = 1.0
+        self.heading_offset = 0.0
+        self.pitch_offset = 0.0
+        self.view_transform = GamepadViewTransform()
+        self.transform = None
+        # slots connected to the follower's signals, kept to disconnect them
+        self.slots = []
+
+class GamepadLinkedViews(QObject):
+    """
+    Mirrors the view of a primary 2D canvas or 3D scene to secondary canvases and
+    scenes. Updates are throttled and coalesced per follower: a follower is updated
+    at most once per interval from the primary's latest view, a 2D follower still
+    rendering being updated once done, so slow followers skip intermediate views
+    and never hold the primary back.
+    """
+
+    # milliseconds between two updates of a follower
+    DEFAULT_INTERVAL = 100
+    # smallest camera change applied to a 3D follower, relative to the camera distance and in degrees
+    MIN_CHANGE = 1e-4
+    MIN_ROTATION = 1e-3
+
+    def __init__(self, parent: QObject = None):
+        super(GamepadLinkedViews, self).__init__(parent)
+        self.interval = self.DEFAULT_INTERVAL
+        self.canvas_type = ''
+        self.canvas = None
+        self.followers = []
+        self._applying = False
+
+    def isLinked(self):
+        return self.canvas is not None
+
+    def link(self, canvas_type: str, canvas, followers: list):
+        """
+        Links (type, canvas) followers to a primary canvas, relationships being kept
+        when the primary and its followers are unchanged.
+        """
+        followers = [(follower_type, follower) for (follower_type, follower) in followers if follower is not None and follower is not canvas]
+        if canvas is self.canvas and followers == [(follower.canvas_type, follower.canvas) for follower in self.followers]:
+            return
+        self.unlink()
+        if canvas is None or not followers:
+            return
+
+        self.canvas_type = canvas_type
+        self.canvas = canvas
+        changeSignal(canvas_type, canvas).connect(self.primaryChanged)
+        canvas.destroyed.connect(self.unlink)
+        for (follower_type, follower_canvas) in followers:
+            follower = GamepadLinkedView(follower_type, follower_canvas, QTimer(self))
+            follower.timer.setSingleShot(True)
+            follower.timer.timeout.connect(lambda follower=follower: self.apply(follower))
+            follower.slots = [(changeSignal(follower_type, follower_canvas), lambda follower=follower: self.followerChanged(follower)),
+                              (follower_canvas.destroyed, lambda follower=follower: self.removeFollower(follower))]
+            if follower_type == '2d':
+                follower.slots.append((follower_canvas.mapCanvasRefreshed, lambda follower=follower: self.followerRefreshed(follower)))
+            for (signal, slot) in follower.slots:
+                signal.connect(slot)
+            self.followers.append(follower)
+            self.capture(follower)
+
+    def unlink(self):
+        if self.canvas is not None and not sip.isdeleted(self.canvas):
+            changeSignal(self.canvas_type, self.canvas).disconnect(self.primaryChanged)
+            self.canvas.destroyed.disconnect(self.unlink)
+        for follower in list(self.followers):
+            self.removeFollower(follower)
+        self.canvas_type = ''
+        self.canvas = None
+
+    def removeFollower(self, follower: GamepadLinkedView):
+        follower.timer.stop()
+        follower.timer.deleteLater()
+        if not sip.isdeleted(follower.canvas):
+            for (signal, slot) in follower.slots:
+                signal.disconnect(slot)
+        follower.slots = []
+        self.followers.remove(follower)
+
+    def capture(self, follower: GamepadLinkedView):
+        (center, crs, size, heading, pitch) = viewOf(self.canvas_type, self.canvas)
+        (follower_center, follower_crs, follower_size, follower_heading, follower_pitch) = viewOf(follower.canvas_type, follower.canvas)
+        follower.ratio = follower_size / size if size > 0 else 1.0
+        follower.heading_offset = angleDifference(follower_heading, heading)
+        follower.pitch_offset = follower_pitch - pitch if pitch is not None and follower_pitch is not None else 0.0
+
+    def primaryChanged(self):
+        for follower in self.followers:
+            self.schedule(follower)
+
+    def followerChanged(self, follower: GamepadLinkedView):
+        # changed on its own, e.g. with the mouse, the follower keeps its new relationship
+        if not self._applying and self.canvas is not None:
+            self.capture(follower)
+
+    def followerRefreshed(self, follower: GamepadLinkedView):
+        if follower.waiting:
+            follower.waiting = False
+            self.schedule(follower)
+
+    def schedule(self, follower: GamepadLinkedView):
+        # a pending update reads the primary's view when due, coalescing changes
+        if follower.timer.isActive() or follower.waiting:
+            return
+        remaining = self.interval - follower.elapsed.elapsed() if follower.elapsed.isValid() else 0
+        follower.timer.start(max(0, remaining))
+
+    def apply(self, follower: GamepadLinkedView):
+        if self.canvas is None or sip.isdeleted(self.canvas) or sip.isdeleted(follower.canvas):
+            return
+        if follower.canvas_type == '2d' and follower.canvas.isDrawing():
+            follower.waiting = True
+            return
+
+        (center, crs, size, heading, pitch) = viewOf(self.canvas_type, self.canvas)
+        (follower_center, follower_crs, follower_size, follower_heading, follower_pitch) = viewOf(follower.canvas_type, follower.canvas)
+        if follower.transform is None or follower.transform.sourceCrs() != crs or follower.transform.destinationCrs() != follower_crs:
+            follower.transform = QgsCoordinateTransform(crs, follower_crs, QgsProject.instance())
+        try:
+            center = follower.transform.transform(center)
+        except QgsCsException:
+            return
+
+        follower.elapsed.start()
+        self._applying = True
+        try:
+            if follower.canvas_type == '2d':
+                view_transform = follower.view_transform
+                view_transform.reset()
+                view_transform.pan(center.x() - follower_center.x(), center.y() - follower_center.y())
+                if follower_size > 0:
+                    view_transform.zoom(size * follower.ratio / follower_size)
+                view_transform.rotate(-angleDifference(heading + follower.heading_offset, follower_heading))
+                # changes below a pixel are skipped, which also ends update ping-pongs between linked views
+                if view_transform.apply(follower.canvas):
+                    follower.canvas.refresh()
+                view_transform.reset()
+            else:
+                controller = follower.canvas.cameraController()
+                settings = follower.canvas.mapSettings()
+                looking_at = settings.worldToMapCoordinates(controller.lookingAtPoint())
+                point = settings.mapToWorldCoordinates(QgsVector3D(center.x(), center.y(), looking_at.z()))
+                distance = size * follower.ratio
+                target_pitch = follower_pitch if pitch is None else max(0.0, min(180.0, pitch + follower.pitch_offset))
+                target_heading = heading + follower.heading_offset
+                if (point.distance(controller.lookingAtPoint()) > distance * self.MIN_CHANGE or abs(distance - follower_size) > distance * self.MIN_CHANGE
+                        or abs(target_pitch - follower_pitch) > self.MIN_ROTATION or abs(angleDifference(target_heading, follower_heading)) > self.MIN_ROTATION):
+                    controller.setLookingAtPoint(point, distance, target_pitch, target_heading)
+        finally:
+            self._applying = False
@@ -17,13 +17,11 @@ import os
 
 from qgis.core import QgsApplication, QgsProject, QgsBookmarkManagerModel
 
-_3D_SUPPORT = True
-try:
-    from qgis._3d import Qgs3DMapScene, QgsCameraController
-except:
-    _3D_SUPPORT = False
+from GamepadNavigation.GamepadBridge import MAX_DEVICES, deviceEntry
+from GamepadNavigation.GamepadGestures import gestureName
+from GamepadNavigation.GamepadModels import GamepadCanvasModel, GamepadListModel, GamepadMapThemeModel
 
-from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtCore import pyqtSignal, Qt
 from qgis.PyQt.QtWidgets import QDialog, QDialogButtonBox, QMainWindow, QWidget
 from qgis.PyQt.uic import loadUiType
 
@@ -34,23 +32,41 @@ GamepadMappingDialogUi, _ = loadUiType(
 
 class GamepadMappingDialog(QDialog, GamepadMappingDialogUi):
 
+    # emitted with the gamepad slot whose canvas or button action changed
+    canvasChanged = pyqtSignal(int)
+    actionChanged = pyqtSignal(int, str)
+
     iface = None
     project = None
     bookmark_model = None
+    canvas_model = None
+    map_theme_model = None
 
-    def __init__(self, iface, parent: QWidget = None):
+    def __init__(self, iface, action_table_provider, parent: QWidget = None):
         super(GamepadMappingDialog, self).__init__(parent=parent)
         self.setupUi(self)
         
         self.iface = iface
         self.project = QgsProject.instance()
+        # returns the compiled action table of a gamepad slot
+        self.action_table_provider = action_table_provider
         self.bookmark_model = QgsBookmarkManagerModel(QgsApplication.instance().bookmarkManager(), self.project.bookmarkManager())
+        self.canvas_model = GamepadCanvasModel(iface, self)
+        self.map_theme_model = GamepadMapThemeModel(self)
         
         self.buttonBox.button(QDialogButtonBox.Close).clicked.connect(lambda:self.hide())
         self.assignActionButton.released.connect(self.assignAction)
         self.clearActionButton.released.connect(self.clearAction)
         
-        self.mapCanvasCombobox.currentIndexChanged.connect(self.mapCanvasChanged)
+        for slot in range(MAX_DEVICES):
+            self.deviceCombobox.addItem('Gamepad #{}'.format(slot + 1), slot)
+        self.deviceCombobox.currentIndexChanged.connect(self.deviceChanged)
+        
+        self.mapCanvasCombobox.setModel(self.canvas_model)
+        # user selections only, canvases opening or closing must not rewrite the mapping
+        self.mapCanvasCombobox.activated.connect(self.mapCanvasChanged)
+        self.navigationRateSpinBox.valueChanged.connect(self.navigationRateChanged)
+        self.previewCheckBox.toggled.connect(self.previewChanged)
         
         self.buttonCombobox.addItem('Button Left #1', 'buttonL1')
         self.buttonCombobox.addItem('Button Left #3', 'buttonL3')
@@ -67,16 +83,31 @@ class GamepadMappingDialog(QDialog, GamepadMappingDialogUi):
         self.buttonCombobox.addItem('Button Select', 'buttonSelect')
         self.buttonCombobox.addItem('Button Start', 'buttonStart')
         self.buttonCombobox.currentIndexChanged.connect(self.buttonChanged)
+
+        # chords are pressed while holding another button, the selected button's own is hidden
+        self.gestureCombobox.addItem('Press', '')
+        self.gestureCombobox.addItem('Long press', 'long')
+        self.gestureCombobox.addItem('Double press', 'double')
+        self.gestureCombobox.addItem('Hold (repeats)', 'repeat')
+        for idx in range(self.buttonCombobox.count()):
+            self.gestureCombobox.addItem('Press while holding {}'.format(self.buttonCombobox.itemText(idx)), 'chord:{}'.format(self.buttonCombobox.itemData(idx)))
+        self.hidden_gesture_row = -1
+        self.gestureCombobox.currentIndexChanged.connect(self.updateCurrentAction)
         
         self.actionTypeCombobox.addItem('Go To Bookmark', 'bookmark')
         self.actionTypeCombobox.addItem('Switch Map Theme', 'map_theme')
         self.actionTypeCombobox.currentIndexChanged.connect(self.actionTypeChanged)
         
         self.bookmarkActionCombobox.setModel(self.bookmark_model)
+        self.mapThemeActionCombobox.setModel(self.map_theme_model)
         
         self.setButton('buttonL1')
         self.setActionType('bookmark')
 
+    def unload(self):
+        self.canvas_model.unload()
+        self.map_theme_model.unload()
+
     def assignAction(self):
         action_string = self.actionTypeCombobox.currentData()
         if action_string == 'bookmark':
@@ -86,13 +117,36 @@ class GamepadMappingDialog(QDialog, GamepadMappingDialogUi):
         else:
             return
 
-        self.project.writeEntry('GamepadNavigation', self.buttonCombobox.currentData(), action_string)
+        self.project.writeEntry('GamepadNavigation', deviceEntry(self.currentSlot(), self.currentGesture()), action_string)
+        self.actionChanged.emit(self.currentSlot(), self.currentGesture())
         self.updateCurrentAction()
 
     def clearAction(self):
-        self.project.removeEntry('GamepadNavigation', self.buttonCombobox.currentData())
+        self.project.removeEntry('GamepadNavigation', deviceEntry(self.currentSlot(), self.currentGesture()))
+        self.actionChanged.emit(self.currentSlot(), self.currentGesture())
+        self.updateCurrentAction()
+
+    def currentGesture(self):
+        return gestureName(self.buttonCombobox.currentData(), self.gestureCombobox.currentData() or '')
+
+    def currentSlot(self):
+        return max(0, self.deviceCombobox.currentIndex())
+
+    def deviceChanged(self):
+        self.updateMapCanvases()
         self.updateCurrentAction()
 
+    def setDevice(self, slot: int):
+        idx = self.deviceCombobox.findData(slot)
+        if idx < 0 or idx == self.deviceCombobox.currentIndex():
+            return
+
+        self.deviceCombobox.blockSignals(True)
+        self.deviceCombobox.setCurrentIndex(idx)
+        self.deviceCombobox.blockSignals(False)
+
+        self.deviceChanged()
+
     def actionTypeChanged(self):
         self.setActionType(self.actionTypeCombobox.currentData())
 
@@ -102,9 +156,6 @@ class GamepadMappingDialog(QDialog, GamepadMappingDialogUi):
             self.mapThemeActionCombobox.setVisible(False)
         elif action_type == 'map_theme':
             self.bookmarkActionCombobox.setVisible(False)
-            self.mapThemeActionCombobox.clear()
-            for map_theme in self.project.mapThemeCollection().mapThemes():
-                self.mapThemeActionCombobox.addItem(QgsApplication.instance().getThemeIcon('mLayoutItemMap.svg'), map_theme)
             self.mapThemeActionCombobox.setVisible(True)
         else:
             return
@@ -114,69 +165,69 @@ class GamepadMappingDialog(QDialog, GamepadMappingDialogUi):
         self.actionTypeCombobox.blockSignals(False)
 
     def updateMapCanvases(self):
-        self.mapCanvasCombobox.blockSignals(True)
-        self.mapCanvasCombobox.clear()
-        for mapCanvas in self.iface.mapCanvases():
-            canvas_name = self.tr( "Main window map canvas" ) if mapCanvas.objectName() == "theMapCanvas" else mapCanvas.objectName()
-            self.mapCanvasCombobox.addItem(QgsApplication.instance().getThemeIcon('mLayoutItemMap.svg'), canvas_name + ' (2D)', '2d:' + mapCanvas.objectName())
-        if _3D_SUPPORT:
-            for sceneName in Qgs3DMapScene.openScenes().keys():
-                self.mapCanvasCombobox.addItem(QgsApplication.instance().getThemeIcon('mLayoutItem3DMap.svg'), sceneName + ' (2D)', '3d:' + sceneName)
-        (canvas_string, found) = self.project.readEntry('GamepadNavigation', 'canvas', '2d:theMapCanvas')
-        idx = self.mapCanvasCombobox.findData(canvas_string)
-        if idx == -1:
-            try: 
-                idx = self.mapCanvasCombobox.count()
-                canvas_type = canvas_string[0:canvas_string.find(':')]
-                canvas_name = canvas_string[canvas_string.find(':') + 1:]
-                canvas_icon = QgsApplication.instance().getThemeIcon('mLayoutItemMap.svg')
-                if canvas_type == '2d':
-                    canvas_name += ' (2D)'
-                else:
-                    canvas_name += ' (3D)'
-                    canvas_icon = QgsApplication.instance().getThemeIcon('mLayoutItem3DMap.svg')
-                self.mapCanvasCombobox.addItem(canvas_icon, canvas_name, canvas_string)
-            except:
-                idx = 0
-
-        self.mapCanvasCombobox.setCurrentIndex(idx)
-        self.mapCanvasCombobox.blockSignals(False)
+        (canvas_string, found) = self.project.readEntry('GamepadNavigation', deviceEntry(self.currentSlot(), 'canvas'), '2d:theMapCanvas')
+        # the model only adds and removes the canvases opened or closed since last shown
+        self.canvas_model.setMissingCanvas(canvas_string)
+        self.canvas_model.refresh()
+        self.mapCanvasCombobox.setCurrentIndex(max(0, self.canvas_model.keyRow(canvas_string)))
+
+        (navigation_rate, found) = self.project.readNumEntry('GamepadNavigation', 'navigation_rate', 60)
+        self.navigationRateSpinBox.blockSignals(True)
+        self.navigationRateSpinBox.setValue(navigation_rate)
+        self.navigationRateSpinBox.blockSignals(False)
+
+        (preview, found) = self.project.readBoolEntry('GamepadNavigation', 'preview', True)
+        self.previewCheckBox.blockSignals(True)
+        self.previewCheckBox.setChecked(preview)
+        self.previewCheckBox.blockSignals(False)
 
     def mapCanvasChanged(self):
-        self.project.writeEntry('GamepadNavigation', 'canvas', self.mapCanvasCombobox.currentData())
+        self.project.writeEntry('GamepadNavigation', deviceEntry(self.currentSlot(), 'canvas'), self.mapCanvasCombobox.currentData(GamepadListModel.KeyRole))
+        self.canvasChanged.emit(self.currentSlot())
+
+    def navigationRateChanged(self):
+        self.project.writeEntry('GamepadNavigation', 'navigation_rate', self.navigationRateSpinBox.value())
+
+    def previewChanged(self):
+        self.project.writeEntry('GamepadNavigation', 'preview', self.previewCheckBox.isChecked())
 
     def buttonChanged(self):
         self.setButton(self.buttonCombobox.currentData())
 
-    def setButton(self, button: str):
+    def setButton(self, button: str, slot: int = -1):
         idx = self.buttonCombobox.findData(button)
         if idx < 0:
             return
 
+        if slot >= 0:
+            self.setDevice(slot)
+
         self.buttonCombobox.blockSignals(True)
         self.buttonCombobox.setCurrentIndex(idx)
         self.buttonCombobox.blockSignals(False)
         
+        self.updateGestures()
         self.updateCurrentAction()
 
+    def updateGestures(self):
+        row = self.gestureCombobox.findData('chord:{}'.format(self.buttonCombobox.currentData()))
+        if row == self.hidden_gesture_row:
+            return
+
+        for (hidden_row, hidden) in ((self.hidden_gesture_row, False), (row, True)):
+            if hidden_row >= 0:
+                self.gestureCombobox.view().setRowHidden(hidden_row, hidden)
+                # disabled items are skipped by keyboard and wheel selection
+                self.gestureCombobox.model().item(hidden_row).setEnabled(not hidden)
+        self.hidden_gesture_row = row
+
+        if self.gestureCombobox.currentIndex() == row:
+            self.gestureCombobox.blockSignals(True)
+            self.gestureCombobox.setCurrentIndex(0)
+            self.gestureCombobox.blockSignals(False)
+
     def updateCurrentAction(self):
-        (action_string, found) = self.project.readEntry('GamepadNavigation', self.buttonCombobox.currentData(), '')
-        self.clearActionButton.setEnabled(found)
-        if found:
-            try:
-                action_type = action_string[0:action_string.find(':')]
-                action_details = action_string[action_string.find(':') +1:]
-                if action_type == 'bookmark':
-                    bookmark = self.project.bookmarkManager().bookmarkById(action_details)
-                    if not bookmark:
-                        bookmark = QgsApplication.instance().bookmarkManager().bookmarkById(action_details)
-                    if bookmark:
-                        self.currentAction.setText('Go to bookmark \'{}\''.format(bookmark.name()))
-                    else:
-                        self.currentAction.setText('Error: action bookmark missing')
-                elif action_type == 'map_theme':
-                    self.currentAction.setText('Set map theme to \'{}\''.format(action_details))
-            except:
-                self.currentAction.setText('Error: wrong/corrupted action string, please re-assign')
-        else:
-            self.currentAction.setText('n/a')
+        # the compiled action table follows mapping entries, bookmarks and map themes
+        action = self.action_table_provider(self.currentSlot()).action(self.currentGesture())
+        self.clearActionButton.setEnabled(action is not None)
+        self.currentAction.setText(action.description() if action is not None else 'n/a')
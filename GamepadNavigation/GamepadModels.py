@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Models
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsApplication, QgsProject
+
+_3D_SUPPORT = True
+try:
+    from qgis._3d import Qgs3DMapScene
+except:
+    _3D_SUPPORT = False
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QTimer
+
+class GamepadListModel(QAbstractListModel):
+    """
+    List model of keyed rows, synchronized with minimal row removals and insertions
+    so views keep their selection and untouched rows are not rebuilt.
+    """
+
+    KeyRole = Qt.UserRole
+
+    def __init__(self, parent: QObject = None):
+        super(GamepadListModel, self).__init__(parent)
+        # (key, label, icon) rows
+        self._rows = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        (key, label, icon) = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return label
+        elif role == Qt.DecorationRole:
+            return icon
+        elif role == self.KeyRole:
+            return key
+        return None
+
+    def keyRow(self, key: str):
+        for (row, (row_key, label, icon)) in enumerate(self._rows):
+            if row_key == key:
+                return row
+        return -1
+
+    def synchronize(self, rows: list):
+        keys = set(row[0] for row in rows)
+        for row in reversed(range(len(self._rows))):
+            if self._rows[row][0] not in keys:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+
+        for (position, new_row) in enumerate(rows):
+            if position < len(self._rows) and self._rows[position][0] == new_row[0]:
+                if self._rows[position][1] != new_row[1]:
+                    self._rows[position] = new_row
+                    self.dataChanged.emit(self.index(position), self.index(position))
+                continue
+            existing = self.keyRow(new_row[0])
+            if existing >= 0:
+                # out of order, e.g. renamed
+                self.beginRemoveRows(QModelIndex(), existing, existing)
+                del self._rows[existing]
+                self.endRemoveRows()
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._rows.insert(position, new_row)
+            self.endInsertRows()
+
+class GamepadCanvasModel(GamepadListModel):
+    """
+    2D map canvases and 3D scenes a gamepad can drive, keyed by canvas string
+    ('2d:<name>' or '3d:<name>'). QGIS does not signal the opening of canvases,
+    the model is synchronized on refresh() and on project changes, closed
+    canvases being removed as soon as they are destroyed.
+    """
+
+    def __init__(self, iface, parent: QObject = None):
+        super(GamepadCanvasModel, self).__init__(parent)
+        self.iface = iface
+        self.project = QgsProject.instance()
+        self._icon_2d = QgsApplication.instance().getThemeIcon('mLayoutItemMap.svg')
+        self._icon_3d = QgsApplication.instance().getThemeIcon('mLayoutItem3DMap.svg')
+        self._watched = []
+        # canvas configured in a project while not currently open
+        self._missing_key = ''
+
+        self.project.readProject.connect(self.refresh)
+        self.project.cleared.connect(self.refresh)
+
+    def unload(self):
+        self.project.readProject.disconnect(self.refresh)
+        self.project.cleared.disconnect(self.refresh)
+        self._unwatch()
+
+    def setMissingCanvas(self, canvas_string: str):
+        """
+        Keeps a row for a configured canvas even when it is not open, from the next refresh().
+        """
+        self._missing_key = canvas_string
+
+    def refresh(self):
+        self._unwatch()
+        rows = []
+        for map_canvas in self.iface.mapCanvases():
+            canvas_name = 'Main window map canvas' if map_canvas.objectName() == 'theMapCanvas' else map_canvas.objectName()
+            rows.append(('2d:' + map_canvas.objectName(), canvas_name + ' (2D)', self._icon_2d))
+            map_canvas.destroyed.connect(self.scheduleRefresh)
+            self._watched.append(map_canvas)
+        if _3D_SUPPORT:
+            for (scene_name, scene) in Qgs3DMapScene.openScenes().items():
+                rows.append(('3d:' + scene_name, scene_name + ' (3D)', self._icon_3d))
+                scene.destroyed.connect(self.scheduleRefresh)
+                self._watched.append(scene)
+
+        if self._missing_key and self._missing_key not in [row[0] for row in rows]:
+            (canvas_type, separator, canvas_name) = self._missing_key.partition(':')
+            if canvas_type == '3d':
+                rows.append((self._missing_key, canvas_name + ' (3D)', self._icon_3d))
+            else:
+                rows.append((self._missing_key, canvas_name + ' (2D)', self._icon_2d))
+
+        self.synchronize(rows)
+
+    def scheduleRefresh(self):
+        # a destroyed canvas is only gone from the interface once its destruction completed
+        QTimer.singleShot(0, self.refresh)
+
+    def _unwatch(self):
+        for watched in self._watched:
+            if not sip.isdeleted(watched):
+                try:
+                    watched.destroyed.disconnect(self.scheduleRefresh)
+                except TypeError:
+                    pass
+        self._watched = []
+
+class GamepadMapThemeModel(GamepadListModel):
+    """
+    Map themes of the project, kept in sync with its map theme collection.
+    """
+
+    def __init__(self, parent: QObject = None):
+        super(GamepadMapThemeModel, self).__init__(parent)
+        self.project = QgsProject.instance()
+        self._icon = QgsApplication.instance().getThemeIcon('mLayoutItemMap.svg')
+
+        self._collection = None
+        self.project.mapThemeCollectionChanged.connect(self.collectionChanged)
+        self.collectionChanged()
+
+    def unload(self):
+        self.project.mapThemeCollectionChanged.disconnect(self.collectionChanged)
+        self._disconnectCollection()
+
+    def collectionChanged(self):
+        # projects replace their map theme collection when cleared
+        self._disconnectCollection()
+        self._collection = self.project.mapThemeCollection()
+        self._collection.mapThemesChanged.connect(self.refresh)
+        self._collection.mapThemeRenamed.connect(self.refresh)
+        self.refresh()
+
+    def _disconnectCollection(self):
+        if self._collection is not None and not sip.isdeleted(self._collection):
+            self._collection.mapThemesChanged.disconnect(self.refresh)
+            self._collection.mapThemeRenamed.disconnect(self.refresh)
+        self._collection = None
+
+    def refresh(self):
+        self.synchronize([(theme, theme, self._icon) for theme in self._collection.mapThemes()])
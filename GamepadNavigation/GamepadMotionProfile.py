@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Motion Profile
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import json
+
+from qgis.core import Qgis, QgsMapLayerType, QgsMapSettings, QgsMessageLog, QgsProject
+from qgis.gui import QgsMapCanvas
+
+from qgis.PyQt import sip
+
+# layer type names usable in skip_types, point clouds needing QGIS 3.18
+LAYER_TYPES = {
+    'vector': 'VectorLayer',
+    'raster': 'RasterLayer',
+    'mesh': 'MeshLayer',
+    'vectortile': 'VectorTileLayer',
+    'pointcloud': 'PointCloudLayer',
+}
+
+DEFAULT_DEFINITION = {
+    'threshold': 0.3,
+    'labels': False,
+    'antialiasing': False,
+    'effects': False,
+    'skip_types': ['pointcloud'],
+    'skip_layers': [],
+}
+
+class GamepadMotionProfile:
+    """
+    Reduced cost render settings a 2D canvas keeps rendering with while its gamepad's
+    sticks are pushed beyond a threshold: labels, antialiasing and advanced effects
+    can be turned off and layers skipped by type or id. The canvas' own settings are
+    restored on release, including layer changes made to the canvas meanwhile, e.g.
+    through the layer tree or a map theme.
+    """
+
+    def __init__(self, threshold: float = 0.3, labels: bool = False, antialiasing: bool = False, effects: bool = False, skip_types=None, skip_layers=None):
+        self.threshold = threshold
+        self.labels = labels
+        self.antialiasing = antialiasing
+        self.effects = effects
+        self.skip_types = [getattr(QgsMapLayerType, LAYER_TYPES[name]) for name in (skip_types or []) if hasattr(QgsMapLayerType, LAYER_TYPES.get(name, ''))]
+        self.skip_layers = set(skip_layers or [])
+        self.canvas = None
+        self._flags = None
+        self._layers = None
+        self._setting_layers = False
+
+    @staticmethod
+    def fromProject(project: QgsProject = None):
+        project = project or QgsProject.instance()
+        definition = dict(DEFAULT_DEFINITION)
+        (definition_string, found) = project.readEntry('GamepadNavigation', 'motion_lod_profile', '')
+        if found:
+            try:
+                definition.update(json.loads(definition_string))
+            except (ValueError, TypeError):
+                QgsMessageLog.logMessage('Ignoring invalid motion level of detail profile \'{}\''.format(definition_string), 'GamepadNavigation', Qgis.Warning)
+        return GamepadMotionProfile(float(definition['threshold']),
+                                    bool(definition['labels']),
+                                    bool(definition['antialiasing']),
+                                    bool(definition['effects']),
+                                    definition['skip_types'],
+                                    definition['skip_layers'])
+
+    def isEngaged(self):
+        return self.canvas is not None
+
+    def engage(self, canvas: QgsMapCanvas):
+        if self.canvas is not None:
+            return
+
+        self.canvas = canvas
+        settings = canvas.mapSettings()
+        self._flags = settings.flags()
+        settings.setFlag(QgsMapSettings.DrawLabeling, self.labels and settings.testFlag(QgsMapSettings.DrawLabeling))
+        settings.setFlag(QgsMapSettings.Antialiasing, self.antialiasing and settings.testFlag(QgsMapSettings.Antialiasing))
+        settings.setFlag(QgsMapSettings.UseAdvancedEffects, self.effects and settings.testFlag(QgsMapSettings.UseAdvancedEffects))
+        canvas.setMapSettingsFlags(settings.flags())
+
+        self._layers = canvas.layers()
+        self._skipLayers()
+        canvas.layersChanged.connect(self.layersChanged)
+        canvas.refresh()
+
+    def _skipLayers(self):
+        kept_layers = [layer for layer in self._layers if layer.id() not in self.skip_layers and layer.type() not in self.skip_types]
+        if len(kept_layers) != len(self._layers):
+            self._setting_layers = True
+            try:
+                self.canvas.setLayers(kept_layers)
+            finally:
+                self._setting_layers = False
+
+    def layersChanged(self):
+        # layers set by others while engaged are the ones restored on release
+        if self._setting_layers or self.canvas is None:
+            return
+        self._layers = self.canvas.layers()
+        self._skipLayers()
+
+    def release(self):
+        """
+        Restores the canvas' full quality settings, leaving its refresh to the caller.
+        """
+        if self.canvas is None:
+            return
+
+        (canvas, flags, layers) = (self.canvas, self._flags, self._layers)
+        self.canvas = None
+        self._flags = None
+        self._layers = None
+        if sip.isdeleted(canvas):
+            return
+        canvas.layersChanged.disconnect(self.layersChanged)
+        canvas.setMapSettingsFlags(flags)
+        project = QgsProject.instance()
+        layers = [layer for layer in layers if not sip.isdeleted(layer) and project.mapLayer(layer.id()) is not None]
+        kept_layers = canvas.layers()
+        if not canvas.theme():
+            # hiding a skipped layer in the layer tree leaves the kept layers, and the signal, unchanged
+            root = project.layerTreeRoot()
+            layers = [layer for layer in layers if layer in kept_layers or root.findLayer(layer.id()) is None or root.findLayer(layer.id()).isVisible()]
+        if layers != kept_layers:
+            canvas.setLayers(layers)
@@ -16,10 +16,11 @@ __revision__ = '$Format:%H$'
 import os
 import math
 
-from GamepadNavigation.GamepadBridge import GamepadBridge
-from GamepadNavigation.GamepadMappingDialog import GamepadMappingDialog
+# feature modules are imported where first used, keeping them off the QGIS launch
+from GamepadNavigation.GamepadInput import selectInputBackend, startInputBackend
+from GamepadNavigation.GamepadInstrumentation import GamepadLatencyMonitor, GamepadStartupTimings
 
-from qgis.core import Qgis, QgsApplication, QgsProject, QgsRectangle, QgsVector
+from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsProject, QgsRectangle, QgsSettings, QgsVector
 from qgis.gui import QgsMessageBar, QgsMessageBarItem
 
 _3D_SUPPORT = True
@@ -29,146 +30,310 @@ except:
     _3D_SUPPORT = False
 
 from qgis.PyQt.QtCore import pyqtSlot, pyqtProperty, pyqtSignal, Qt, QObject, QUrl, QTimer
-from qgis.PyQt.QtWidgets import QWidget, QPushButton, QToolButton
+from qgis.PyQt.QtWidgets import QWidget, QMenu, QPushButton, QToolButton
 from qgis.PyQt.QtGui import QIcon
 
-from PyQt5.QtQuickWidgets import QQuickWidget
-
-class GamepadQuickWidget(QQuickWidget):
-
-    mouseClicked = pyqtSignal()
-    
-    def __init__(self, parent: QWidget = None):
-        super(GamepadQuickWidget, self).__init__(parent)
-
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.RightButton or event.button() == Qt.LeftButton:
-            self.mouseClicked.emit()
-
 class GamepadNavigationPlugin:
 
+    # navigation speeds are expressed per step of this many seconds
+    REFERENCE_INTERVAL = 0.05
+    # milliseconds between checks for a plugged gamepad before the input stack is started
+    DEVICE_POLL_INTERVAL = 3000
+
     missing_mapping_warning_shown = False
     iface = None
     project = None
+    startup_timings = None
     mapping_dialog = None
+    diagnostics_dialog = None
+    latency_monitor = None
     status_bar_widget = None
-    quick_widget = None
-    timer = QTimer()
-    timer_canvas_type = ''
-    timer_canvas = None
+    device_poll_timer = None
+    input_backend_class = None
+    input_backend = None
+    network_backend = None
+    idle_manager = None
+    device_manager = None
+    devices = []
+    # button mappings of each gamepad slot, built on demand
+    action_tables = {}
+    # the first gamepad slot's bridge, mappings and preview
+    gamepad_bridge = None
+    canvas_resolver = None
+    action_table = None
+    canvas_preview = None
+    prefetcher = None
+    render_cache = None
+    timer = None
+    monitored_device = None
 
     def __init__(self, iface):
         super().__init__()
         self.project = QgsProject.instance()
         self.iface = iface
         self.plugin_dir = os.path.dirname(__file__)
+        self.startup_timings = GamepadStartupTimings()
+        self.action_tables = {}
 
     def initGui(self):
-        self.mapping_dialog = GamepadMappingDialog(self.iface)
-
-        self.status_bar_widget = QToolButton()
-        self.status_bar_widget.setAutoRaise(True)
-        self.status_bar_widget.clicked.connect(self.toggleMappingDialog)
-        self.iface.statusBarIface().addPermanentWidget(self.status_bar_widget)
+        with self.startup_timings.measure('initGui'):
+            self.latency_monitor = GamepadLatencyMonitor()
+
+            self.status_bar_widget = QToolButton()
+            self.status_bar_widget.setAutoRaise(True)
+            self.status_bar_widget.setPopupMode(QToolButton.MenuButtonPopup)
+            self.status_bar_widget.clicked.connect(self.toggleMappingDialog)
+            self.status_bar_menu = QMenu(self.status_bar_widget)
+            self.status_bar_menu.addAction('Gamepad Mapping…', self.toggleMappingDialog)
+            self.status_bar_menu.addAction('Gamepad Diagnostics…', self.showDiagnosticsDialog)
+            self.status_bar_widget.setMenu(self.status_bar_menu)
+            self.iface.statusBarIface().addPermanentWidget(self.status_bar_widget)
+            self.updateStatusIcon()
+
+            # the input stack is started once QGIS is up and a gamepad is plugged in
+            self.device_poll_timer = QTimer()
+            self.device_poll_timer.setInterval(self.DEVICE_POLL_INTERVAL)
+            self.device_poll_timer.timeout.connect(self.checkDevices)
+            if self.iface.mainWindow() is not None and self.iface.mainWindow().isVisible():
+                # the plugin is enabled in an already running QGIS
+                QTimer.singleShot(0, self.checkDevices)
+            else:
+                self.iface.initializationCompleted.connect(self.initializationCompleted)
+
+    def initializationCompleted(self):
+        self.iface.initializationCompleted.disconnect(self.initializationCompleted)
+        QgsMessageLog.logMessage('Gamepad Navigation added {:.1f} ms to the QGIS launch'.format(self.startup_timings.launchTime() * 1000), 'GamepadNavigation', Qgis.Info)
+        self.checkDevices()
+
+    def checkDevices(self):
+        if self.device_manager is not None:
+            self.device_poll_timer.stop()
+            return
 
-        self.gamepad_bridge = GamepadBridge(self.iface)
-        self.gamepad_bridge.connectedChanged.connect(self.connectedChanged)
-        self.gamepad_bridge.buttonPressed.connect(self.buttonPressed)
-        self.gamepad_bridge.axisLeftChanged.connect(self.updateNavigation)
-        self.gamepad_bridge.axisRightChanged.connect(self.updateNavigation)
-        self.gamepad_bridge.buttonL2Changed.connect(self.updateNavigation)
-        self.gamepad_bridge.buttonR2Changed.connect(self.updateNavigation)
+        if self.networkInputEnabled():
+            # remote gamepads can connect at any time
+            self.device_poll_timer.stop()
+            self.startInput()
+            return
 
-        self.quick_widget = GamepadQuickWidget()
-        self.quick_widget.rootContext().setContextProperty("gamepadBridge", self.gamepad_bridge)
-        self.quick_widget.setSource(QUrl.fromLocalFile(os.path.join(self.plugin_dir, './qml/GamepadWidget.qml')))
+        if self.input_backend_class is None:
+            # 'auto', 'evdev' (Linux event devices) or 'qtgamepad'
+            backend_name = QgsSettings().value('GamepadNavigation/input_backend', 'auto')
+            self.input_backend_class = selectInputBackend(backend_name)
+            if self.input_backend_class is None:
+                return
 
-        self.status_bar_widget.setIcon(QIcon(os.path.join(self.plugin_dir, './images/gamepad_on.svg' if self.gamepad_bridge.connected else './images/gamepad_off.svg')))
+        # backends unable to detect gamepads without being started are started right away
+        if self.input_backend_class.hasDevices() is False:
+            if not self.device_poll_timer.isActive():
+                self.device_poll_timer.start()
+            return
+        self.device_poll_timer.stop()
+        self.startInput()
+
+    def startInput(self):
+        """
+        Creates the input stack: the device manager, the per gamepad devices, the input
+        backend and the navigation loop. Done once, on first gamepad or first use.
+        """
+        if self.device_manager is not None:
+            return
 
-        self.timer.timeout.connect(self.navigationTimeout)
+        with self.startup_timings.measure('Input stack start', deferred=True):
+            from GamepadNavigation.GamepadDevices import GamepadDeviceManager
+            from GamepadNavigation.GamepadIdleManager import GamepadIdleManager
+            from GamepadNavigation.GamepadNavigationScheduler import GamepadNavigationScheduler
+            from GamepadNavigation.GamepadRenderCache import GamepadRenderCache
+
+            self.render_cache = GamepadRenderCache()
+            # renders are dropped per layer as layers need repainting, for all gamepads at once
+            self.render_cache.watch(self.project)
+            self.project.cleared.connect(self.render_cache.clear)
+            self.project.readProject.connect(self.schedulePrerender)
+            self.project.readProject.connect(self.scheduleLinkedViews)
+            self.project.cleared.connect(self.scheduleLinkedViews)
+
+            self.devices = []
+            self.device_manager = GamepadDeviceManager(self.iface)
+            self.device_manager.deviceAdded.connect(self.addDevice)
+            self.addDevice(0)
+            primary_device = self.devices[0]
+            self.gamepad_bridge = primary_device.bridge
+            self.canvas_resolver = primary_device.canvas_resolver
+            self.action_table = primary_device.action_table
+            self.canvas_preview = primary_device.canvas_preview
+            self.prefetcher = primary_device.prefetcher
+
+            # a single navigation loop drives the canvases of all gamepads
+            self.timer = GamepadNavigationScheduler()
+            self.timer.tick.connect(self.navigationTimeout)
+
+            self.input_backend = startInputBackend(QgsSettings().value('GamepadNavigation/input_backend', 'auto'), self.device_manager)
+            if self.input_backend is not None:
+                self.input_backend_class = type(self.input_backend)
+            if self.networkInputEnabled():
+                from GamepadNavigation.GamepadNetworkBackend import GamepadNetworkBackend
+                settings = QgsSettings()
+                self.network_backend = GamepadNetworkBackend(self.device_manager,
+                                                             address=settings.value('GamepadNavigation/network_input_address', GamepadNetworkBackend.DEFAULT_ADDRESS),
+                                                             port=int(settings.value('GamepadNavigation/network_input_port', GamepadNetworkBackend.DEFAULT_PORT)))
+                self.network_backend.start()
+
+            # seconds without input before the input backend is suspended, 0 never suspends
+            idle_timeout = float(QgsSettings().value('GamepadNavigation/idle_timeout', GamepadIdleManager.DEFAULT_TIMEOUT))
+            self.idle_manager = GamepadIdleManager(self.device_manager, self.input_backend, idle_timeout,
+                                                   lambda: any(device.navigating for device in self.devices))
+            if self.network_backend is not None:
+                self.idle_manager.idleChanged.connect(self.network_backend.setSuspended)
+
+        self.updateStatusIcon()
 
     def unload(self):
-        self.mapping_dialog.deleteLater()
-        self.timer.timeout.disconnect()
-
-        self.gamepad_bridge.deleteLater()
-        self.iface.statusBarIface().removeWidget(self.status_bar_widget)
-        self.quick_widget.rootContext().setContextProperty("gamepadBridge", None)
-        self.quick_widget.deleteLater()
+        self.device_poll_timer.stop()
+        self.device_poll_timer.deleteLater()
+        try:
+            self.iface.initializationCompleted.disconnect(self.initializationCompleted)
+        except TypeError:
+            pass
+
+        if self.mapping_dialog is not None:
+            self.mapping_dialog.unload()
+            self.mapping_dialog.deleteLater()
+        if self.diagnostics_dialog is not None:
+            self.diagnostics_dialog.deleteLater()
+        self.latency_monitor.unwatch()
+        self.latency_monitor.deleteLater()
+
+        for action_table in self.action_tables.values():
+            action_table.unload()
+            action_table.deleteLater()
+        self.action_tables = {}
+
+        if self.device_manager is not None:
+            self.timer.stop()
+            self.timer.setFrameSource(None)
+            self.timer.tick.disconnect()
+            self.timer.deleteLater()
+
+            for device in self.devices:
+                device.unload()
+            self.devices = []
+            self.monitored_device = None
+            self.project.cleared.disconnect(self.render_cache.clear)
+            self.project.readProject.disconnect(self.schedulePrerender)
+            self.project.readProject.disconnect(self.scheduleLinkedViews)
+            self.project.cleared.disconnect(self.scheduleLinkedViews)
+            self.render_cache.unwatch()
+            self.render_cache.clear()
+
+            self.idle_manager.unload()
+            self.idle_manager.deleteLater()
+            if self.input_backend is not None:
+                self.input_backend.stop()
+                self.input_backend.deleteLater()
+            if self.network_backend is not None:
+                self.network_backend.stop()
+                self.network_backend.deleteLater()
+            self.device_manager.deleteLater()
 
         self.iface.statusBarIface().removeWidget(self.status_bar_widget)
         self.status_bar_widget.deleteLater()
 
-    def fetchCanvas(self):
-        (canvas_string, found) = self.project.readEntry('GamepadNavigation', 'canvas', '2d:theMapCanvas')
-        if not canvas_string == '':
-            canvas_type = canvas_string[0:canvas_string.find(':')]
-            canvas_name = canvas_string[canvas_string.find(':') + 1:]
-        else:
-            canvas_type = '2d'
-            canvas_name = 'theMapCanvas'
-        
-        canvas = None
-        if canvas_type == '2d':
-            for mapCanvas in self.iface.mapCanvases():
-                if mapCanvas.objectName() == canvas_name:
-                    canvas = mapCanvas
-                    break
-        elif _3D_SUPPORT and canvas_type == '3d':
-            for scene in Qgs3DMapScene.openScenes().items():
-                if scene[0] == canvas_name:
-                    canvas = scene[1]
-                    break
-        if canvas:
-            return (canvas_type, canvas_name, canvas)
-        else:
+    def mappingDialog(self):
+        # built on first use, parsing its user interface and building its bookmark model is costly
+        if self.mapping_dialog is None:
+            with self.startup_timings.measure('Mapping dialog creation', deferred=True):
+                from GamepadNavigation.GamepadMappingDialog import GamepadMappingDialog
+                self.mapping_dialog = GamepadMappingDialog(self.iface, self.actionTable)
+                self.mapping_dialog.canvasChanged.connect(self.deviceCanvasChanged)
+                self.mapping_dialog.actionChanged.connect(self.deviceActionChanged)
+        return self.mapping_dialog
+
+    def showDiagnosticsDialog(self):
+        if self.diagnostics_dialog is None:
+            from GamepadNavigation.GamepadDiagnosticsDialog import GamepadDiagnosticsDialog
+            self.diagnostics_dialog = GamepadDiagnosticsDialog(self.latency_monitor, self.startup_timings)
+        # only exists once the input stack started
+        self.diagnostics_dialog.idle_manager = self.idle_manager
+        self.diagnostics_dialog.network_backend = self.network_backend
+        self.diagnostics_dialog.show()
+
+    def networkInputEnabled(self):
+        return QgsSettings().value('GamepadNavigation/network_input', False, type=bool)
+
+    def actionTable(self, slot: int):
+        if slot not in self.action_tables:
+            from GamepadNavigation.GamepadActions import GamepadActionTable
+            self.action_tables[slot] = GamepadActionTable(self.iface, slot)
+        return self.action_tables[slot]
+
+    def addDevice(self, slot: int):
+        from GamepadNavigation.GamepadDevices import GamepadDevice
+        device = GamepadDevice(slot, self.device_manager.bridge(slot), self.iface, self.render_cache, self.actionTable(slot))
+        device.bridge.connectedChanged.connect(lambda: self.connectedChanged(slot))
+        device.bridge.buttonPressed.connect(lambda button: self.buttonPressed(button, slot))
+        device.gestures.gestureRecognized.connect(lambda gesture: self.gestureRecognized(gesture, slot))
+        device.bridge.stateChanged.connect(lambda: self.updateNavigation(slot))
+        self.devices.append(device)
+        self.schedulePrerender()
+        self.scheduleLinkedViews()
+
+    def deviceCanvasChanged(self, slot: int):
+        if slot < len(self.devices):
+            self.devices[slot].canvas_resolver.invalidate()
+            self.schedulePrerender()
+            self.scheduleLinkedViews()
+
+    def deviceActionChanged(self, slot: int, button: str):
+        if slot in self.action_tables:
+            self.action_tables[slot].updateButton(button)
+            self.schedulePrerender()
+
+    def fetchCanvas(self, slot: int = 0):
+        if slot >= len(self.devices):
             return ('', '', None)
+        return self.devices[slot].canvas_resolver.canvas()
 
-    def connectedChanged(self):
+    def updateStatusIcon(self):
+        connected = any(device.bridge.connected for device in self.devices)
+        self.status_bar_widget.setIcon(QIcon(os.path.join(self.plugin_dir, './images/gamepad_on.svg' if connected else './images/gamepad_off.svg')))
+
+    def connectedChanged(self, slot: int = 0):
         # stop any ongoing navigation to avoid infinite movement on gamepad disconnect
-        self.timer.stop()
-        self.status_bar_widget.setIcon(QIcon(os.path.join(self.plugin_dir, './images/gamepad_on.svg' if self.gamepad_bridge.connected else './images/gamepad_off.svg')))
+        if self.devices[slot].navigating:
+            self.stopNavigation(self.devices[slot])
+        self.updateStatusIcon()
+
+    def buttonPressed(self, button: str, slot: int = 0):
+        if self.mapping_dialog is not None and self.mapping_dialog.isVisible():
+            self.mapping_dialog.setButton(button, slot)
 
-    def buttonPressed(self, button: str):
-        if self.mapping_dialog.isVisible():
-            self.mapping_dialog.setButton(button)
+    def gestureRecognized(self, gesture: str, slot: int = 0):
+        if self.mapping_dialog is not None and self.mapping_dialog.isVisible():
+            # buttons pick the mapping to edit while the dialog is shown
             return
 
-        (canvas_type, canvas_name, canvas) = self.fetchCanvas()
-        (action_string, found) = self.project.readEntry('GamepadNavigation', button, '')
-        if found:
-            try:
-                action_type = action_string[0:action_string.find(':')]
-                action_details = action_string[action_string.find(':') +1:]
-                if action_type == 'bookmark':
-                    bookmark = self.project.bookmarkManager().bookmarkById(action_details)
-                    if not bookmark:
-                            bookmark = QgsApplication.instance().bookmarkManager().bookmarkById(action_details)
-                    if bookmark:
-                            if canvas_type == '2d':
-                                canvas.setExtent(bookmark.extent())
-                                canvas.refresh()
-                            elif _3D_SUPPORT and canvas_type == '3d':
-                                canvas.setViewFrom2DExtent(bookmark.extent())
-                elif action_type == 'map_theme':
-                    if not self.project.mapThemeCollection().hasMapTheme(action_details):
-                        return;
-                    if canvas_type == '2d' and canvas_name != 'theMapCanvas':
-                        canvas.setTheme(action_details)
-                    elif _3D_SUPPORT and canvas_type == '3d':
-                        canvas.mapSettings().setTerrainMapTheme(action_details)
-                    else:
-                        root = self.project.layerTreeRoot()
-                        model = self.iface.layerTreeView().layerTreeModel()
-                        self.project.mapThemeCollection().applyTheme(action_details, root, model)
-                return
-            except:
-                return
+        device = self.devices[slot]
+        action = device.action_table.action(gesture)
+        if action is not None:
+            (canvas_type, canvas_name, canvas) = device.canvas_resolver.canvas()
+            if canvas:
+                from GamepadNavigation.GamepadFlyTo import GamepadFlyTo
+                fly_to = None
+                (fly_to_duration, found) = self.project.readNumEntry('GamepadNavigation', 'flyto_duration', GamepadFlyTo.DEFAULT_DURATION)
+                if fly_to_duration > 0 and not device.navigating:
+                    fly_to = lambda canvas, extent: device.fly_to.start(canvas, extent, fly_to_duration)
+                action.trigger(canvas_type, canvas_name, canvas, fly_to)
+                if action.action_type == 'map_theme' and action.available and canvas_type == '2d':
+                    # shown until the canvas rendered the theme itself
+                    device.theme_prerender.show(canvas, action.details)
+            return
 
         def assignAction():
             self.iface.messageBar().popWidget(widget)
-            self.mapping_dialog.updateMapCanvases()
-            self.mapping_dialog.show()
+            self.mappingDialog().setDevice(slot)
+            self.mappingDialog().updateMapCanvases()
+            self.mappingDialog().show()
 
         if not self.missing_mapping_warning_shown:
             widget = self.iface.messageBar().createMessage("Action Missing", "The gamepad button has no assigned action in this project yet")
@@ -181,121 +346,244 @@ class GamepadNavigationPlugin:
             self.missing_mapping_warning_shown = True
 
     def toggleMappingDialog(self):
-        self.mapping_dialog.updateMapCanvases()
-        self.mapping_dialog.show()
+        # mapping buttons needs gamepad input, start it if no gamepad was detected yet
+        self.startInput()
+        self.mappingDialog().updateMapCanvases()
+        self.mappingDialog().show()
+
+    def schedulePrerender(self):
+        # canvases restore their project state on the same signal, wait for them
+        QTimer.singleShot(0, self.updatePrerender)
+
+    def updatePrerender(self):
+        prerender_bookmarks = self.project.readBoolEntry('GamepadNavigation', 'flyto_prerender', False)[0]
+        prerender_themes = self.project.readBoolEntry('GamepadNavigation', 'theme_prerender', False)[0]
+        for device in self.devices:
+            (canvas_type, canvas_name, canvas) = device.canvas_resolver.canvas()
+            if not canvas or canvas_type != '2d':
+                device.theme_prerender.stop()
+                continue
+            actions = device.action_table.actions()
+            if prerender_bookmarks:
+                device.fly_to.prerender(canvas, [action.extent for action in actions if action.action_type == 'bookmark' and action.extent is not None])
+            if prerender_themes:
+                device.theme_prerender.start(canvas, [action.details for action in actions if action.action_type == 'map_theme' and action.available])
+            else:
+                device.theme_prerender.stop()
+
+    def scheduleLinkedViews(self):
+        QTimer.singleShot(0, self.updateLinkedViews)
+
+    def updateLinkedViews(self):
+        """
+        Links the canvases and scenes listed in each gamepad's linked_canvases entry, as
+        '2d:<name>' or '3d:<name>' strings, to the canvas the gamepad drives.
+        """
+        from GamepadNavigation.GamepadBridge import deviceEntry
+        from GamepadNavigation.GamepadCanvasResolver import findCanvas
+        from GamepadNavigation.GamepadLinkedViews import GamepadLinkedViews
+
+        (linked_interval, found) = self.project.readNumEntry('GamepadNavigation', 'linked_interval', GamepadLinkedViews.DEFAULT_INTERVAL)
+        for device in self.devices:
+            (canvas_type, canvas_name, canvas) = device.canvas_resolver.canvas()
+            (targets, found) = self.project.readListEntry('GamepadNavigation', deviceEntry(device.slot, 'linked_canvases'), [])
+            followers = []
+            for target in targets:
+                (target_type, _, target_name) = target.partition(':')
+                followers.append((target_type, findCanvas(self.iface, target_type, target_name)))
+            device.linked_views.interval = linked_interval
+            device.linked_views.link(canvas_type, canvas, followers)
+
+    def updateNavigation(self, slot: int = 0):
+        device = self.devices[slot]
+        if device.navigating:
+            # the navigation loop picks up state changes on its next tick
+            return
 
-    def updateNavigation(self):
-        (self.timer_canvas_type, canvas_name, self.timer_canvas) = self.fetchCanvas()
-        if not self.timer_canvas:
+        (device.canvas_type, canvas_name, device.canvas) = device.canvas_resolver.canvas()
+        if not device.canvas:
             return
         
-        axis_max = max(abs(self.gamepad_bridge.axisLeftX), 
-                       abs(self.gamepad_bridge.axisLeftY),
-                       abs(self.gamepad_bridge.axisRightX),
-                       abs(self.gamepad_bridge.axisRightY),
-                       self.gamepad_bridge.buttonL2,
-                       self.gamepad_bridge.buttonR2)
+        state = device.bridge.state()
+        axis_max = state.axisMaximum()
         if axis_max > 0.12:
-            if not self.timer.isActive():
-                self.gamepad_bridge.axisLeftChanged.disconnect(self.updateNavigation)
-                self.gamepad_bridge.axisRightChanged.disconnect(self.updateNavigation)
-                self.gamepad_bridge.buttonL2Changed.disconnect(self.updateNavigation)
-                self.gamepad_bridge.buttonR2Changed.disconnect(self.updateNavigation)
-                if self.timer_canvas_type == '2d':
-                    self.timer_canvas.stopRendering()
-                    self.timer_canvas.freeze(True)
-                self.timer.start(50)
-                self.navigationTimeout()
-
-    def navigationTimeout(self):
-        def scale_exp(value, domain_min, domain_max, range_min, range_max, exponent):
-            return ((range_max - range_min) / pow(domain_max - domain_min, exponent)) * pow(value - domain_min, exponent) + range_min;
-
-        axis_max = max(abs(self.gamepad_bridge.axisLeftX), 
-                       abs(self.gamepad_bridge.axisLeftY),
-                       abs(self.gamepad_bridge.axisRightX),
-                       abs(self.gamepad_bridge.axisRightY),
-                       self.gamepad_bridge.buttonL2,
-                       self.gamepad_bridge.buttonR2)
-        if axis_max <= 0.12:
-            self.gamepad_bridge.axisLeftChanged.connect(self.updateNavigation)
-            self.gamepad_bridge.axisRightChanged.connect(self.updateNavigation)
-            self.gamepad_bridge.buttonL2Changed.connect(self.updateNavigation)
-            self.gamepad_bridge.buttonR2Changed.connect(self.updateNavigation)
+            self.startNavigation(device)
+
+    def startNavigation(self, device):
+        from GamepadNavigation.GamepadCameraDriver import GamepadCameraDriver
+        from GamepadNavigation.GamepadCanvasPreview import GamepadCanvasPreview
+        from GamepadNavigation.GamepadElevationCache import GamepadElevationCache
+        from GamepadNavigation.GamepadMotionProfile import GamepadMotionProfile
+        from GamepadNavigation.GamepadNavigationScheduler import GamepadNavigationScheduler
+        from GamepadNavigation.GamepadPrefetcher import GamepadPrefetcher
+        from GamepadNavigation.GamepadRenderCache import GamepadRenderCache
+        from GamepadNavigation.GamepadTerrainFollower import GamepadTerrainFollower
+        from GamepadNavigation.GamepadViewTransform import GamepadViewTransform
+
+        # pick up canvases and scenes opened since the last project load
+        self.updateLinkedViews()
+        if device.canvas_type == '2d':
+            if self.project.readBoolEntry('GamepadNavigation', 'motion_lod', False)[0]:
+                # keep rendering real map content, with reduced cost settings once moving fast enough
+                device.motion_profile = GamepadMotionProfile.fromProject(self.project)
+            elif self.project.readBoolEntry('GamepadNavigation', 'preview', True)[0]:
+                (preview_threshold, found) = self.project.readDoubleEntry('GamepadNavigation', 'preview_threshold', GamepadCanvasPreview.DEFAULT_THRESHOLD)
+                (prefetch_cache_size, found) = self.project.readNumEntry('GamepadNavigation', 'prefetch_cache_size', GamepadRenderCache.DEFAULT_BUDGET // (1024 * 1024))
+                self.render_cache.setBudget(prefetch_cache_size * 1024 * 1024)
+                device.canvas_preview.start(device.canvas, preview_threshold)
+                # prefetched renders are displayed through the preview
+                if self.project.readBoolEntry('GamepadNavigation', 'prefetch', True)[0]:
+                    (prefetch_horizon, found) = self.project.readNumEntry('GamepadNavigation', 'prefetch_horizon', int(GamepadPrefetcher.DEFAULT_HORIZON * 1000))
+                    device.prefetcher.start(device.canvas, prefetch_horizon / 1000)
+            else:
+                device.canvas.stopRendering()
+                device.canvas.freeze(True)
+            # an ongoing bookmark flight hands its last frame over to the navigation
+            device.fly_to.stop(device.motion_profile is not None)
+            (transform_threshold, found) = self.project.readDoubleEntry('GamepadNavigation', 'transform_threshold', GamepadViewTransform.DEFAULT_THRESHOLD)
+            device.view_transform.threshold = transform_threshold
+            device.view_transform.reset()
+        else:
+            (camera_smoothing, found) = self.project.readNumEntry('GamepadNavigation', 'camera_smoothing', int(GamepadCameraDriver.DEFAULT_SMOOTHING * 1000))
+            device.camera_driver.smoothing = camera_smoothing / 1000
+            device.camera_driver.reset()
+            device.terrain_following = False
+            if self.project.readBoolEntry('GamepadNavigation', 'terrain_follow', False)[0]:
+                (terrain_clearance, found) = self.project.readDoubleEntry('GamepadNavigation', 'terrain_clearance', GamepadTerrainFollower.DEFAULT_CLEARANCE)
+                (elevation_cache_tiles, found) = self.project.readNumEntry('GamepadNavigation', 'elevation_cache_tiles', GamepadElevationCache.DEFAULT_MAX_TILES)
+                device.terrain_following = device.terrain_follower.start(device.canvas, terrain_clearance, elevation_cache_tiles)
+
+        device.navigating = True
+        self.updateResponseProfile(device)
+        if self.monitored_device is None:
+            # latencies are measured on the first navigating gamepad
+            self.monitored_device = device
+            self.latency_monitor.watch(device.canvas_type, device.canvas)
+
+        self.updateFrameSource()
+        if not self.timer.isActive():
+            (navigation_rate, found) = self.project.readNumEntry('GamepadNavigation', 'navigation_rate', GamepadNavigationScheduler.DEFAULT_RATE)
+            self.timer.setTargetRate(navigation_rate)
+            self.timer.start()
+        self.navigateDevice(device, self.timer.frameInterval())
+
+    def stopNavigation(self, device, restore: bool = True):
+        device.navigating = False
+        device.prefetcher.stop()
+        if device.motion_profile is not None:
+            # back to full quality, refreshed below
+            device.motion_profile.release()
+            device.motion_profile = None
+        if device.canvas_preview.isActive():
+            device.canvas_preview.stop()
+        elif restore and device.canvas_type == '2d':
+            device.canvas.freeze(False)
+            device.canvas.refresh()
+
+        if device is self.monitored_device:
+            self.latency_monitor.unwatch()
+            self.monitored_device = None
+        if not any(other.navigating for other in self.devices):
             self.timer.stop()
-            if self.timer_canvas_type == '2d':
-                self.timer_canvas.freeze(False)
-                self.timer_canvas.refresh()
+        self.updateFrameSource()
+
+    def updateFrameSource(self):
+        # move the camera on the scene's frames rather than on an independent timer,
+        # unless other canvases also need the navigation loop
+        navigating = [device for device in self.devices if device.navigating]
+        if len(navigating) == 1 and navigating[0].canvas_type == '3d':
+            self.timer.setFrameSource(navigating[0].canvas)
+        else:
+            self.timer.setFrameSource(None)
+
+    def updateResponseProfile(self, device):
+        from GamepadNavigation.GamepadResponseCurves import GamepadResponseProfile
+
+        # only recompile the response curves when their project definitions changed
+        mode = device.canvas_type
+        definitions = (mode, GamepadResponseProfile.projectDefinitions(mode, self.project))
+        if definitions != device.response_profile_definitions:
+            device.response_profile = GamepadResponseProfile.fromProject(mode, self.project)
+            device.response_profile_definitions = definitions
+
+    def navigationTimeout(self, elapsed: float):
+        for device in self.devices:
+            if device.navigating:
+                self.navigateDevice(device, elapsed)
+
+    def navigateDevice(self, device, elapsed: float):
+        state = device.bridge.state()
+        axis_max = state.axisMaximum()
+        if axis_max <= 0.12:
+            self.stopNavigation(device)
             return
 
+        monitored = device is self.monitored_device
+        if monitored:
+            self.latency_monitor.markTick(state)
+        canvas = device.canvas
+        steps = elapsed / self.REFERENCE_INTERVAL
+        # signed rates per step of the analog axes, ordered as AXES
+        (axis_left_x, axis_left_y, axis_right_x, axis_right_y, trigger_left, trigger_right) = device.response_profile.map(state.values)
         try:
-            if self.timer_canvas_type == '2d':
-                max_movement = self.timer_canvas.mapSettings().mapUnitsPerPixel() * 50
-                exp_movement = 3
-                move_x = 0.0
-                move_y = 0.0
-                if abs(self.gamepad_bridge.axisLeftX) > 0.1:
-                    move_x = scale_exp(abs(self.gamepad_bridge.axisLeftX), 0, 1, 0, max_movement, exp_movement) * (-1 if self.gamepad_bridge.axisLeftX < 0 else 1)
-                if abs(self.gamepad_bridge.axisLeftY) > 0.1:
-                    move_y = scale_exp(abs(self.gamepad_bridge.axisLeftY), 0, 1, 0, max_movement, exp_movement) * (-1 if self.gamepad_bridge.axisLeftY > 0 else 1)
+            if device.canvas_type == '2d':
+                map_units_per_pixel = canvas.mapSettings().mapUnitsPerPixel()
+                move_x = axis_left_x * map_units_per_pixel * steps
+                move_y = -axis_left_y * map_units_per_pixel * steps
+                pan_x = 0.0
+                pan_y = 0.0
+                zoom_rate = 1.0
                 
+                # gather the whole tick's motion, applied to the canvas in a single update
                 if move_x != 0.0 or move_y != 0.0:
-                    rad = math.radians(self.timer_canvas.rotation())
-                    center = self.timer_canvas.mapSettings().extent().center()
-                    center.setX(center.x() + (move_x * math.cos(rad) - move_y * math.sin(rad)))
-                    center.setY(center.y() + (move_y * math.cos(rad) + move_x * math.sin(rad)))
-                    self.timer_canvas.setCenter(center)
+                    rad = math.radians(canvas.rotation())
+                    pan_x = move_x * math.cos(rad) - move_y * math.sin(rad)
+                    pan_y = move_y * math.cos(rad) + move_x * math.sin(rad)
+                    device.view_transform.pan(pan_x, pan_y)
                 
-                max_zoom = 0.25
-                exp_zoom = 3
-                if abs(self.gamepad_bridge.axisRightY) > 0.2:
-                    extent = self.timer_canvas.mapSettings().extent()
-                    zoom_change = scale_exp(abs(self.gamepad_bridge.axisRightY), 0, 1, 0, max_zoom, exp_zoom) * (-1 if self.gamepad_bridge.axisRightY < 0 else 1)
-                    extent.scale(1 + zoom_change)
-                    self.timer_canvas.setExtent(extent)
+                if axis_right_y != 0.0:
+                    # guard against zoom curves configured with a maximum rate of 1 or more
+                    zoom_factor = max(0.01, 1 + axis_right_y)
+                    device.view_transform.zoom(pow(zoom_factor, steps))
+                    zoom_rate = pow(zoom_factor, 1 / self.REFERENCE_INTERVAL)
                 
-                max_rotate = 5
-                exp_rotate = 3
-                if abs(self.gamepad_bridge.axisRightX) > 0.85:
-                    rotation_change = scale_exp(abs(self.gamepad_bridge.axisRightX), 0, 1, 0, max_rotate, exp_rotate) * (-1 if self.gamepad_bridge.axisRightX < 0 else 1)
-                    rotation = self.timer_canvas.mapSettings().rotation() + rotation_change
-                    if rotation > 360:
-                        rotation = -360 + (rotation - 360)
-                    elif rotation < -360:
-                         rotation = 360 + (rotation + 360)
-                    self.timer_canvas.setRotation(rotation)
+                if axis_right_x != 0.0:
+                    device.view_transform.rotate(axis_right_x * steps)
                 
-                if self.gamepad_bridge.buttonL2 > 0.1 or self.gamepad_bridge.buttonR2 > 0.1:
-                    magnification_factor = self.timer_canvas.magnificationFactor()
-                    magnification_factor = magnification_factor + (-self.gamepad_bridge.buttonL2 + self.gamepad_bridge.buttonR2) / 100 * 2
-                    self.timer_canvas.setMagnificationFactor(magnification_factor)
-            elif _3D_SUPPORT and self.timer_canvas_type == '3d':
-                extent = self.timer_canvas.sceneExtent()
-                max_movement = max(extent.xMaximum() - extent.xMinimum(), extent.yMaximum() - extent.yMinimum()) / 150
-                exp_movement = 3
-                move_x = 0.0
-                move_y = 0.0
-                move_z = 0.0
-                if abs(self.gamepad_bridge.axisLeftY) > 0.1:
-                    move_x = scale_exp(abs(self.gamepad_bridge.axisLeftY), 0, 1, 0, max_movement, exp_movement) * (-1 if self.gamepad_bridge.axisLeftY > 0 else 1)
-                if abs(self.gamepad_bridge.axisLeftX) > 0.1:
-                    move_y = scale_exp(abs(self.gamepad_bridge.axisLeftX), 0, 1, 0, max_movement, exp_movement) * (-1 if self.gamepad_bridge.axisLeftX > 0 else 1)
-                if self.gamepad_bridge.buttonL2 > 0.1 or self.gamepad_bridge.buttonR2 > 0.1:
-                    move_z = scale_exp(self.gamepad_bridge.buttonL2, 0, 1, 0, max_movement, exp_movement) * -1 + scale_exp(self.gamepad_bridge.buttonR2, 0, 1, 0, max_movement, exp_movement)
-                
-                if move_x != 0.0 or move_y != 0.0 or move_z != 0.0:
-                    movement_speed = self.timer_canvas.cameraController().cameraMovementSpeed()
-                    self.timer_canvas.cameraController().walkView(move_x * movement_speed, move_y * movement_speed, move_z * movement_speed)
-                
-                max_pitch_yaw = 5
-                exp_pitch_yaw = 3
-                pitch = 0.0
-                yaw = 0.0
-                if abs(self.gamepad_bridge.axisRightY) > 0.2:
-                    pitch = scale_exp(abs(self.gamepad_bridge.axisRightY), 0, 1, 0, max_pitch_yaw, exp_pitch_yaw) * (-1 if self.gamepad_bridge.axisRightY > 0 else 1)
-                if abs(self.gamepad_bridge.axisRightX) > 0.2:
-                    yaw = scale_exp(abs(self.gamepad_bridge.axisRightX), 0, 1, 0, max_pitch_yaw, exp_pitch_yaw) * (-1 if self.gamepad_bridge.axisRightX > 0 else 1)
-                self.timer_canvas.cameraController().rotateCamera(pitch, yaw)
+                if trigger_left != 0.0 or trigger_right != 0.0:
+                    device.view_transform.magnify((trigger_right - trigger_left) * steps)
+
+                if device.motion_profile is not None and not device.motion_profile.isEngaged() and axis_max >= device.motion_profile.threshold:
+                    device.motion_profile.engage(canvas)
+
+                if device.view_transform.apply(canvas):
+                    if device.motion_profile is not None:
+                        canvas.refresh()
+                    if monitored:
+                        self.latency_monitor.markApplied()
+
+                if device.canvas_preview.isActive():
+                    device.canvas_preview.update(axis_max)
+                if device.prefetcher.isActive() and elapsed > 0:
+                    device.prefetcher.predict(pan_x / elapsed, pan_y / elapsed, zoom_rate)
+            elif _3D_SUPPORT and device.canvas_type == '3d':
+                # rates per second, the camera driver steps and smooths them once per frame
+                extent = canvas.sceneExtent()
+                scene_size = max(extent.xMaximum() - extent.xMinimum(), extent.yMaximum() - extent.yMinimum()) / self.REFERENCE_INTERVAL
+                movement_speed = canvas.cameraController().cameraMovementSpeed()
+                move_x = -axis_left_y * scene_size * movement_speed
+                move_y = -axis_left_x * scene_size * movement_speed
+                move_z = (trigger_right - trigger_left) * scene_size * movement_speed
+                pitch = -axis_right_y / self.REFERENCE_INTERVAL
+                yaw = -axis_right_x / self.REFERENCE_INTERVAL
+                lift = 0.0
+                if device.terrain_following:
+                    # the triggers raise and lower the clearance above ground instead of the camera
+                    lift = device.terrain_follower.lift(canvas, elapsed, move_z)
+                    move_z = 0.0
+
+                if device.camera_driver.update(canvas, elapsed, move_x, move_y, move_z, pitch, yaw, lift) and monitored:
+                    self.latency_monitor.markApplied()
         except:
             # catch scenarios such as closing a canvas while navigating 
-            self.timer.stop()
+            self.stopNavigation(device, False)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Navigation Scheduler
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+
+_FRAME_ACTION_SUPPORT = True
+try:
+    from PyQt5.Qt3DLogic import QFrameAction
+except:
+    _FRAME_ACTION_SUPPORT = False
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QObject, QTimer, QElapsedTimer
+from qgis.PyQt.QtGui import QGuiApplication
+
+class GamepadNavigationScheduler(QObject):
+    """
+    Navigation loop ticking at a target rate and reporting the real time
+    elapsed since the previous tick, dropping frames when ticks overrun.
+
+    When following the frames of a 3D scene, ticks happen on the scene's frames
+    and the timer only ticks when no frame came in time, e.g. while on-demand
+    rendering is idle.
+    """
+
+    # emitted with the number of seconds elapsed since the previous tick
+    tick = pyqtSignal(float)
+
+    DEFAULT_RATE = 60
+    # upper bound of a single tick's elapsed time, avoids huge jumps after long stalls
+    MAX_ELAPSED = 0.25
+    # maximum number of consecutive frames dropped when ticks overrun their budget
+    MAX_DROPPED_FRAMES = 4
+    # number of frame intervals without a scene frame before the timer ticks
+    FRAME_WATCHDOG_FRAMES = 2
+
+    def __init__(self, parent: QObject = None):
+        super(GamepadNavigationScheduler, self).__init__(parent)
+        self._frame_interval = 1.0 / self.DEFAULT_RATE
+        self._dropped_frames = 0
+        self._frame_source = None
+        self._frame_action = None
+
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._timeout)
+
+    def setTargetRate(self, rate: int):
+        """
+        Sets the target tick rate in Hz, a rate of 0 follows the primary screen refresh rate.
+        """
+        if rate <= 0:
+            screen = QGuiApplication.primaryScreen()
+            rate = screen.refreshRate() if screen and screen.refreshRate() > 0 else self.DEFAULT_RATE
+        self._frame_interval = 1.0 / rate
+        if self._timer.isActive():
+            self._timer.setInterval(self._intervalMsecs(1))
+
+    def setFrameSource(self, entity=None):
+        """
+        Synchronises ticks to the frames of a Qt3D entity such as a 3D map scene, None
+        reverting to timer ticks. Returns False when frames cannot be followed.
+        """
+        if entity is not None and entity is self._frame_source:
+            return True
+
+        if self._frame_source is not None:
+            if not sip.isdeleted(self._frame_source):
+                self._frame_source.removeComponent(self._frame_action)
+            self._frame_action.triggered.disconnect(self._frameTriggered)
+            self._frame_action.deleteLater()
+            self._frame_source = None
+            self._frame_action = None
+
+        if entity is None or not _FRAME_ACTION_SUPPORT:
+            return entity is None
+
+        self._frame_source = entity
+        self._frame_action = QFrameAction()
+        self._frame_action.triggered.connect(self._frameTriggered)
+        entity.addComponent(self._frame_action)
+        return True
+
+    def frameInterval(self):
+        return self._frame_interval
+
+    def droppedFrames(self):
+        return self._dropped_frames
+
+    def isActive(self):
+        return self._timer.isActive()
+
+    def start(self):
+        self._dropped_frames = 0
+        self._clock.start()
+        self._timer.start(self._intervalMsecs(self.FRAME_WATCHDOG_FRAMES if self._frame_source is not None else 1))
+
+    def stop(self):
+        self._timer.stop()
+        self._clock.invalidate()
+
+    def _intervalMsecs(self, frames: int):
+        return max(1, round(self._frame_interval * frames * 1000))
+
+    def _tick(self):
+        elapsed = min(self._clock.nsecsElapsed() / 1e9, self.MAX_ELAPSED)
+        self._clock.restart()
+
+        self.tick.emit(elapsed)
+
+        # the navigation may have been stopped by a tick handler
+        return self._timer.isActive()
+
+    def _frameTriggered(self, dt: float):
+        if not self._timer.isActive():
+            return
+        if self._tick():
+            # push the watchdog back, frames drive the navigation
+            self._timer.start(self._intervalMsecs(self.FRAME_WATCHDOG_FRAMES))
+
+    def _timeout(self):
+        if not self._tick():
+            return
+        if self._frame_source is not None:
+            # keep ticking at the target rate until scene frames resume
+            self._timer.setInterval(self._intervalMsecs(1))
+            return
+
+        # when handling the tick overran its budget, skip frames until the next
+        # tick can start on time; elapsed time keeps the movement speed constant
+        cost = self._clock.nsecsElapsed() / 1e9
+        frames = min(max(1, math.ceil(cost / self._frame_interval)), self.MAX_DROPPED_FRAMES + 1)
+        self._dropped_frames += frames - 1
+        interval = self._intervalMsecs(frames)
+        if self._timer.interval() != interval:
+            self._timer.setInterval(interval)
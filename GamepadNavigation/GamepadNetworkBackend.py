@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Network Backend
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import select
+import socket
+import threading
+import time
+
+from qgis.core import Qgis, QgsMessageLog
+
+from GamepadNavigation.GamepadBridge import FIELDS
+from GamepadNavigation.GamepadInput import GamepadThreadedInputBackend, significantChange
+from GamepadNavigation.GamepadNetworkProtocol import DEFAULT_PORT, FLAG_DISCONNECT, isNewer, unpackFrame
+
+from qgis.PyQt.QtCore import QObject
+
+class GamepadRemoteDevice:
+    """
+    A gamepad sending frames from a remote client, identified by the client's host
+    and the device number within the client.
+    """
+
+    def __init__(self, device_id: int, port: int):
+        self.device_id = device_id
+        self.port = port
+        self.sequence = 0
+        self.last_seen = 0.0
+        # the state last reported to the device manager
+        self.delivered = [0.0] * len(FIELDS)
+
+class GamepadNetworkBackend(GamepadThreadedInputBackend):
+    """
+    Input server receiving gamepad frames (see GamepadNetworkProtocol) over UDP on a
+    background thread, e.g. from a controller attached to another machine. Frames
+    not newer than the last one received from a gamepad are dropped and bursts are
+    coalesced, only the latest state reaching the UI thread.
+
+    Clients are expected to repeat their latest frame while idle, a gamepad being
+    disconnected once no frame was received for DEVICE_TIMEOUT seconds.
+    """
+
+    name = 'network'
+
+    DEFAULT_ADDRESS = '127.0.0.1'
+    DEFAULT_PORT = DEFAULT_PORT
+    DEVICE_TIMEOUT = 3.0
+    # device ids of remote gamepads, clear of event device numbers
+    DEVICE_ID_BASE = 1000
+
+    def __init__(self, device_manager, parent: QObject = None, address: str = DEFAULT_ADDRESS, port: int = DEFAULT_PORT):
+        super(GamepadNetworkBackend, self).__init__(device_manager, parent)
+        self.address = address
+        self.port = port
+        self.received = 0
+        self.dropped = 0
+        self.invalid = 0
+        self._socket = None
+        self._remotes = {}
+        self._next_device_id = self.DEVICE_ID_BASE
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def isSupported():
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self._socket.bind((self.address, self.port))
+        except OSError as error:
+            QgsMessageLog.logMessage('Gamepad network input could not listen on {}:{}: {}'.format(self.address, self.port, error), 'GamepadNavigation', Qgis.Warning)
+            self._socket.close()
+            self._socket = None
+            return
+        self._socket.setblocking(False)
+        # the bound port, when an ephemeral one was asked for
+        self.port = self._socket.getsockname()[1]
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='GamepadNetworkBackend', daemon=True)
+        self._thread.start()
+        super(GamepadNetworkBackend, self).start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake()
+        self._thread.join()
+        self._thread = None
+        self._socket.close()
+        self._socket = None
+        for remote in self._remotes.values():
+            self.device_manager.setConnected(remote.device_id, False)
+        self._remotes = {}
+        self._clearQueue()
+        super(GamepadNetworkBackend, self).stop()
+
+    def _wake(self):
+        # an empty datagram to ourselves interrupts the thread's wait
+        host = '127.0.0.1' if self.address in ('', '0.0.0.0') else self.address
+        try:
+            self._socket.sendto(b'', (host, self.port))
+        except OSError:
+            pass
+
+    def _run(self):
+        while not self._stopping.is_set():
+            timeout = None
+            if self._remotes:
+                oldest = min(remote.last_seen for remote in self._remotes.values())
+                timeout = max(0.0, oldest + self.DEVICE_TIMEOUT - time.monotonic())
+            select.select([self._socket], [], [], timeout)
+
+            # drain the socket, the latest state of each gamepad being the one delivered
+            while not self._stopping.is_set():
+                try:
+                    (data, (host, port)) = self._socket.recvfrom(1024)
+                except OSError:
+                    # drained, or e.g. a port unreachable notification of a gone client on Windows
+                    break
+                if data:
+                    self._receive(data, host, port)
+
+            now = time.monotonic()
+            for (key, remote) in list(self._remotes.items()):
+                if now - remote.last_seen >= self.DEVICE_TIMEOUT:
+                    self._disconnect(key)
+
+    def _receive(self, data: bytes, host: str, port: int):
+        frame = unpackFrame(data)
+        if frame is None:
+            self.invalid += 1
+            return
+        self.received += 1
+
+        key = (host, frame.device)
+        remote = self._remotes.get(key)
+        if frame.flags & FLAG_DISCONNECT:
+            if remote is not None:
+                self._disconnect(key)
+            return
+        if remote is None:
+            remote = GamepadRemoteDevice(self._next_device_id, port)
+            self._next_device_id += 1
+            self._remotes[key] = remote
+            self._queue(remote.device_id, connected=True)
+        elif remote.port != port:
+            # a restarted client, its sequence starting over
+            remote.port = port
+        elif not isNewer(frame.sequence, remote.sequence):
+            self.dropped += 1
+            return
+        remote.sequence = frame.sequence
+        remote.last_seen = time.monotonic()
+
+        values = [frame.values.get(name, 0.0) for name in FIELDS]
+        # repeated frames only keep the gamepad alive
+        if values == remote.delivered or (self._suspended and not significantChange(values, remote.delivered)):
+            return
+        remote.delivered = values
+        self._queue(remote.device_id, state=(values, float(frame.source_time)))
+
+    def _disconnect(self, key: tuple):
+        remote = self._remotes.pop(key)
+        self._queue(remote.device_id, connected=False)
+
+    def report(self):
+        lines = ['Network input: {}'.format('listening on {}:{}'.format(self.address, self.port) if self.isActive() else 'not listening'),
+                 'Remote gamepads: {}'.format(len(self._remotes)),
+                 'Frames: {} received, {} out of order dropped, {} invalid'.format(self.received, self.dropped, self.invalid)]
+        return '\n'.join(lines)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Network Protocol
+
+Binary frame format of the network input server, free of QGIS imports so clients
+can use it on machines without QGIS.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import struct
+
+from collections import namedtuple
+
+MAGIC = b'GN'
+VERSION = 1
+DEFAULT_PORT = 5810
+
+# the gamepad left, the server releasing it right away instead of timing out
+FLAG_DISCONNECT = 0x01
+
+# wire order of the values, fixed by the protocol rather than following the bridge's fields
+STICKS = ['axisLeftX', 'axisLeftY', 'axisRightX', 'axisRightY']
+TRIGGERS = ['buttonL2', 'buttonR2']
+BUTTON_BITS = ['buttonA', 'buttonB', 'buttonX', 'buttonY',
+               'buttonL1', 'buttonR1', 'buttonL3', 'buttonR3',
+               'buttonUp', 'buttonDown', 'buttonLeft', 'buttonRight',
+               'buttonSelect', 'buttonStart']
+
+# little endian: magic, version, flags, device, sequence, source time in milliseconds
+# since the epoch (0 when unknown), sticks, triggers and the button bitmask
+FRAME = struct.Struct('<2sBBBIQ4h2BH')
+SEQUENCE_MODULO = 1 << 32
+
+GamepadFrame = namedtuple('GamepadFrame', ['device', 'sequence', 'flags', 'source_time', 'values'])
+
+def packFrame(values: dict, sequence: int, device: int = 0, source_time: float = 0.0, flags: int = 0):
+    """
+    Packs a gamepad state given as a dict of values by name, missing values being released.
+    """
+    sticks = [int(round(max(-1.0, min(1.0, float(values.get(name, 0.0)))) * 32767)) for name in STICKS]
+    triggers = [int(round(max(0.0, min(1.0, float(values.get(name, 0.0)))) * 255)) for name in TRIGGERS]
+    buttons = 0
+    for (bit, name) in enumerate(BUTTON_BITS):
+        if values.get(name):
+            buttons |= 1 << bit
+    return FRAME.pack(MAGIC, VERSION, flags, device, sequence % SEQUENCE_MODULO, int(source_time), *sticks, *triggers, buttons)
+
+def unpackFrame(data: bytes):
+    """
+    Returns the GamepadFrame packed in a datagram, its values as a dict by name, or
+    None when the datagram is not a frame of this protocol version.
+    """
+    if len(data) != FRAME.size:
+        return None
+    (magic, version, flags, device, sequence, source_time, *rest) = FRAME.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    values = {}
+    for (name, value) in zip(STICKS, rest[0:4]):
+        values[name] = max(-1.0, value / 32767)
+    for (name, value) in zip(TRIGGERS, rest[4:6]):
+        values[name] = value / 255
+    buttons = rest[6]
+    for (bit, name) in enumerate(BUTTON_BITS):
+        values[name] = 1.0 if buttons & (1 << bit) else 0.0
+    return GamepadFrame(device, sequence, flags, source_time, values)
+
+def isNewer(sequence: int, previous: int):
+    """
+    Returns whether a sequence number follows the previous one, wrapping around
+    like serial numbers so long sessions keep working.
+    """
+    return 0 < (sequence - previous) % SEQUENCE_MODULO < SEQUENCE_MODULO // 2
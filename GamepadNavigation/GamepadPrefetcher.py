@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Prefetcher
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsMapRendererParallelJob, QgsRectangle
+from qgis.gui import QgsMapCanvas
+
+from GamepadNavigation.GamepadRenderCache import GamepadRenderCache, coverage, renderContext
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QObject
+
+class GamepadPrefetcher(QObject):
+    """
+    Renders the extent a 2D canvas is predicted to reach within a short horizon
+    in the background, storing the results into a render cache.
+    """
+
+    DEFAULT_HORIZON = 0.3
+    # predictions covering less than this ratio of a running job's view restart it
+    RESTART_COVERAGE = 0.5
+
+    def __init__(self, cache: GamepadRenderCache, parent: QObject = None):
+        super(GamepadPrefetcher, self).__init__(parent)
+        self.cache = cache
+        self.canvas = None
+        self.horizon = self.DEFAULT_HORIZON
+        self.job = None
+
+    def isActive(self):
+        return self.canvas is not None
+
+    def start(self, canvas: QgsMapCanvas, horizon: float = DEFAULT_HORIZON):
+        self.stop()
+        self.canvas = canvas
+        self.horizon = horizon
+
+    def stop(self):
+        self.cancel()
+        self.canvas = None
+
+    def predict(self, velocity_x: float, velocity_y: float, zoom_rate: float):
+        """
+        Prefetches the view reached after the prediction horizon when panning at the given
+        velocity, in map units per second, and zooming by zoom_rate (extent scale per second).
+        """
+        if self.canvas is None or sip.isdeleted(self.canvas):
+            return
+
+        settings = self.canvas.mapSettings()
+        extent = settings.extent()
+        if velocity_x != 0.0 or velocity_y != 0.0:
+            offset_x = velocity_x * self.horizon
+            offset_y = velocity_y * self.horizon
+            extent = QgsRectangle(extent.xMinimum() + offset_x, extent.yMinimum() + offset_y,
+                                  extent.xMaximum() + offset_x, extent.yMaximum() + offset_y)
+        if zoom_rate != 1.0:
+            extent.scale(pow(zoom_rate, self.horizon))
+        settings.setExtent(extent)
+
+        context = renderContext(settings)
+        if self.cache.match(context, settings, 0.95) is not None:
+            return
+
+        if self.job is not None:
+            if coverage(self.job.mapSettings(), settings) >= self.RESTART_COVERAGE:
+                return
+            self.cancel()
+
+        self.job = QgsMapRendererParallelJob(settings)
+        self.job.finished.connect(self.renderFinished)
+        self.job.start()
+
+    def renderFinished(self):
+        job = self.job
+        self.job = None
+        self.cache.insert(renderContext(job.mapSettings()), job.mapSettings(), job.renderedImage())
+        job.deleteLater()
+
+    def cancel(self):
+        if self.job is None:
+            return
+        # let the cancelled job wind down in its own time rather than blocking
+        self.job.finished.disconnect(self.renderFinished)
+        self.job.finished.connect(self.job.deleteLater)
+        sip.transferto(self.job, None)
+        self.job.cancelWithoutBlocking()
+        self.job = None
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Gamepad QtGamepad Backend
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import os
+
+from GamepadNavigation.GamepadInput import WAKE_THRESHOLD, GamepadInputBackend
+
+_QUICK_SUPPORT = True
+try:
+    from PyQt5.QtQml import QQmlComponent, QQmlEngine
+    from PyQt5.QtQuickWidgets import QQuickWidget
+except:
+    _QUICK_SUPPORT = False
+
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QObject, QUrl
+from qgis.PyQt.QtWidgets import QWidget
+
+if _QUICK_SUPPORT:
+    class GamepadQuickWidget(QQuickWidget):
+
+        mouseClicked = pyqtSignal()
+
+        def __init__(self, parent: QWidget = None):
+            super(GamepadQuickWidget, self).__init__(parent)
+
+        def mouseReleaseEvent(self, event):
+            if event.button() == Qt.RightButton or event.button() == Qt.LeftButton:
+                self.mouseClicked.emit()
+
+class GamepadQtGamepadBackend(GamepadInputBackend):
+    """
+    Input backend hosting QtGamepad items in a hidden QML widget. While suspended the
+    widget is torn down, the items being hosted by a bare QML engine without any
+    render surface until input resumes.
+    """
+
+    name = 'qtgamepad'
+
+    def __init__(self, device_manager, parent: QObject = None):
+        super(GamepadQtGamepadBackend, self).__init__(device_manager, parent)
+        self.quick_widget = None
+        # QML engine and root item hosting the gamepad items while suspended
+        self.engine = None
+        self.root_object = None
+
+    @staticmethod
+    def isSupported():
+        return _QUICK_SUPPORT
+
+    def start(self):
+        if self._active:
+            return
+        self._createHost()
+        super(GamepadQtGamepadBackend, self).start()
+
+    def setSuspended(self, suspended: bool):
+        if suspended == self._suspended:
+            return
+        super(GamepadQtGamepadBackend, self).setSuspended(suspended)
+        if self._active:
+            # QtGamepad polls on its own, the QML side filters out jitter while suspended
+            self._destroyHost()
+            self._createHost()
+
+    def stop(self):
+        if not self._active:
+            return
+        self._destroyHost()
+        super(GamepadQtGamepadBackend, self).stop()
+
+    def _createHost(self):
+        source = QUrl.fromLocalFile(os.path.join(os.path.dirname(__file__), './qml/GamepadWidget.qml'))
+        if self._suspended:
+            self.engine = QQmlEngine()
+            self.engine.rootContext().setContextProperty("gamepadDevices", self.device_manager)
+            self.root_object = QQmlComponent(self.engine, source).create()
+        else:
+            self.quick_widget = GamepadQuickWidget()
+            self.quick_widget.rootContext().setContextProperty("gamepadDevices", self.device_manager)
+            self.quick_widget.setSource(source)
+            self.root_object = self.quick_widget.rootObject()
+        if self.root_object is not None:
+            self.root_object.setProperty('wakeThreshold', WAKE_THRESHOLD)
+            self.root_object.setProperty('suspended', self._suspended)
+
+    def _destroyHost(self):
+        # gamepads stay connected, only the items reporting them go away
+        if self.quick_widget is not None:
+            self.quick_widget.rootContext().setContextProperty("gamepadDevices", None)
+            self.quick_widget.deleteLater()
+            self.quick_widget = None
+        if self.engine is not None:
+            self.engine.rootContext().setContextProperty("gamepadDevices", None)
+            if self.root_object is not None:
+                self.root_object.deleteLater()
+            self.engine.deleteLater()
+            self.engine = None
+        self.root_object = None
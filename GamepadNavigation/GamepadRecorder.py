@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Recorder
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import struct
+import time
+
+from GamepadNavigation.GamepadBridge import AXES, BUTTONS, FIELDS, GamepadBridge
+
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QObject, QTimer
+
+# Input log layout: a header followed by records made of a record type, a
+# timestamp in seconds since the start of the recording and a payload.
+# State payloads pack the axes as 32-bit floats and the buttons as a bitmask.
+MAGIC = b'GPNR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<Bd')
+STATE_PAYLOAD = struct.Struct('<{}fI'.format(len(AXES)))
+CONNECTED_PAYLOAD = struct.Struct('<?')
+DEVICE_PAYLOAD = struct.Struct('<i')
+
+RECORD_STATE = 0
+RECORD_CONNECTED = 1
+RECORD_DEVICE = 2
+
+def packState(values):
+    buttons = 0
+    for (index, name) in enumerate(BUTTONS):
+        if values[len(AXES) + index]:
+            buttons |= 1 << index
+    return STATE_PAYLOAD.pack(*values[0:len(AXES)], buttons)
+
+def unpackState(payload: bytes):
+    unpacked = STATE_PAYLOAD.unpack(payload)
+    buttons = unpacked[-1]
+    return list(unpacked[0:len(AXES)]) + [1.0 if buttons & (1 << index) else 0.0 for index in range(len(BUTTONS))]
+
+def readRecords(path: str):
+    """
+    Yields (record type, timestamp, value) tuples from an input log, values being
+    a list ordered as FIELDS for state records, a bool or an int otherwise.
+    """
+    with open(path, 'rb') as log:
+        (magic, version, field_count) = HEADER.unpack(log.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or field_count != len(FIELDS):
+            raise ValueError('{} is not a supported gamepad input log'.format(path))
+        while True:
+            record = log.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            (record_type, timestamp) = RECORD.unpack(record)
+            if record_type == RECORD_STATE:
+                yield (record_type, timestamp, unpackState(log.read(STATE_PAYLOAD.size)))
+            elif record_type == RECORD_CONNECTED:
+                yield (record_type, timestamp, CONNECTED_PAYLOAD.unpack(log.read(CONNECTED_PAYLOAD.size))[0])
+            elif record_type == RECORD_DEVICE:
+                yield (record_type, timestamp, DEVICE_PAYLOAD.unpack(log.read(DEVICE_PAYLOAD.size))[0])
+            else:
+                raise ValueError('Unknown record type {} in {}'.format(record_type, path))
+
+class GamepadRecorder(QObject):
+    """
+    Records everything flowing into a gamepad bridge into a binary input log.
+    """
+
+    def __init__(self, bridge: GamepadBridge, parent: QObject = None):
+        super(GamepadRecorder, self).__init__(parent)
+        self.bridge = bridge
+        self._log = None
+        self._start = 0.0
+
+    def isRecording(self):
+        return self._log is not None
+
+    def start(self, path: str):
+        self.stop()
+        self._log = open(path, 'wb')
+        self._log.write(HEADER.pack(MAGIC, VERSION, len(FIELDS)))
+        self._start = time.perf_counter()
+
+        # record the initial state so replays start from identical conditions
+        self._write(RECORD_CONNECTED, self._start, CONNECTED_PAYLOAD.pack(self.bridge.connected))
+        self._write(RECORD_DEVICE, self._start, DEVICE_PAYLOAD.pack(self.bridge.deviceId))
+        self._write(RECORD_STATE, self._start, packState(self.bridge.state().values))
+
+        self.bridge.stateChanged.connect(self.recordState)
+        self.bridge.connectedChanged.connect(self.recordConnected)
+        self.bridge.deviceIdChanged.connect(self.recordDeviceId)
+
+    def stop(self):
+        if self._log is None:
+            return
+        self.bridge.stateChanged.disconnect(self.recordState)
+        self.bridge.connectedChanged.disconnect(self.recordConnected)
+        self.bridge.deviceIdChanged.disconnect(self.recordDeviceId)
+        self._log.close()
+        self._log = None
+
+    def recordState(self):
+        state = self.bridge.state()
+        self._write(RECORD_STATE, state.timestamp, packState(state.values))
+
+    def recordConnected(self):
+        self._write(RECORD_CONNECTED, time.perf_counter(), CONNECTED_PAYLOAD.pack(self.bridge.connected))
+
+    def recordDeviceId(self):
+        self._write(RECORD_DEVICE, time.perf_counter(), DEVICE_PAYLOAD.pack(self.bridge.deviceId))
+
+    def _write(self, record_type: int, timestamp: float, payload: bytes):
+        self._log.write(RECORD.pack(record_type, timestamp - self._start))
+        self._log.write(payload)
+
+class GamepadReplay(QObject):
+    """
+    Feeds an input log back into a gamepad bridge, at the recorded pace scaled by a
+    speed factor. A speed of 0 feeds all records as fast as the event loop allows.
+    """
+
+    finished = pyqtSignal()
+
+    def __init__(self, bridge: GamepadBridge, path: str, speed: float = 1.0, parent: QObject = None):
+        super(GamepadReplay, self).__init__(parent)
+        self.bridge = bridge
+        self.speed = speed
+        self._records = list(readRecords(path))
+        self._index = 0
+        self._start = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._replay)
+
+    def __len__(self):
+        return len(self._records)
+
+    def isActive(self):
+        return self._timer.isActive()
+
+    def start(self):
+        self._index = 0
+        self._start = time.perf_counter()
+        self._schedule()
+
+    def stop(self):
+        self._timer.stop()
+
+    def step(self):
+        """
+        Feeds the next record into the bridge immediately, returning False once the log is exhausted.
+        """
+        if self._index >= len(self._records):
+            return False
+        (record_type, timestamp, value) = self._records[self._index]
+        self._index += 1
+        if record_type == RECORD_STATE:
+            self.bridge.setState(value)
+        elif record_type == RECORD_CONNECTED:
+            self.bridge.connected = value
+        elif record_type == RECORD_DEVICE:
+            self.bridge.deviceId = value
+        return True
+
+    def _replay(self):
+        now = time.perf_counter() - self._start
+        while self._index < len(self._records) and (self.speed <= 0 or self._records[self._index][1] / self.speed <= now):
+            self.step()
+            if self.speed <= 0:
+                break
+        self._schedule()
+
+    def _schedule(self):
+        if self._index >= len(self._records):
+            self.finished.emit()
+            return
+        if self.speed <= 0:
+            self._timer.start(0)
+            return
+        delay = self._records[self._index][1] / self.speed - (time.perf_counter() - self._start)
+        self._timer.start(max(0, round(delay * 1000)))
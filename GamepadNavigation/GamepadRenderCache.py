@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Render Cache
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from collections import OrderedDict
+
+from qgis.core import QgsGeometry, QgsMapSettings, QgsProject
+
+from qgis.PyQt import sip
+
+def renderContext(settings: QgsMapSettings, theme: str = ''):
+    """
+    Returns a hashable description of what a map settings object renders,
+    irrespective of the extent it renders.
+    """
+    return (tuple(layer.id() for layer in settings.layers()),
+            settings.destinationCrs().authid(),
+            theme,
+            settings.outputSize().width(),
+            settings.outputSize().height(),
+            settings.outputDpi(),
+            settings.devicePixelRatio())
+
+def renderExtent(settings: QgsMapSettings):
+    """
+    Returns a hashable description of the view of a map settings object.
+    """
+    extent = settings.visibleExtent()
+    return (round(extent.xMinimum(), 6), round(extent.yMinimum(), 6),
+            round(extent.xMaximum(), 6), round(extent.yMaximum(), 6),
+            round(settings.rotation(), 3))
+
+def coverage(settings: QgsMapSettings, target_settings: QgsMapSettings):
+    """
+    Returns the ratio of the target settings' visible area covered by the settings' visible area.
+    """
+    target = QgsGeometry.fromQPolygonF(target_settings.visiblePolygon())
+    area = target.area()
+    if area <= 0:
+        return 0.0
+    intersection = target.intersection(QgsGeometry.fromQPolygonF(settings.visiblePolygon()))
+    return intersection.area() / area
+
+class GamepadRenderCache:
+    """
+    Least recently used cache of rendered map images bounded by a memory budget.
+    Once watching a project, the renders of a layer are dropped as soon as that
+    layer needs repainting.
+    """
+
+    DEFAULT_BUDGET = 64 * 1024 * 1024
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self._budget = budget
+        self._memory = 0
+        self._entries = OrderedDict()
+        self._project = None
+        # repaint slots of the watched layers by layer id
+        self._watched = {}
+
+    def watch(self, project: QgsProject):
+        self.unwatch()
+        self._project = project
+        self._project.layersAdded.connect(self._watchLayers)
+        self._project.layersWillBeRemoved.connect(self._unwatchLayers)
+        self._watchLayers(self._project.mapLayers().values())
+
+    def unwatch(self):
+        if self._project is None:
+            return
+        self._project.layersAdded.disconnect(self._watchLayers)
+        self._project.layersWillBeRemoved.disconnect(self._unwatchLayers)
+        self._project = None
+        for layer_id in list(self._watched.keys()):
+            self._unwatchLayer(layer_id)
+
+    def _watchLayers(self, layers):
+        for layer in layers:
+            if layer.id() in self._watched:
+                continue
+            slot = lambda deferred=False, layer_id=layer.id(): self.removeLayer(layer_id)
+            layer.repaintRequested.connect(slot)
+            self._watched[layer.id()] = (layer, slot)
+
+    def _unwatchLayers(self, layer_ids):
+        for layer_id in layer_ids:
+            self._unwatchLayer(layer_id)
+            self.removeLayer(layer_id)
+
+    def _unwatchLayer(self, layer_id: str):
+        if layer_id not in self._watched:
+            return
+        (layer, slot) = self._watched.pop(layer_id)
+        if not sip.isdeleted(layer):
+            layer.repaintRequested.disconnect(slot)
+
+    def budget(self):
+        return self._budget
+
+    def setBudget(self, budget: int):
+        self._budget = budget
+        self._evict()
+
+    def memoryUsage(self):
+        return self._memory
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._memory = 0
+
+    def insert(self, context, settings: QgsMapSettings, image):
+        key = (context, renderExtent(settings))
+        if key in self._entries:
+            self._memory -= self._entries.pop(key)[1].sizeInBytes()
+        self._entries[key] = (settings, image)
+        self._memory += image.sizeInBytes()
+        self._evict()
+
+    def get(self, context, settings: QgsMapSettings):
+        key = (context, renderExtent(settings))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def match(self, context, settings: QgsMapSettings, min_coverage: float = 0.9, max_scale_ratio: float = 2.0):
+        """
+        Returns the (settings, image) entry best covering the view of the given settings,
+        or None when no entry of similar scale covers at least min_coverage of the view.
+        """
+        entry = self.get(context, settings)
+        if entry is not None:
+            return entry
+
+        best_key = None
+        best_coverage = min_coverage
+        map_units_per_pixel = settings.mapUnitsPerPixel()
+        for (key, (entry_settings, image)) in self._entries.items():
+            if key[0] != context or map_units_per_pixel <= 0:
+                continue
+            ratio = entry_settings.mapUnitsPerPixel() / map_units_per_pixel
+            if ratio > max_scale_ratio or ratio < 1 / max_scale_ratio:
+                continue
+            entry_coverage = coverage(entry_settings, settings)
+            if entry_coverage >= best_coverage:
+                best_key = key
+                best_coverage = entry_coverage
+
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def removeLayer(self, layer_id: str):
+        """
+        Drops the renders showing the given layer, renders of other layers are kept.
+        """
+        for key in [key for key in self._entries if layer_id in key[0][0]]:
+            self._memory -= self._entries.pop(key)[1].sizeInBytes()
+
+    def removeTheme(self, theme: str):
+        for key in [key for key in self._entries if key[0][2] == theme]:
+            self._memory -= self._entries.pop(key)[1].sizeInBytes()
+
+    def _evict(self):
+        while self._entries and self._memory > self._budget:
+            (key, (settings, image)) = self._entries.popitem(last=False)
+            self._memory -= image.sizeInBytes()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Response Curves
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import bisect
+import json
+import math
+
+from qgis.core import Qgis, QgsMessageLog, QgsProject
+
+_NUMPY_SUPPORT = True
+try:
+    import numpy
+except:
+    _NUMPY_SUPPORT = False
+
+from GamepadNavigation.GamepadBridge import AXES
+
+# number of lookup table entries sampling a curve over [0, 1]
+LUT_SIZE = 1024
+
+# Controls of each navigation mode, with the indexes of the AXES they are
+# driven by and their default curve. Stick controls driven by two axes can
+# use a radial deadzone. Maximum rates are expressed per 50 ms step.
+CONTROLS = {
+    '2d': [
+        ('pan', (0, 1), {'deadzone': 0.1, 'exponent': 3, 'maximum': 50}),
+        ('rotate', (2,), {'deadzone': 0.2, 'exponent': 3, 'maximum': 5}),
+        ('zoom', (3,), {'deadzone': 0.2, 'exponent': 3, 'maximum': 0.25}),
+        ('magnify', (4, 5), {'deadzone': 0.1, 'exponent': 1, 'maximum': 0.02}),
+    ],
+    '3d': [
+        ('move', (0, 1), {'deadzone': 0.1, 'exponent': 3, 'maximum': 1 / 150}),
+        ('look', (2, 3), {'deadzone': 0.2, 'exponent': 3, 'maximum': 5}),
+        ('elevate', (4, 5), {'deadzone': 0.1, 'exponent': 3, 'maximum': 1 / 150}),
+    ],
+}
+
+class GamepadResponseCurve:
+    """
+    Maps an axis magnitude to an output rate: magnitudes within the deadzone map to 0,
+    others to maximum * curve(magnitude), the curve being either magnitude ** exponent
+    or a piecewise linear spline through [[magnitude, output], ...] points in [0, 1].
+
+    The deadzone shape is either 'axial' (each axis on its own) or 'radial' (the
+    magnitude of a stick's two axes combined).
+    """
+
+    def __init__(self, deadzone: float = 0.1, exponent: float = 3, maximum: float = 1.0, shape: str = 'axial', spline=None):
+        self.deadzone = deadzone
+        self.exponent = exponent
+        self.maximum = maximum
+        self.shape = shape
+        self.spline = sorted(spline) if spline else None
+        self.lut = [self._evaluate(index / (LUT_SIZE - 1)) * maximum for index in range(LUT_SIZE)]
+
+    @staticmethod
+    def fromDefinition(definition: dict):
+        return GamepadResponseCurve(float(definition.get('deadzone', 0.1)),
+                                    float(definition.get('exponent', 3)),
+                                    float(definition.get('maximum', 1.0)),
+                                    definition.get('shape', 'axial'),
+                                    definition.get('spline'))
+
+    def _evaluate(self, magnitude: float):
+        if not self.spline:
+            return pow(magnitude, self.exponent)
+        points = self.spline
+        if magnitude <= points[0][0]:
+            return points[0][1]
+        if magnitude >= points[-1][0]:
+            return points[-1][1]
+        index = bisect.bisect_right([point[0] for point in points], magnitude)
+        (x0, y0) = points[index - 1]
+        (x1, y1) = points[index]
+        return y0 + (y1 - y0) * (magnitude - x0) / (x1 - x0) if x1 > x0 else y1
+
+    def value(self, magnitude: float):
+        if magnitude <= self.deadzone:
+            return 0.0
+        position = min(magnitude, 1.0) * (LUT_SIZE - 1)
+        index = min(int(position), LUT_SIZE - 2)
+        fraction = position - index
+        return self.lut[index] + (self.lut[index + 1] - self.lut[index]) * fraction
+
+class GamepadResponseProfile:
+    """
+    Compiled response curves of a navigation mode, mapping a whole gamepad state's
+    analog axes to signed output rates in a single batched step.
+    """
+
+    def __init__(self, mode: str, curves: dict):
+        self.mode = mode
+        self.curves = curves
+        self._controls = [(name, axes, curves[name]) for (name, axes, default) in CONTROLS[mode]]
+
+        if _NUMPY_SUPPORT:
+            # per axis lookup tables, deadzones and radial pairing
+            self._luts = numpy.zeros((len(AXES), LUT_SIZE))
+            self._deadzones = numpy.zeros(len(AXES))
+            self._radial_pairs = []
+            for (name, axes, curve) in self._controls:
+                for axis in axes:
+                    self._luts[axis] = curve.lut
+                    self._deadzones[axis] = curve.deadzone
+                if curve.shape == 'radial' and len(axes) == 2:
+                    self._radial_pairs.append(axes)
+            self._axis_indexes = numpy.arange(len(AXES))
+
+    @staticmethod
+    def fromProject(mode: str, project: QgsProject = None):
+        project = project or QgsProject.instance()
+        curves = {}
+        for (name, axes, default) in CONTROLS[mode]:
+            definition = dict(default)
+            (definition_string, found) = project.readEntry('GamepadNavigation', 'curve_{}_{}'.format(mode, name), '')
+            if found:
+                try:
+                    definition.update(json.loads(definition_string))
+                except (ValueError, TypeError):
+                    QgsMessageLog.logMessage('Ignoring invalid {} {} response curve \'{}\''.format(mode, name, definition_string), 'GamepadNavigation', Qgis.Warning)
+            curves[name] = GamepadResponseCurve.fromDefinition(definition)
+        return GamepadResponseProfile(mode, curves)
+
+    @staticmethod
+    def projectDefinitions(mode: str, project: QgsProject = None):
+        """
+        Returns the raw curve definitions stored in the project, to detect changes cheaply.
+        """
+        project = project or QgsProject.instance()
+        return tuple(project.readEntry('GamepadNavigation', 'curve_{}_{}'.format(mode, name), '')[0] for (name, axes, default) in CONTROLS[mode])
+
+    def map(self, values):
+        """
+        Maps the analog axes of gamepad state values to signed output rates, ordered as AXES.
+        """
+        if _NUMPY_SUPPORT:
+            return self._mapVectorized(values)
+
+        outputs = [0.0] * len(AXES)
+        for (name, axes, curve) in self._controls:
+            if curve.shape == 'radial' and len(axes) == 2:
+                (x, y) = (values[axes[0]], values[axes[1]])
+                magnitude = math.hypot(x, y)
+                if magnitude > curve.deadzone:
+                    output = curve.value(magnitude) / magnitude
+                    outputs[axes[0]] = x * output
+                    outputs[axes[1]] = y * output
+            else:
+                for axis in axes:
+                    output = curve.value(abs(values[axis]))
+                    outputs[axis] = output if values[axis] >= 0 else -output
+        return outputs
+
+    def _mapVectorized(self, values):
+        inputs = numpy.asarray(values[0:len(AXES)], dtype=float)
+        magnitudes = numpy.abs(inputs)
+        directions = numpy.sign(inputs)
+        for (first, second) in self._radial_pairs:
+            magnitude = math.hypot(inputs[first], inputs[second])
+            if magnitude > 0:
+                magnitudes[first] = magnitudes[second] = magnitude
+                directions[first] = inputs[first] / magnitude
+                directions[second] = inputs[second] / magnitude
+
+        positions = numpy.minimum(magnitudes, 1.0) * (LUT_SIZE - 1)
+        indexes = numpy.minimum(positions.astype(int), LUT_SIZE - 2)
+        fractions = positions - indexes
+        lower = self._luts[self._axis_indexes, indexes]
+        upper = self._luts[self._axis_indexes, indexes + 1]
+        outputs = (lower + (upper - lower) * fractions) * directions
+        outputs[magnitudes <= self._deadzones] = 0.0
+        return outputs.tolist()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Terrain Follower
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+
+from qgis.core import Qgis, QgsCoordinateTransform, QgsCsException, QgsMessageLog, QgsPointXY, QgsProject, QgsVector3D
+
+from GamepadNavigation.GamepadElevationCache import GamepadElevationCache
+
+_3D_SUPPORT = True
+try:
+    from qgis._3d import QgsTerrainGenerator
+except:
+    _3D_SUPPORT = False
+
+def terrainSource(settings):
+    """
+    Returns the (DEM layer, vertical scale, elevation offset) of a 3D map's terrain,
+    the layer being None for a flat terrain, or None for terrains that cannot be
+    sampled, e.g. online ones.
+    """
+    if not _3D_SUPPORT:
+        return None
+    generator = settings.terrainGenerator()
+    if generator is None:
+        return None
+    # the elevation offset appeared in QGIS 3.30
+    offset = settings.terrainElevationOffset() if hasattr(settings, 'terrainElevationOffset') else 0.0
+    if generator.type() == QgsTerrainGenerator.Dem and generator.layer() is not None:
+        return (generator.layer(), settings.terrainVerticalScale(), offset)
+    elif generator.type() == QgsTerrainGenerator.Flat:
+        return (None, settings.terrainVerticalScale(), offset)
+    return None
+
+class GamepadTerrainFollower:
+    """
+    Keeps a 3D scene's camera at a clearance above the ground while walking. Ground
+    elevations come from an elevation cache of the scene's DEM terrain, warmed along
+    the camera's way, the camera holding its height while a tile loads.
+    """
+
+    # map units above ground
+    DEFAULT_CLEARANCE = 10.0
+    MIN_CLEARANCE = 0.5
+    # time constant of the vertical adjustment, in seconds
+    SMOOTHING = 0.2
+    # seconds of travel ahead of the camera whose elevations are warmed up
+    LOOKAHEAD = 2.0
+
+    def __init__(self):
+        self.clearance = self.DEFAULT_CLEARANCE
+        self.cache = None
+        self.vertical_scale = 1.0
+        self.elevation_offset = 0.0
+        self._configured_clearance = None
+        self._transform = None
+        self._previous = None
+        # the scene whose terrain was last reported as unsupported, reported once
+        self._unsupported = None
+
+    def start(self, scene, clearance: float, max_tiles: int = GamepadElevationCache.DEFAULT_MAX_TILES):
+        """
+        Prepares following the terrain of a scene, returning False when its terrain
+        cannot be sampled. A clearance adjusted while walking is kept until the
+        configured clearance changes.
+        """
+        if clearance != self._configured_clearance:
+            self._configured_clearance = clearance
+            self.clearance = max(self.MIN_CLEARANCE, clearance)
+        self._previous = None
+
+        settings = scene.mapSettings()
+        source = terrainSource(settings)
+        if source is None:
+            self.release()
+            if scene is not self._unsupported:
+                self._unsupported = scene
+                QgsMessageLog.logMessage('Terrain following needs a DEM or flat terrain, the camera walks freely', 'GamepadNavigation', Qgis.Warning)
+            return False
+        self._unsupported = None
+        (layer, self.vertical_scale, self.elevation_offset) = source
+        if layer is None:
+            self.release()
+            return True
+
+        if self.cache is None or self.cache.layer_id != layer.id() or self.cache.max_tiles != max_tiles:
+            self.release()
+            self.cache = GamepadElevationCache(layer, 1, max_tiles)
+        self._transform = QgsCoordinateTransform(settings.crs(), self.cache.crs, QgsProject.instance())
+        return True
+
+    def release(self):
+        if self.cache is not None:
+            self.cache.stop()
+            self.cache = None
+        self._transform = None
+
+    def lift(self, scene, elapsed: float, climb: float):
+        """
+        Returns the vertical displacement bringing the camera towards its clearance
+        above ground, the climb rate (map units per second) adjusting the clearance.
+        """
+        self.clearance = max(self.MIN_CLEARANCE, self.clearance + climb * elapsed)
+        settings = scene.mapSettings()
+        position = scene.cameraController().camera().position()
+        world = QgsVector3D(position.x(), position.y(), position.z())
+        point = settings.worldToMapCoordinates(world)
+        ground = self.groundHeight(point.x(), point.y(), elapsed)
+        if ground is None:
+            return 0.0
+
+        target = settings.mapToWorldCoordinates(QgsVector3D(point.x(), point.y(), ground + self.clearance))
+        # the world's vertical axis is y or z depending on the QGIS version, the other one is unchanged
+        offset = (target.y() - world.y()) + (target.z() - world.z())
+        if self.SMOOTHING > 0:
+            offset *= 1 - math.exp(-elapsed / self.SMOOTHING)
+        return offset
+
+    def groundHeight(self, x: float, y: float, elapsed: float):
+        if self.cache is None:
+            # a flat terrain
+            return self.elevation_offset
+        try:
+            position = self._transform.transform(QgsPointXY(x, y))
+        except QgsCsException:
+            return None
+
+        (ahead_x, ahead_y) = (position.x(), position.y())
+        if self._previous is not None and elapsed > 0:
+            ahead_x += (position.x() - self._previous.x()) * self.LOOKAHEAD / elapsed
+            ahead_y += (position.y() - self._previous.y()) * self.LOOKAHEAD / elapsed
+        self.cache.prefetch(position.x(), position.y(), ahead_x, ahead_y)
+        self._previous = position
+
+        height = self.cache.height(position.x(), position.y())
+        return height * self.vertical_scale + self.elevation_offset if height is not None else None
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Theme Prerender
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+from qgis.core import QgsMapRendererParallelJob, QgsMapSettings, QgsProject
+from qgis.gui import QgsMapCanvas
+
+from GamepadNavigation.GamepadCanvasPreview import GamepadPreviewItem
+from GamepadNavigation.GamepadRenderCache import GamepadRenderCache, renderContext
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QObject, QTimer
+
+def themedSettings(settings: QgsMapSettings, theme: str):
+    """
+    Returns a copy of the map settings rendering the layers and styles of a map theme.
+    """
+    collection = QgsProject.instance().mapThemeCollection()
+    themed = QgsMapSettings(settings)
+    themed.setLayers(collection.mapThemeVisibleLayers(theme))
+    themed.setLayerStyleOverrides(collection.mapThemeStyleOverrides(theme))
+    return themed
+
+class GamepadThemePrerender(QObject):
+    """
+    Renders the map themes mapped to gamepad buttons for a 2D canvas' current view in
+    the background once the canvas is idle, so a theme switch can show its cached
+    image right away while the canvas renders the theme for real.
+    """
+
+    # milliseconds the canvas must stay still before themes are rendered
+    IDLE_DELAY = 500
+
+    def __init__(self, cache: GamepadRenderCache, parent: QObject = None):
+        super(GamepadThemePrerender, self).__init__(parent)
+        self.cache = cache
+        self.canvas = None
+        self.themes = []
+        self.job = None
+        self._job_theme = ''
+        self._queue = []
+        self._collection = None
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(self.IDLE_DELAY)
+        self.idle_timer.timeout.connect(self.render)
+
+    def isActive(self):
+        return self.canvas is not None
+
+    def start(self, canvas: QgsMapCanvas, themes: list):
+        collection = QgsProject.instance().mapThemeCollection()
+        if canvas is self.canvas and themes == self.themes and collection is self._collection:
+            return
+        self.stop()
+        if not themes:
+            return
+
+        self.canvas = canvas
+        self.themes = list(themes)
+        self.canvas.extentsChanged.connect(self.extentChanged)
+        self.canvas.mapCanvasRefreshed.connect(self.idle_timer.start)
+        self._collection = collection
+        self._collection.mapThemeChanged.connect(self.themeChanged)
+        if not self.canvas.isDrawing():
+            self.idle_timer.start()
+
+    def stop(self):
+        self.cancel()
+        self.idle_timer.stop()
+        if self.canvas is not None and not sip.isdeleted(self.canvas):
+            self.canvas.extentsChanged.disconnect(self.extentChanged)
+            self.canvas.mapCanvasRefreshed.disconnect(self.idle_timer.start)
+        if self._collection is not None and not sip.isdeleted(self._collection):
+            self._collection.mapThemeChanged.disconnect(self.themeChanged)
+        self._collection = None
+        self.themes = []
+        self.canvas = None
+
+    def extentChanged(self):
+        # the canvas' refresh completion restarts the idle timer
+        self.cancel()
+        self.idle_timer.stop()
+
+    def themeChanged(self, theme: str):
+        self.cache.removeTheme(theme)
+        if theme in self.themes and not self.canvas.isDrawing():
+            self.idle_timer.start()
+
+    def render(self):
+        if self.canvas is None or sip.isdeleted(self.canvas):
+            return
+        self.cancel()
+        self._queue = list(self.themes)
+        self.renderNext()
+
+    def renderNext(self):
+        while self._queue:
+            theme = self._queue.pop(0)
+            if not self._collection.hasMapTheme(theme):
+                continue
+            settings = themedSettings(self.canvas.mapSettings(), theme)
+            if self.cache.match(renderContext(settings, theme), settings, 0.99) is not None:
+                continue
+            self._job_theme = theme
+            self.job = QgsMapRendererParallelJob(settings)
+            self.job.finished.connect(self.renderFinished)
+            self.job.start()
+            return
+
+    def renderFinished(self):
+        job = self.job
+        self.job = None
+        self.cache.insert(renderContext(job.mapSettings(), self._job_theme), job.mapSettings(), job.renderedImage())
+        job.deleteLater()
+        self.renderNext()
+
+    def cancel(self):
+        self._queue = []
+        if self.job is None:
+            return
+        # let the cancelled job wind down in its own time rather than blocking
+        self.job.finished.disconnect(self.renderFinished)
+        self.job.finished.connect(self.job.deleteLater)
+        sip.transferto(self.job, None)
+        self.job.cancelWithoutBlocking()
+        self.job = None
+
+    def show(self, canvas: QgsMapCanvas, theme: str):
+        """
+        Displays the cached render of a theme for the canvas' current view until the
+        canvas has refreshed or its view changed. Returns False when nothing is cached.
+        """
+        settings = themedSettings(canvas.mapSettings(), theme)
+        entry = self.cache.match(renderContext(settings, theme), settings, 0.99)
+        if entry is None:
+            return False
+
+        item = GamepadPreviewItem(canvas)
+        item.setImage(entry[1], entry[0])
+
+        def refreshed():
+            canvas.mapCanvasRefreshed.disconnect(refreshed)
+            canvas.extentsChanged.disconnect(refreshed)
+            if not sip.isdeleted(item):
+                canvas.scene().removeItem(item)
+
+        canvas.mapCanvasRefreshed.connect(refreshed)
+        canvas.extentsChanged.connect(refreshed)
+        return True
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Gamepad View Transform
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+
+from qgis.core import QgsRectangle
+from qgis.gui import QgsMapCanvas
+
+class GamepadViewTransform:
+    """
+    Accumulates the pan, zoom, rotation and magnification requested for a 2D canvas
+    and applies them as a single canvas update with a single burst of change signals.
+    Changes moving the view by less than a pixel threshold are held back until they
+    add up to a visible change.
+    """
+
+    DEFAULT_THRESHOLD = 0.5
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.pan_x = 0.0
+        self.pan_y = 0.0
+        self.zoom_factor = 1.0
+        self.rotation = 0.0
+        self.magnification = 0.0
+
+    def isEmpty(self):
+        return self.pan_x == 0.0 and self.pan_y == 0.0 and self.zoom_factor == 1.0 and self.rotation == 0.0 and self.magnification == 0.0
+
+    def pan(self, x: float, y: float):
+        self.pan_x += x
+        self.pan_y += y
+
+    def zoom(self, factor: float):
+        self.zoom_factor *= factor
+
+    def rotate(self, degrees: float):
+        self.rotation += degrees
+
+    def magnify(self, delta: float):
+        self.magnification += delta
+
+    def pixelChange(self, canvas: QgsMapCanvas):
+        """
+        Returns the largest on-screen displacement, in pixels, the accumulated changes cause.
+        """
+        settings = canvas.mapSettings()
+        map_units_per_pixel = settings.mapUnitsPerPixel()
+        radius = math.hypot(settings.outputSize().width(), settings.outputSize().height()) / 2
+        changes = [abs(self.zoom_factor - 1) * radius,
+                   abs(math.radians(self.rotation)) * radius]
+        if map_units_per_pixel > 0:
+            changes.append(math.hypot(self.pan_x, self.pan_y) / map_units_per_pixel)
+        if canvas.magnificationFactor() > 0:
+            changes.append(abs(self.magnification / canvas.magnificationFactor()) * radius)
+        return max(changes)
+
+    def apply(self, canvas: QgsMapCanvas):
+        """
+        Applies the accumulated changes to the canvas, returning False when they were
+        held back for being below the pixel threshold.
+        """
+        if self.isEmpty() or self.pixelChange(canvas) < self.threshold:
+            return False
+
+        extent = canvas.mapSettings().extent()
+        scale = canvas.scale()
+        rotation = canvas.rotation()
+        magnification = canvas.magnificationFactor()
+
+        canvas.blockSignals(True)
+        try:
+            if self.pan_x != 0.0 or self.pan_y != 0.0 or self.zoom_factor != 1.0:
+                center = extent.center()
+                half_width = extent.width() / 2 * self.zoom_factor
+                half_height = extent.height() / 2 * self.zoom_factor
+                canvas.setExtent(QgsRectangle(center.x() + self.pan_x - half_width, center.y() + self.pan_y - half_height,
+                                              center.x() + self.pan_x + half_width, center.y() + self.pan_y + half_height))
+            if self.rotation != 0.0:
+                new_rotation = rotation + self.rotation
+                if new_rotation > 360:
+                    new_rotation = -360 + (new_rotation - 360)
+                elif new_rotation < -360:
+                    new_rotation = 360 + (new_rotation + 360)
+                canvas.setRotation(new_rotation)
+            if self.magnification != 0.0:
+                canvas.setMagnificationFactor(magnification + self.magnification)
+        finally:
+            canvas.blockSignals(False)
+        self.reset()
+
+        # a single burst of the signals the individual setters would have emitted
+        canvas.extentsChanged.emit()
+        if canvas.scale() != scale:
+            canvas.scaleChanged.emit(canvas.scale())
+        if canvas.rotation() != rotation:
+            canvas.rotationChanged.emit(canvas.rotation())
+        if canvas.magnificationFactor() != magnification:
+            canvas.magnificationChanged.emit(canvas.magnificationFactor())
+        return True
@@ -19,5 +19,9 @@ def classFactory(iface):  # pylint: disable=invalid-name
     :type iface: QgsInterface
     """
     #
+    import time
+    start = time.perf_counter()
     from .GamepadNavigation import GamepadNavigationPlugin
-    return GamepadNavigationPlugin(iface)
+    plugin = GamepadNavigationPlugin(iface)
+    plugin.startup_timings.add('Module import and creation', time.perf_counter() - start)
+    return plugin
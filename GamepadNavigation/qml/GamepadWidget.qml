@@ -1,51 +1,87 @@
 import QtQuick 2.14
 import QtQuick.Controls 2.14
+import QtQml 2.14
 import QtGamepad 1.14
 
 Item {
   width: 64
-  
-  function updateNavigation() {
-    var axisLeftMax = Math.max(Math.abs(gamepad.axisLeftX), Math.abs(gamepad.axisLeftY))
-    var axisRightMax = Math.max(Math.abs(gamepad.axisRightX), Math.abs(gamepad.axisRightY))
-    if (axisLeftMax > 0.1 || axisRightMax > 0.1) {
-      timer.running = true
-    } else {
-      if (timer.running) {
-        timer.running = false
-        gamepadBridge.refresh()
+
+  // while suspended, only states moving a value by at least wakeThreshold are pushed
+  property bool suspended: false
+  property double wakeThreshold: 0.1
+
+  function significantChange(values, previous) {
+    for (var i = 0; i < values.length; i++) {
+      if (Math.abs(values[i] - (i < previous.length ? previous[i] : 0)) >= wakeThreshold) {
+        return true
       }
     }
+    return false
   }
   
-  Gamepad {
-    id: gamepad
-    
-    onConnectedChanged: gamepadBridge.connected = connected
-    
-    deviceId: GamepadManager.connectedGamepads.length > 0 ? GamepadManager.connectedGamepads[0] : 0
-    onDeviceIdChanged: gamepadBridge.deviceId = deviceId
-    
-    onAxisLeftXChanged: gamepadBridge.axisLeftX = axisLeftX
-    onAxisLeftYChanged: gamepadBridge.axisLeftY = axisLeftY
-    onAxisRightXChanged: gamepadBridge.axisRightX = axisRightX
-    onAxisRightYChanged: gamepadBridge.axisRightY = axisRightY
-    onButtonL1Changed: gamepadBridge.buttonL1 = buttonL1
-    onButtonL2Changed: gamepadBridge.buttonL2 = buttonL2
-    onButtonL3Changed: gamepadBridge.buttonL3 = buttonL3
-    onButtonR1Changed: gamepadBridge.buttonR1 = buttonR1
-    onButtonR2Changed: gamepadBridge.buttonR2 = buttonR2
-    onButtonR3Changed: gamepadBridge.buttonR3 = buttonR3
-    onButtonAChanged: gamepadBridge.buttonA = buttonA
-    onButtonBChanged: gamepadBridge.buttonB = buttonB
-    onButtonXChanged: gamepadBridge.buttonX = buttonX
-    onButtonYChanged: gamepadBridge.buttonY = buttonY
-    onButtonUpChanged: gamepadBridge.buttonUp = buttonUp
-    onButtonDownChanged: gamepadBridge.buttonDown = buttonDown
-    onButtonLeftChanged: gamepadBridge.buttonLeft = buttonLeft
-    onButtonRightChanged: gamepadBridge.buttonRight = buttonRight
-    onButtonSelectChanged: gamepadBridge.buttonSelect = buttonSelect
-    onButtonStartChanged: gamepadBridge.buttonStart = buttonStart
+  // one gamepad per connected device, each pushing its state to its own bridge slot
+  Instantiator {
+    model: GamepadManager.connectedGamepads
+
+    delegate: Gamepad {
+      deviceId: modelData
+
+      Component.onCompleted: gamepadDevices.setConnected(deviceId, connected)
+      // the backend clears gamepadDevices when tearing its items down while gamepads stay connected
+      Component.onDestruction: if (gamepadDevices) gamepadDevices.setConnected(deviceId, false)
+      onConnectedChanged: gamepadDevices.setConnected(deviceId, connected)
+
+      // push the whole state once per input frame rather than once per changed property
+      onAxisLeftXChanged: schedulePush()
+      onAxisLeftYChanged: schedulePush()
+      onAxisRightXChanged: schedulePush()
+      onAxisRightYChanged: schedulePush()
+      onButtonL1Changed: schedulePush()
+      onButtonL2Changed: schedulePush()
+      onButtonL3Changed: schedulePush()
+      onButtonR1Changed: schedulePush()
+      onButtonR2Changed: schedulePush()
+      onButtonR3Changed: schedulePush()
+      onButtonAChanged: schedulePush()
+      onButtonBChanged: schedulePush()
+      onButtonXChanged: schedulePush()
+      onButtonYChanged: schedulePush()
+      onButtonUpChanged: schedulePush()
+      onButtonDownChanged: schedulePush()
+      onButtonLeftChanged: schedulePush()
+      onButtonRightChanged: schedulePush()
+      onButtonSelectChanged: schedulePush()
+      onButtonStartChanged: schedulePush()
+
+      property bool pushPending: false
+      property double changedAt: 0
+      property var delivered: []
+
+      function schedulePush() {
+        if (!pushPending) {
+          pushPending = true
+          changedAt = Date.now()
+          Qt.callLater(pushState)
+        }
+      }
+
+      // values ordered as GamepadBridge.FIELDS
+      function pushState() {
+        pushPending = false
+        var values = [
+          axisLeftX, axisLeftY, axisRightX, axisRightY, buttonL2, buttonR2,
+          buttonL1, buttonL3, buttonR1, buttonR3,
+          buttonA, buttonB, buttonX, buttonY,
+          buttonUp, buttonDown, buttonLeft, buttonRight,
+          buttonSelect, buttonStart
+        ]
+        if (suspended && !significantChange(values, delivered)) {
+          return
+        }
+        delivered = values
+        gamepadDevices.setState(deviceId, values, changedAt)
+      }
+    }
   }
 
   SystemPalette {
@@ -61,7 +97,7 @@ Item {
       anchors.fill: parent
       width: parent.height - 4
       height: parent.height - 4
-      source: gamepad.connected 
+      source: GamepadManager.connectedGamepads.length > 0
               ? '../images/gamepad_on.svg'
               : '../images/gamepad_off.svg'
       fillMode: Image.PreserveAspectFit
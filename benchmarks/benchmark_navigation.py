@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Navigation benchmarks
+
+Measures the cost of the plugin's navigation hot path under an offscreen QGIS
+application, against synthetic projects of growing size driven by synthetic
+(or replayed) gamepad input. Results are written as JSON to compare plugin
+versions:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/benchmark_navigation.py --output results.json
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import argparse
+import configparser
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from qgis.core import (Qgis, QgsBookmark, QgsCoordinateReferenceSystem, QgsFeature, QgsGeometry, QgsLayerTreeModel,
+                       QgsMapThemeCollection, QgsPointXY, QgsProject, QgsRectangle, QgsReferencedRectangle, QgsVectorLayer)
+from qgis.gui import QgsLayerTreeMapCanvasBridge, QgsLayerTreeView, QgsMapCanvas, QgsMessageBar
+from qgis.testing import start_app
+
+from qgis.PyQt.QtCore import pyqtSignal, QEventLoop, QObject, QTimer
+from qgis.PyQt.QtWidgets import QStatusBar
+
+# (name, layers, features per layer, bookmarks, map themes, extra map canvases)
+SIZES = [
+    ('small', 2, 1000, 10, 2, 0),
+    ('medium', 10, 10000, 100, 20, 2),
+    ('large', 40, 50000, 1000, 200, 6),
+]
+
+CRS = QgsCoordinateReferenceSystem('EPSG:3857')
+EXTENT = QgsRectangle(-1000000, -1000000, 1000000, 1000000)
+
+class BenchmarkInterface(QObject):
+    """
+    The parts of QgisInterface used by the plugin, backed by real offscreen widgets.
+    """
+
+    initializationCompleted = pyqtSignal()
+
+    def __init__(self):
+        super(BenchmarkInterface, self).__init__()
+        self.project = QgsProject.instance()
+        self.canvases = [self._createCanvas('theMapCanvas')]
+        self.layer_tree_view = QgsLayerTreeView()
+        self.layer_tree_view.setModel(QgsLayerTreeModel(self.project.layerTreeRoot()))
+        self.layer_tree_bridge = QgsLayerTreeMapCanvasBridge(self.project.layerTreeRoot(), self.canvases[0])
+        self.status_bar = QStatusBar()
+        self.message_bar = QgsMessageBar()
+
+    def _createCanvas(self, name: str):
+        canvas = QgsMapCanvas()
+        canvas.setObjectName(name)
+        canvas.resize(800, 600)
+        canvas.setDestinationCrs(CRS)
+        canvas.setExtent(EXTENT)
+        canvas.show()
+        return canvas
+
+    def setExtraCanvases(self, count: int):
+        for canvas in self.canvases[1:]:
+            canvas.deleteLater()
+        self.canvases = self.canvases[0:1]
+        for index in range(count):
+            canvas = self._createCanvas('benchmarkCanvas{}'.format(index))
+            canvas.setLayers(self.project.mapLayers().values())
+            self.canvases.append(canvas)
+
+    def mapCanvas(self):
+        return self.canvases[0]
+
+    def mapCanvases(self):
+        return self.canvases
+
+    def layerTreeView(self):
+        return self.layer_tree_view
+
+    def mainWindow(self):
+        return None
+
+    def statusBarIface(self):
+        return self.status_bar
+
+    def messageBar(self):
+        return self.message_bar
+
+def spin(msecs: int):
+    loop = QEventLoop()
+    QTimer.singleShot(msecs, loop.quit)
+    loop.exec_()
+
+def waitFor(signal, msecs: int):
+    """
+    Runs the event loop until the signal fires, returning False on timeout.
+    """
+    loop = QEventLoop()
+    fired = []
+    def emitted(*args):
+        fired.append(True)
+        loop.quit()
+    signal.connect(emitted)
+    QTimer.singleShot(msecs, loop.quit)
+    loop.exec_()
+    signal.disconnect(emitted)
+    return bool(fired)
+
+def summary(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    percentiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else [samples[0]] * 99
+    return {
+        'count': len(samples),
+        'mean': statistics.fmean(samples),
+        'p50': percentiles[49],
+        'p95': percentiles[94],
+        'p99': percentiles[98],
+        'max': samples[-1],
+    }
+
+def inputState(axis_left_x: float = 0.0, axis_left_y: float = 0.0, axis_right_x: float = 0.0, axis_right_y: float = 0.0, buttons=()):
+    from GamepadNavigation.GamepadBridge import BUTTONS
+    return [axis_left_x, axis_left_y, axis_right_x, axis_right_y, 0.0, 0.0] + [1.0 if name in buttons else 0.0 for name in BUTTONS]
+
+def buildProject(iface: BenchmarkInterface, layers: int, features: int, bookmarks: int, themes: int, canvases: int):
+    project = QgsProject.instance()
+    project.clear()
+    project.setCrs(CRS)
+    project.bookmarkManager().clear()
+
+    for layer_index in range(layers):
+        layer = QgsVectorLayer('Point?crs=EPSG:3857', 'points {}'.format(layer_index), 'memory')
+        # a regular grid of points, shifted per layer
+        side = max(1, math.ceil(math.sqrt(features)))
+        step = EXTENT.width() / side
+        new_features = []
+        for feature_index in range(features):
+            feature = QgsFeature()
+            x = EXTENT.xMinimum() + (feature_index % side + layer_index / layers) * step
+            y = EXTENT.yMinimum() + (feature_index // side + layer_index / layers) * step
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            new_features.append(feature)
+        layer.dataProvider().addFeatures(new_features)
+        project.addMapLayer(layer)
+
+    bookmark_ids = []
+    for bookmark_index in range(bookmarks):
+        bookmark = QgsBookmark()
+        bookmark.setName('bookmark {}'.format(bookmark_index))
+        offset = (bookmark_index % 100) * 10000
+        bookmark.setExtent(QgsReferencedRectangle(QgsRectangle(offset, offset, offset + 100000, offset + 100000), CRS))
+        bookmark_ids.append(project.bookmarkManager().addBookmark(bookmark)[0])
+
+    theme_names = []
+    map_layers = list(project.mapLayers().values())
+    for theme_index in range(themes):
+        record = QgsMapThemeCollection.MapThemeRecord()
+        record.setLayerRecords([QgsMapThemeCollection.MapThemeLayerRecord(layer) for (index, layer) in enumerate(map_layers) if (index + theme_index) % 2 == 0])
+        name = 'theme {}'.format(theme_index)
+        project.mapThemeCollection().insert(name, record)
+        theme_names.append(name)
+
+    iface.mapCanvas().setLayers(map_layers)
+    iface.mapCanvas().setExtent(EXTENT)
+    iface.setExtraCanvases(canvases)
+
+    project.writeEntry('GamepadNavigation', 'canvas', '2d:theMapCanvas')
+    if bookmark_ids:
+        project.writeEntry('GamepadNavigation', 'buttonA', 'bookmark:{}'.format(bookmark_ids[-1]))
+    if theme_names:
+        project.writeEntry('GamepadNavigation', 'buttonB', 'map_theme:{}'.format(theme_names[-1]))
+
+def benchmarkFetchCanvas(plugin, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        plugin.fetchCanvas()
+        samples.append(time.perf_counter() - start)
+    return summary(samples)
+
+def benchmarkUpdateNavigation(plugin, iterations: int):
+    # sticks within the deadzone, the cost of handling idle input changes
+    samples = []
+    for index in range(iterations):
+        plugin.gamepad_bridge.setState(inputState(axis_left_x=0.01 * (index % 2)))
+        start = time.perf_counter()
+        plugin.updateNavigation()
+        samples.append(time.perf_counter() - start)
+    return summary(samples)
+
+def benchmarkNavigation(plugin, canvas, duration: int, replay_path: str = None):
+    tick_cpu = []
+    tick_wall = []
+
+    def timedNavigationTimeout(elapsed):
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        plugin.navigationTimeout(elapsed)
+        tick_cpu.append(time.process_time() - cpu_start)
+        tick_wall.append(time.perf_counter() - wall_start)
+
+    plugin.timer.tick.disconnect(plugin.navigationTimeout)
+    plugin.timer.tick.connect(timedNavigationTimeout)
+
+    replay = None
+    start = time.perf_counter()
+    if replay_path:
+        from GamepadNavigation.GamepadRecorder import GamepadReplay
+        replay = GamepadReplay(plugin.gamepad_bridge, replay_path)
+        loop = QEventLoop()
+        replay.finished.connect(loop.quit)
+        replay.start()
+        loop.exec_()
+    else:
+        plugin.gamepad_bridge.setState(inputState(axis_left_x=0.8, axis_left_y=-0.4, axis_right_y=0.3))
+        spin(duration)
+    navigation_time = time.perf_counter() - start
+
+    # time to first rendered frame once the sticks are released
+    stop_start = time.perf_counter()
+    plugin.gamepad_bridge.setState(inputState())
+    waitFor(canvas.mapCanvasRefreshed, 30000)
+    first_frame = time.perf_counter() - stop_start
+
+    plugin.timer.tick.disconnect(timedNavigationTimeout)
+    plugin.timer.tick.connect(plugin.navigationTimeout)
+
+    return {
+        'tick_cpu_time': summary(tick_cpu),
+        'tick_wall_time': summary(tick_wall),
+        'ticks_per_second': len(tick_cpu) / navigation_time if navigation_time > 0 else 0.0,
+        'dropped_frames': plugin.timer.droppedFrames(),
+        'first_frame_after_stop': first_frame,
+    }
+
+def resetView(canvas):
+    """
+    Shows the whole extent with every layer visible, so that each bookmark and map
+    theme button press changes the view.
+    """
+    for layer in QgsProject.instance().layerTreeRoot().findLayers():
+        layer.setItemVisibilityChecked(True)
+    canvas.setExtent(EXTENT)
+    canvas.refresh()
+    waitFor(canvas.mapCanvasRefreshed, 30000)
+
+def benchmarkButtonPresses(plugin, canvas, iterations: int):
+    # from the press until the action's result is rendered, e.g. once a bookmark's
+    # fly-to animation ended and its destination was drawn; timeouts are not sampled
+    latencies = {}
+    for button in ('buttonA', 'buttonB'):
+        samples = []
+        for _ in range(iterations):
+            resetView(canvas)
+            start = time.perf_counter()
+            plugin.gamepad_bridge.setState(inputState(buttons=(button,)))
+            if waitFor(canvas.mapCanvasRefreshed, 30000):
+                samples.append(time.perf_counter() - start)
+            plugin.gamepad_bridge.setState(inputState())
+        latencies[button] = summary(samples)
+    resetView(canvas)
+    return latencies
+
+def pluginVersion():
+    metadata = configparser.ConfigParser()
+    metadata.read(os.path.join(os.path.dirname(__file__), '..', 'GamepadNavigation', 'metadata.txt'))
+    return metadata.get('general', 'version', fallback='')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Gamepad Navigation plugin hot path')
+    parser.add_argument('--output', help='JSON file the results are written to, defaults to stdout')
+    parser.add_argument('--sizes', default=','.join(size[0] for size in SIZES), help='comma separated synthetic project sizes to benchmark')
+    parser.add_argument('--duration', type=int, default=5000, help='stick navigation duration in milliseconds')
+    parser.add_argument('--iterations', type=int, default=200, help='iterations of the fetchCanvas and updateNavigation benchmarks')
+    parser.add_argument('--press-iterations', type=int, default=20, help='iterations of the button press benchmark, each waiting for the action to be rendered')
+    parser.add_argument('--replay', help='input log replayed instead of the synthetic stick input')
+    args = parser.parse_args()
+
+    # the QgsApplication is kept alive by qgis.testing itself
+    start_app()
+
+    from GamepadNavigation.GamepadNavigation import GamepadNavigationPlugin
+
+    iface = BenchmarkInterface()
+    plugin = GamepadNavigationPlugin(iface)
+    plugin.initGui()
+    # the input stack is otherwise only started once a gamepad is plugged in
+    plugin.startInput()
+
+    results = []
+    requested_sizes = args.sizes.split(',')
+    for (name, layers, features, bookmarks, themes, canvases) in SIZES:
+        if name not in requested_sizes:
+            continue
+        buildProject(iface, layers, features, bookmarks, themes, canvases)
+        plugin.canvas_resolver.invalidate()
+        plugin.action_table.reload()
+        iface.mapCanvas().refresh()
+        waitFor(iface.mapCanvas().mapCanvasRefreshed, 30000)
+
+        result = {
+            'size': name,
+            'layers': layers,
+            'features_per_layer': features,
+            'bookmarks': bookmarks,
+            'map_themes': themes,
+            'extra_map_canvases': canvases,
+            'fetch_canvas': benchmarkFetchCanvas(plugin, args.iterations),
+            'update_navigation': benchmarkUpdateNavigation(plugin, args.iterations),
+            'button_press': benchmarkButtonPresses(plugin, iface.mapCanvas(), args.press_iterations),
+        }
+        result.update(benchmarkNavigation(plugin, iface.mapCanvas(), args.duration, args.replay))
+        results.append(result)
+
+    plugin.unload()
+
+    report = {
+        'plugin_version': pluginVersion(),
+        'qgis_version': Qgis.version(),
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'startup': [{'stage': stage, 'time': seconds, 'adds_to_launch': not deferred} for (stage, seconds, deferred) in plugin.startup_timings.stages],
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Navigation soak test
+
+Drives hours of synthetic stick and button input through the plugin's gamepad
+bridge against an offscreen canvas, sampling Python allocations, live QObjects,
+widgets, canvas items, signal connections and navigation tick timings along the
+way. Exits with a non-zero status when any of them grows beyond its tolerance:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/soak_navigation.py --duration 14400 --output soak.json
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import argparse
+import collections
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmark_navigation import SIZES, BenchmarkInterface, buildProject, inputState, pluginVersion, spin, summary, waitFor
+
+from qgis.core import Qgis, QgsProject
+from qgis.testing import start_app
+
+from qgis.PyQt.QtCore import QCoreApplication, QEvent, QObject
+from qgis.PyQt.QtWidgets import QApplication
+
+# signals whose connections are counted, per watched object
+BRIDGE_SIGNALS = ['connectedChanged', 'stateChanged', 'axisLeftChanged', 'axisRightChanged', 'buttonL2Changed', 'buttonR2Changed', 'buttonPressed', 'buttonReleased']
+CANVAS_SIGNALS = ['extentsChanged', 'scaleChanged', 'rotationChanged', 'magnificationChanged', 'mapCanvasRefreshed', 'renderStarting', 'destroyed']
+LAYER_SIGNALS = ['repaintRequested', 'willBeDeleted']
+# buttons pressed between navigation bursts, buttonX being left unmapped
+SOAK_BUTTONS = ['buttonA', 'buttonB', 'buttonX']
+
+def processDeferredDeletes():
+    # objects released with deleteLater() from nested event loops are otherwise kept until the next one
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    gc.collect()
+
+def qobjectCounts():
+    counts = collections.Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, QObject):
+            counts[type(obj).__name__] += 1
+    return counts
+
+def connectionCount(obj, signals):
+    count = 0
+    for name in signals:
+        try:
+            count += obj.receivers(getattr(obj, name))
+        except (AttributeError, RuntimeError, TypeError):
+            # receivers() is only reachable on objects created from Python
+            pass
+    return count
+
+def connectionCounts(iface, plugin=None):
+    counts = {
+        'canvases': sum(connectionCount(canvas, CANVAS_SIGNALS) for canvas in iface.mapCanvases()),
+        'layers': sum(connectionCount(layer, LAYER_SIGNALS) for layer in QgsProject.instance().mapLayers().values()),
+    }
+    if plugin is not None:
+        counts['bridges'] = sum(connectionCount(bridge, BRIDGE_SIGNALS) for bridge in plugin.device_manager.bridges())
+    counts['total'] = sum(counts.values())
+    return counts
+
+class TickProbe:
+    """
+    Times the plugin's navigation ticks and the intervals between ticks of a same
+    navigation burst.
+    """
+
+    def __init__(self):
+        self.plugin = None
+        self.reset()
+
+    def reset(self):
+        self.tick_times = []
+        self.lateness = []
+        self._last_tick = None
+
+    def attach(self, plugin):
+        self.plugin = plugin
+        plugin.timer.tick.disconnect(plugin.navigationTimeout)
+        plugin.timer.tick.connect(self.tick)
+
+    def detach(self):
+        self.plugin.timer.tick.disconnect(self.tick)
+        self.plugin.timer.tick.connect(self.plugin.navigationTimeout)
+        self.plugin = None
+
+    def tick(self, elapsed: float):
+        start = time.perf_counter()
+        if self._last_tick is not None and start - self._last_tick < self.plugin.timer.MAX_ELAPSED:
+            self.lateness.append(max(0.0, start - self._last_tick - self.plugin.timer.frameInterval()))
+        self._last_tick = start
+        self.plugin.navigationTimeout(elapsed)
+        self.tick_times.append(time.perf_counter() - start)
+
+    def burstEnded(self):
+        self._last_tick = None
+
+def createPlugin(iface):
+    from GamepadNavigation.GamepadNavigation import GamepadNavigationPlugin
+
+    plugin = GamepadNavigationPlugin(iface)
+    plugin.initGui()
+    # the input stack is otherwise only started once a gamepad is plugged in
+    plugin.startInput()
+    plugin.canvas_resolver.invalidate()
+    plugin.action_table.reload()
+    return plugin
+
+def navigationCycle(plugin, iface, probe: TickProbe, rng: random.Random, cycle: int):
+    """
+    A navigation burst of a few random stick deflections, the return to rest and
+    a button press, ending with the message bar cleared as a user would.
+    """
+    bridge = plugin.gamepad_bridge
+    for _ in range(4):
+        bridge.setState(inputState(axis_left_x=rng.uniform(-1.0, 1.0), axis_left_y=rng.uniform(-1.0, 1.0),
+                                   axis_right_x=rng.uniform(-0.3, 0.3), axis_right_y=rng.uniform(-0.5, 0.5)))
+        spin(cycle // 8)
+    bridge.setState(inputState())
+    probe.burstEnded()
+    waitFor(iface.mapCanvas().mapCanvasRefreshed, 10000)
+
+    # the missing mapping message is only shown once, show it on every unmapped press
+    plugin.missing_mapping_warning_shown = False
+    bridge.setState(inputState(buttons=(rng.choice(SOAK_BUTTONS),)))
+    spin(50)
+    bridge.setState(inputState())
+    # long enough for a bookmark flight to land
+    spin(cycle // 2)
+    iface.messageBar().clearWidgets()
+
+def sample(plugin, iface, probe: TickProbe, elapsed: float, cycles: int):
+    processDeferredDeletes()
+    (traced, traced_peak) = tracemalloc.get_traced_memory()
+    qobjects = qobjectCounts()
+    result = {
+        'elapsed': elapsed,
+        'cycles': cycles,
+        'traced_memory': traced,
+        'traced_memory_peak': traced_peak,
+        'python_qobjects': sum(qobjects.values()),
+        'widgets': len(QApplication.allWidgets()),
+        'canvas_items': len(iface.mapCanvas().scene().items()),
+        'connections': connectionCounts(iface, plugin),
+        'tick_time': summary(probe.tick_times),
+        'tick_lateness': summary(probe.lateness),
+    }
+    probe.reset()
+    return (result, qobjects)
+
+def growth(samples, key):
+    return key(samples[-1]) - key(samples[0])
+
+def check(samples, args):
+    """
+    Returns the failures found comparing the last sample to the first one after warm up.
+    """
+    failures = []
+    if len(samples) < 2:
+        return failures
+
+    memory_growth = growth(samples, lambda sample: sample['traced_memory'])
+    if memory_growth > args.max_memory_growth * 1024:
+        failures.append('Python allocations grew by {:.0f} KiB'.format(memory_growth / 1024))
+    for (key, label) in (('python_qobjects', 'Live Python QObjects'), ('widgets', 'Widgets'), ('canvas_items', 'Canvas items')):
+        object_growth = growth(samples, lambda sample: sample[key])
+        if object_growth > args.max_object_growth:
+            failures.append('{} grew by {}'.format(label, object_growth))
+    connection_growth = growth(samples, lambda sample: sample['connections']['total'])
+    if connection_growth > args.max_connection_growth:
+        failures.append('Signal connections grew by {}'.format(connection_growth))
+
+    timed = [sample for sample in samples if sample['tick_time'] is not None]
+    if len(timed) >= 2:
+        first_p95 = timed[0]['tick_time']['p95']
+        last_p95 = timed[-1]['tick_time']['p95']
+        if last_p95 > first_p95 * (1 + args.max_tick_drift) + 0.001:
+            failures.append('Navigation tick p95 drifted from {:.2f} ms to {:.2f} ms'.format(first_p95 * 1000, last_p95 * 1000))
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test the Gamepad Navigation plugin navigation cycle')
+    parser.add_argument('--output', help='JSON file the samples are written to, defaults to stdout')
+    parser.add_argument('--size', default='small', choices=[size[0] for size in SIZES], help='synthetic project size')
+    parser.add_argument('--duration', type=float, default=3600, help='soak duration in seconds')
+    parser.add_argument('--cycle', type=int, default=1000, help='milliseconds of stick input per navigation cycle')
+    parser.add_argument('--sample-interval', type=float, default=60, help='seconds between samples')
+    parser.add_argument('--warmup', type=int, default=20, help='navigation cycles run before the first sample, filling caches')
+    parser.add_argument('--reload-every', type=int, default=0, help='unload and reload the plugin every that many cycles, 0 never does')
+    parser.add_argument('--seed', type=int, default=0, help='random input seed')
+    parser.add_argument('--max-memory-growth', type=float, default=2048, help='tolerated Python allocation growth, in KiB')
+    parser.add_argument('--max-object-growth', type=int, default=20, help='tolerated growth of live QObjects, widgets and canvas items')
+    parser.add_argument('--max-connection-growth', type=int, default=0, help='tolerated growth of signal connections')
+    parser.add_argument('--max-tick-drift', type=float, default=0.5, help='tolerated relative growth of the navigation tick p95')
+    args = parser.parse_args()
+
+    # the QgsApplication is kept alive by qgis.testing itself
+    start_app()
+
+    iface = BenchmarkInterface()
+    (name, layers, features, bookmarks, themes, canvases) = [size for size in SIZES if size[0] == args.size][0]
+    buildProject(iface, layers, features, bookmarks, themes, canvases)
+    iface.mapCanvas().refresh()
+    waitFor(iface.mapCanvas().mapCanvasRefreshed, 30000)
+
+    # connections of the canvases and layers before the plugin exists, restored by unload()
+    baseline_connections = connectionCounts(iface)
+    rng = random.Random(args.seed)
+    probe = TickProbe()
+    plugin = createPlugin(iface)
+    probe.attach(plugin)
+
+    cycles = 0
+    for _ in range(args.warmup):
+        navigationCycle(plugin, iface, probe, rng, args.cycle)
+        cycles += 1
+
+    tracemalloc.start(25)
+    start = time.perf_counter()
+    samples = []
+    (first_sample, first_qobjects) = sample(plugin, iface, probe, 0.0, cycles)
+    samples.append(first_sample)
+    first_snapshot = tracemalloc.take_snapshot()
+    next_sample = start + args.sample_interval
+    while time.perf_counter() - start < args.duration:
+        navigationCycle(plugin, iface, probe, rng, args.cycle)
+        cycles += 1
+        if args.reload_every > 0 and cycles % args.reload_every == 0:
+            probe.detach()
+            plugin.unload()
+            processDeferredDeletes()
+            plugin = createPlugin(iface)
+            probe.attach(plugin)
+        if time.perf_counter() >= next_sample:
+            samples.append(sample(plugin, iface, probe, time.perf_counter() - start, cycles)[0])
+            next_sample += args.sample_interval
+            print('{:.0f} s, {} cycles, {:.0f} KiB traced, {} QObjects'.format(samples[-1]['elapsed'], cycles, samples[-1]['traced_memory'] / 1024, samples[-1]['python_qobjects']), file=sys.stderr)
+
+    (last_sample, last_qobjects) = sample(plugin, iface, probe, time.perf_counter() - start, cycles)
+    samples.append(last_sample)
+    allocation_growth = [{'location': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                         for stat in tracemalloc.take_snapshot().compare_to(first_snapshot, 'lineno')[0:10]]
+    qobject_growth = {name: count for (name, count) in (last_qobjects - first_qobjects).most_common(10)}
+
+    # everything the plugin created must be released on unload
+    probe.detach()
+    plugin.unload()
+    processDeferredDeletes()
+    unloaded_connections = connectionCounts(iface)
+    tracemalloc.stop()
+
+    failures = check(samples, args)
+    if unloaded_connections['total'] > baseline_connections['total']:
+        failures.append('{} canvas and layer connections remain after unload'.format(unloaded_connections['total'] - baseline_connections['total']))
+
+    report = {
+        'plugin_version': pluginVersion(),
+        'qgis_version': Qgis.version(),
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'size': name,
+        'cycles': cycles,
+        'samples': samples,
+        'connections_before_load': baseline_connections,
+        'connections_after_unload': unloaded_connections,
+        'allocation_growth': allocation_growth,
+        'qobject_growth': qobject_growth,
+        'failures': failures,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    for failure in failures:
+        print('FAILED: {}'.format(failure), file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
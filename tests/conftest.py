@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Navigation tests
+
+Unit tests of the plugin's pure logic. Tests needing PyQt are skipped outside
+of a QGIS Python environment:
+
+    python3 -m pytest tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Elevation Cache tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+import time
+
+from array import array
+
+import pytest
+
+pytest.importorskip('qgis.core')
+
+from qgis.core import Qgis, QgsRectangle
+
+from GamepadNavigation import GamepadElevationCache as elevation_cache
+from GamepadNavigation.GamepadElevationCache import GamepadElevationCache, noDataSample
+
+SIZE = GamepadElevationCache.TILE_SIZE + 1
+
+class Block:
+    """
+    Stand-in for a QgsRasterBlock of SIZE x SIZE samples.
+    """
+
+    def __init__(self, data_type, typecode: str, samples, nodata=None):
+        self.data_type = data_type
+        self.samples = array(typecode, samples)
+        self.nodata = nodata
+
+    def isValid(self):
+        return True
+
+    def dataType(self):
+        return self.data_type
+
+    def data(self):
+        return self.samples.tobytes()
+
+    def hasNoData(self):
+        return self.nodata is not None
+
+    def hasNoDataValue(self):
+        return self.nodata is not None
+
+    def noDataValue(self):
+        return self.nodata
+
+    def isNoData(self, row: int, column: int):
+        return self.nodata is not None and self.value(row, column) == noDataSample(self.samples.typecode, self.nodata)
+
+    def value(self, row: int, column: int):
+        return self.samples[row * SIZE + column]
+
+class Provider:
+
+    def __init__(self, block: Block):
+        self._block = block
+
+    def block(self, band, extent, width, height):
+        return self._block
+
+def load(block: Block):
+    cache = GamepadElevationCache.__new__(GamepadElevationCache)
+    cache.band = 1
+    cache.resolution = 1.0
+    cache.tile_extent = GamepadElevationCache.TILE_SIZE
+    cache.extent = QgsRectangle(0, 0, 256, 256)
+    cache._provider = Provider(block)
+    return (cache._load((0, 0)), cache._loadSamples(block, SIZE))
+
+def same(values, expected):
+    return len(values) == len(expected) and all((math.isnan(value) and math.isnan(other)) or value == other for (value, other) in zip(values, expected))
+
+BLOCKS = [
+    ('Byte', 'B', [index % 256 for index in range(SIZE * SIZE)], 0),
+    ('Int16', 'h', [index - 2000 for index in range(SIZE * SIZE)], -9999),
+    ('Int32', 'i', [index * 1000 for index in range(SIZE * SIZE)], None),
+    ('Float32', 'f', [math.sin(index) * 1000 for index in range(SIZE * SIZE)], -3.4028234663852886e+38),
+    ('Float64', 'd', [index / 7 for index in range(SIZE * SIZE)], -9999.5),
+]
+
+@pytest.mark.parametrize('numpy_support', [True, False])
+@pytest.mark.parametrize('data_type,typecode,samples,nodata', BLOCKS)
+def test_bulk_load_matches_samples(monkeypatch, numpy_support, data_type, typecode, samples, nodata):
+    if numpy_support and not elevation_cache._NUMPY_SUPPORT:
+        pytest.skip('numpy is not available')
+    monkeypatch.setattr(elevation_cache, '_NUMPY_SUPPORT', numpy_support)
+    samples = list(samples)
+    if nodata is not None:
+        samples[0::7] = [nodata] * len(samples[0::7])
+    block = Block(getattr(Qgis, data_type), typecode, samples, nodata)
+    (values, expected) = load(block)
+    assert same(values, expected)
+    assert (nodata is None) == (not any(math.isnan(value) for value in values))
+
+def test_unconvertible_data_type_read_by_samples():
+    block = Block(getattr(Qgis, 'CInt16', None), 'h', range(SIZE * SIZE), 5)
+    (values, expected) = load(block)
+    assert same(values, expected) and math.isnan(values[5])
+
+def test_no_data_sample():
+    assert noDataSample('h', -9999.0) == -9999
+    assert noDataSample('B', -9999.0) is None
+    assert noDataSample('i', 1.5) is None
+    assert noDataSample('i', math.nan) is None
+    assert noDataSample('f', 0.1) == array('f', [0.1])[0]
+
+class FailingProvider:
+
+    def __init__(self):
+        self.calls = 0
+
+    def block(self, band, extent, width, height):
+        self.calls += 1
+        raise RuntimeError('provider failure')
+
+class Layer:
+    """
+    Stand-in for a QgsRasterLayer whose provider fails to read blocks.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def id(self):
+        return 'dem'
+
+    def crs(self):
+        return None
+
+    def rasterUnitsPerPixelX(self):
+        return 1.0
+
+    def rasterUnitsPerPixelY(self):
+        return 1.0
+
+    def extent(self):
+        return QgsRectangle(0, 0, 256, 256)
+
+    def dataProvider(self):
+        return self
+
+    def clone(self):
+        return self.provider
+
+def test_failing_tile_does_not_stop_the_loader():
+    provider = FailingProvider()
+    cache = GamepadElevationCache(Layer(provider))
+    try:
+        for key in ((0, 0), (1, 0)):
+            cache.request([key], urgent=True)
+            for attempt in range(500):
+                with cache._condition:
+                    if key in cache._tiles:
+                        break
+                time.sleep(0.01)
+            with cache._condition:
+                assert key not in cache._queued
+                assert all(math.isnan(value) for value in cache._tiles[key])
+        assert provider.calls == 2
+        assert cache.height(10.0, 10.0) is None
+    finally:
+        cache.stop()
+    assert not cache._thread.is_alive() and cache._provider is None
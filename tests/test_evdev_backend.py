@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Evdev Backend tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip('event devices are Linux only', allow_module_level=True)
+pytest.importorskip('qgis.core')
+
+from GamepadNavigation.GamepadBridge import FIELDS, FIELD_INDEX
+from GamepadNavigation.GamepadEvdevBackend import EV_ABS, EV_KEY, EV_SYN, EVENT, SYN_DROPPED, SYN_REPORT, GamepadEvdevDevice, packEvent
+
+BTN_SOUTH = 0x130
+BTN_TL = 0x136
+BTN_TL2 = 0x138
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_Z = 0x02
+ABS_RX = 0x03
+ABS_RY = 0x04
+ABS_HAT0X = 0x10
+ABS_HAT0Y = 0x11
+
+def report(timestamp: float = 0.0):
+    return packEvent(EV_SYN, SYN_REPORT, 0, timestamp)
+
+def openDevice(path: str):
+    return GamepadEvdevDevice(path, 0, os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+
+def value(device: GamepadEvdevDevice, name: str):
+    return device.values[FIELD_INDEX[name]]
+
+def test_decode_event_file(tmp_path):
+    path = str(tmp_path / 'events')
+    with open(path, 'wb') as events:
+        events.write(packEvent(EV_ABS, ABS_X, 32767, 12.5)
+                     + packEvent(EV_ABS, ABS_Y, -32768, 12.5)
+                     + packEvent(EV_ABS, ABS_RX, 16384, 12.5)
+                     + packEvent(EV_ABS, ABS_Z, 255, 12.5)
+                     + packEvent(EV_KEY, BTN_SOUTH, 1, 12.5)
+                     + packEvent(EV_KEY, BTN_TL, 1, 12.5)
+                     + packEvent(EV_ABS, ABS_HAT0X, -1, 12.5)
+                     + packEvent(EV_ABS, ABS_HAT0Y, 1, 12.5)
+                     + report(12.5))
+
+    device = openDevice(path)
+    try:
+        assert not device.is_event_device and not device.is_gamepad
+        assert device.read() is True
+        assert device.source_time == pytest.approx(12500)
+        assert value(device, 'axisLeftX') == 1.0
+        assert value(device, 'axisLeftY') == -1.0
+        assert value(device, 'axisRightX') == pytest.approx(0.5, abs=1e-4)
+        assert value(device, 'axisRightY') == 0.0
+        assert value(device, 'buttonL2') == 1.0
+        pressed = set(name for name in FIELDS if name.startswith('button') and name != 'buttonL2' and value(device, name))
+        assert pressed == {'buttonA', 'buttonL1', 'buttonLeft', 'buttonDown'}
+        # at the end of the file
+        assert device.read() is None
+    finally:
+        device.close()
+
+def test_frames_complete_on_report(tmp_path):
+    path = str(tmp_path / 'events')
+    with open(path, 'wb') as events:
+        events.write(packEvent(EV_KEY, BTN_SOUTH, 1))
+    device = openDevice(path)
+    try:
+        # changes are only reported once the frame is complete
+        assert device.read() is False
+        assert value(device, 'buttonA') == 1.0
+        with open(path, 'ab') as events:
+            events.write(report() + packEvent(EV_KEY, BTN_SOUTH, 0) + packEvent(EV_ABS, ABS_HAT0X, 1) + report())
+        assert device.read() is True
+        assert value(device, 'buttonA') == 0.0
+        assert value(device, 'buttonRight') == 1.0
+        assert value(device, 'buttonLeft') == 0.0
+    finally:
+        device.close()
+
+def test_partial_events_through_pipe():
+    (read_fd, write_fd) = os.pipe()
+    os.set_blocking(read_fd, False)
+    device = GamepadEvdevDevice('pipe', 0, read_fd)
+    try:
+        data = packEvent(EV_ABS, ABS_RY, -16384) + report()
+        split = EVENT.size // 2
+        os.write(write_fd, data[0:split])
+        assert device.read() is False
+        assert value(device, 'axisRightY') == 0.0
+        os.write(write_fd, data[split:])
+        assert device.read() is True
+        assert value(device, 'axisRightY') == pytest.approx(-0.5, abs=1e-4)
+    finally:
+        device.close()
+        os.close(write_fd)
+
+def test_dropped_events_are_ignored(tmp_path):
+    path = str(tmp_path / 'events')
+    with open(path, 'wb') as events:
+        events.write(packEvent(EV_SYN, SYN_DROPPED, 0)
+                     + packEvent(EV_KEY, BTN_SOUTH, 1)
+                     + report()
+                     + packEvent(EV_ABS, ABS_X, 32767)
+                     + report())
+    device = openDevice(path)
+    try:
+        assert device.read() is True
+        assert value(device, 'buttonA') == 0.0
+        assert value(device, 'axisLeftX') == 1.0
+    finally:
+        device.close()
+
+def test_digital_triggers_ignored_with_analog_triggers(tmp_path):
+    path = str(tmp_path / 'events')
+    with open(path, 'wb') as events:
+        events.write(packEvent(EV_KEY, BTN_TL2, 1) + report())
+    device = openDevice(path)
+    try:
+        assert device.analog_triggers
+        assert device.read() is False
+        assert value(device, 'buttonL2') == 0.0
+    finally:
+        device.close()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Gestures tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import pytest
+
+pytest.importorskip('qgis.PyQt.QtCore')
+
+from GamepadNavigation.GamepadGestures import GamepadGestureMachine
+
+# long press, double press and repeat interval, in milliseconds
+TIMINGS = (500, 250, 100)
+
+def machine(*mapped):
+    gestures = GamepadGestureMachine(*TIMINGS)
+    gestures.setMapped(mapped)
+    return gestures
+
+def test_plain_press_reported_on_press():
+    gestures = machine('buttonA')
+    assert gestures.press('buttonA', 0.0) == ['buttonA']
+    assert gestures.nextDeadline() is None
+    assert gestures.advance(10.0) == []
+    assert gestures.release('buttonA', 10.0) == []
+
+def test_long_press():
+    gestures = machine('buttonA', 'buttonA_long')
+    assert gestures.press('buttonA', 1.0) == []
+    assert gestures.nextDeadline() == pytest.approx(1.5)
+    assert gestures.advance(1.499) == []
+    assert gestures.advance(1.5) == ['buttonA_long']
+    assert gestures.release('buttonA', 2.0) == []
+
+def test_long_press_caught_on_release():
+    # a busy event loop did not advance the machine before the release
+    gestures = machine('buttonA_long')
+    assert gestures.press('buttonA', 0.0) == []
+    assert gestures.release('buttonA', 0.6) == ['buttonA_long']
+    assert gestures.nextDeadline() is None
+
+def test_short_press_with_long_press_mapped():
+    gestures = machine('buttonA', 'buttonA_long')
+    assert gestures.press('buttonA', 0.0) == []
+    assert gestures.release('buttonA', 0.1) == ['buttonA']
+    assert gestures.advance(1.0) == []
+
+def test_double_press():
+    gestures = machine('buttonA', 'buttonA_double')
+    assert gestures.press('buttonA', 0.0) == []
+    assert gestures.release('buttonA', 0.05) == []
+    assert gestures.advance(0.2) == []
+    assert gestures.press('buttonA', 0.2) == ['buttonA_double']
+    assert gestures.release('buttonA', 0.25) == []
+    assert gestures.advance(1.0) == []
+
+def test_double_press_window_expires():
+    gestures = machine('buttonA', 'buttonA_double')
+    gestures.press('buttonA', 0.0)
+    gestures.release('buttonA', 0.05)
+    assert gestures.nextDeadline() == pytest.approx(0.3)
+    assert gestures.advance(0.3) == ['buttonA']
+    assert gestures.press('buttonA', 0.4) == []
+
+def test_hold_repeat():
+    gestures = machine('buttonA', 'buttonA_repeat')
+    assert gestures.press('buttonA', 0.0) == ['buttonA']
+    assert gestures.advance(0.5) == ['buttonA_repeat']
+    assert gestures.advance(0.55) == []
+    assert gestures.advance(0.6) == ['buttonA_repeat']
+    assert gestures.advance(0.7) == ['buttonA_repeat']
+    assert gestures.release('buttonA', 0.75) == []
+    assert gestures.nextDeadline() is None
+
+def test_missed_repeats_are_skipped():
+    gestures = machine('buttonA_repeat')
+    gestures.press('buttonA', 0.0)
+    assert gestures.advance(0.5) == ['buttonA_repeat']
+    assert gestures.advance(1.0) == ['buttonA_repeat']
+    assert gestures.nextDeadline() == pytest.approx(1.1)
+
+def test_long_press_and_repeat():
+    gestures = machine('buttonA_long', 'buttonA_repeat')
+    assert gestures.press('buttonA', 0.0) == []
+    assert gestures.advance(0.5) == ['buttonA_long', 'buttonA_repeat']
+    assert gestures.advance(0.6) == ['buttonA_repeat']
+    assert gestures.release('buttonA', 0.65) == []
+
+def test_chord():
+    gestures = machine('buttonL1', 'buttonA', 'chord_buttonL1_buttonA')
+    assert gestures.press('buttonL1', 0.0) == []
+    assert gestures.press('buttonA', 0.1) == ['chord_buttonL1_buttonA']
+    assert gestures.release('buttonA', 0.2) == []
+    assert gestures.release('buttonL1', 0.3) == []
+    assert gestures.press('buttonA', 0.4) == ['buttonA']
+
+def test_chord_modifier_alone():
+    gestures = machine('buttonL1', 'chord_buttonL1_buttonA')
+    assert gestures.press('buttonL1', 0.0) == []
+    assert gestures.release('buttonL1', 0.1) == ['buttonL1']
+
+def test_chord_cancels_modifier_long_press():
+    gestures = machine('buttonL1_long', 'chord_buttonL1_buttonA')
+    gestures.press('buttonL1', 0.0)
+    assert gestures.press('buttonA', 0.1) == ['chord_buttonL1_buttonA']
+    assert gestures.advance(1.0) == []
+    assert gestures.release('buttonL1', 1.0) == []
+
+def test_reset_drops_pending_gestures():
+    gestures = machine('buttonA_double')
+    gestures.press('buttonA', 0.0)
+    gestures.release('buttonA', 0.05)
+    gestures.reset()
+    assert gestures.nextDeadline() is None
+    assert gestures.advance(1.0) == []
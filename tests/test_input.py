@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Input tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import pytest
+
+pytest.importorskip('qgis.core')
+
+from GamepadNavigation import GamepadInput
+from GamepadNavigation.GamepadInput import GamepadInputBackend, startInputBackend
+
+class UnreadableBackend(GamepadInputBackend):
+    # e.g. event devices without read permission
+    name = 'evdev'
+
+    @staticmethod
+    def isSupported():
+        return True
+
+    def start(self):
+        pass
+
+class WorkingBackend(GamepadInputBackend):
+    name = 'qtgamepad'
+
+    @staticmethod
+    def isSupported():
+        return True
+
+@pytest.fixture
+def backends(monkeypatch):
+    classes = {'evdev': UnreadableBackend, 'qtgamepad': WorkingBackend}
+    monkeypatch.setattr(GamepadInput, 'inputBackendClass', lambda name: classes.get(name))
+    return classes
+
+def test_auto_falls_back_when_start_fails(backends):
+    backend = startInputBackend('auto', None)
+    assert isinstance(backend, WorkingBackend) and backend.isActive()
+
+def test_no_backend_started(backends):
+    backends['qtgamepad'] = type('UnreadableQtGamepadBackend', (UnreadableBackend,), {'name': 'qtgamepad'})
+    assert startInputBackend('auto', None) is None
+
+def test_started_backend_is_kept(backends):
+    backends['evdev'] = WorkingBackend
+    backend = startInputBackend('evdev', None)
+    assert isinstance(backend, WorkingBackend)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Network Protocol tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import pytest
+
+from GamepadNavigation.GamepadNetworkProtocol import BUTTON_BITS, FLAG_DISCONNECT, FRAME, MAGIC, SEQUENCE_MODULO, STICKS, TRIGGERS, VERSION, isNewer, packFrame, unpackFrame
+
+VALUES = {
+    'axisLeftX': 0.25,
+    'axisLeftY': -0.5,
+    'axisRightX': 1.0,
+    'axisRightY': -1.0,
+    'buttonL2': 0.75,
+    'buttonR2': 0.0,
+    'buttonA': 1.0,
+    'buttonL3': 1.0,
+    'buttonStart': 1.0,
+}
+
+def test_round_trip():
+    frame = unpackFrame(packFrame(VALUES, 42, device=3, source_time=1700000000123.0, flags=FLAG_DISCONNECT))
+    assert (frame.device, frame.sequence, frame.flags, frame.source_time) == (3, 42, FLAG_DISCONNECT, 1700000000123)
+    for name in STICKS:
+        assert frame.values[name] == pytest.approx(VALUES[name], abs=1 / 32767)
+    for name in TRIGGERS:
+        assert frame.values[name] == pytest.approx(VALUES[name], abs=1 / 255)
+    for name in BUTTON_BITS:
+        assert frame.values[name] == VALUES.get(name, 0.0)
+
+def test_values_released_and_clamped():
+    frame = unpackFrame(packFrame({'axisLeftX': 2.0, 'axisLeftY': -3.0, 'buttonL2': -1.0, 'buttonR2': 5.0}, 1))
+    assert (frame.values['axisLeftX'], frame.values['axisLeftY']) == (1.0, -1.0)
+    assert (frame.values['buttonL2'], frame.values['buttonR2']) == (0.0, 1.0)
+    assert frame.values['axisRightX'] == 0.0
+    assert not any(frame.values[name] for name in BUTTON_BITS)
+
+def test_sequence_wraparound():
+    assert unpackFrame(packFrame({}, SEQUENCE_MODULO + 5)).sequence == 5
+    assert isNewer(5, SEQUENCE_MODULO - 3)
+    assert isNewer(0, SEQUENCE_MODULO - 1)
+    assert not isNewer(SEQUENCE_MODULO - 3, 5)
+    assert not isNewer(7, 7)
+    assert not isNewer(7, 8)
+    # a sequence half the range away is as likely older as newer, it is dropped
+    assert not isNewer(SEQUENCE_MODULO // 2, 0)
+
+def test_truncated_and_foreign_datagrams():
+    data = packFrame(VALUES, 1)
+    assert len(data) == FRAME.size
+    assert unpackFrame(data[:-1]) is None
+    assert unpackFrame(data[:FRAME.size // 2]) is None
+    assert unpackFrame(b'') is None
+    assert unpackFrame(data + b'\0') is None
+    assert unpackFrame(b'XX' + data[len(MAGIC):]) is None
+    assert unpackFrame(data[:len(MAGIC)] + bytes([VERSION + 1]) + data[len(MAGIC) + 1:]) is None
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Recorder tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import pytest
+
+pytest.importorskip('qgis.PyQt.QtCore')
+
+from GamepadNavigation.GamepadBridge import AXES, BUTTONS, FIELDS, GamepadBridge
+from GamepadNavigation.GamepadRecorder import RECORD_CONNECTED, RECORD_DEVICE, RECORD_STATE, GamepadRecorder, GamepadReplay, packState, readRecords, unpackState
+
+# axes are stored as 32-bit floats
+TOLERANCE = 1e-6
+
+def state(axes=(), buttons=()):
+    values = [0.0] * len(FIELDS)
+    values[0:len(axes)] = axes
+    for button in buttons:
+        values[FIELDS.index(button)] = 1.0
+    return values
+
+SEQUENCE = [
+    state((0.25, -0.5)),
+    state((0.333333, -0.777777, 0.1, 0.0, 0.5), ('buttonA',)),
+    state((1.0, -1.0, -0.123456, 0.987654, 0.0, 1.0), ('buttonA', 'buttonL1', 'buttonStart')),
+    state((0.0, 0.0, 0.0, 0.0, 0.0, 0.0), ('buttonStart',)),
+    state(),
+]
+
+def test_state_payload_round_trip():
+    for values in SEQUENCE:
+        assert unpackState(packState(values)) == pytest.approx(values, abs=TOLERANCE)
+    assert len(packState(SEQUENCE[0])) == 4 * len(AXES) + 4
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'input.gpnr')
+    source = GamepadBridge(None)
+    source.connected = True
+    recorder = GamepadRecorder(source)
+    recorder.start(path)
+    for values in SEQUENCE:
+        source.setState(values)
+    recorder.stop()
+    assert not recorder.isRecording()
+
+    records = list(readRecords(path))
+    assert [record[0] for record in records[0:3]] == [RECORD_CONNECTED, RECORD_DEVICE, RECORD_STATE]
+    assert records[0][2] is True
+    timestamps = [record[1] for record in records]
+    assert timestamps == sorted(timestamps) and timestamps[0] == 0.0
+    # the initial state, then every state pushed
+    assert len(records) == 3 + len(SEQUENCE)
+
+    target = GamepadBridge(None)
+    replayed = []
+    target.stateChanged.connect(lambda: replayed.append(list(target.state().values)))
+    replay = GamepadReplay(target, path, 0)
+    assert len(replay) == len(records)
+    while replay.step():
+        pass
+
+    assert target.connected
+    assert len(replayed) == len(SEQUENCE)
+    for (values, expected) in zip(replayed, SEQUENCE):
+        assert values == pytest.approx(expected, abs=TOLERANCE)
+    assert [list(target.state().values)[len(AXES) + index] for index in range(len(BUTTONS))] == [0.0] * len(BUTTONS)
+
+def test_unsupported_log(tmp_path):
+    path = tmp_path / 'input.gpnr'
+    path.write_bytes(b'NOPE' + bytes(4))
+    with pytest.raises(ValueError):
+        list(readRecords(str(path)))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Render Cache tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import pytest
+
+pytest.importorskip('qgis.core')
+
+from GamepadNavigation import GamepadRenderCache as render_cache
+from GamepadNavigation.GamepadRenderCache import GamepadRenderCache
+
+class Signal:
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+class Layer:
+
+    def __init__(self, layer_id: str):
+        self.layer_id = layer_id
+        self.repaintRequested = Signal()
+
+    def id(self):
+        return self.layer_id
+
+class Project:
+
+    def __init__(self, layers):
+        self.layers = {layer.id(): layer for layer in layers}
+        self.layersAdded = Signal()
+        self.layersWillBeRemoved = Signal()
+
+    def mapLayers(self):
+        return self.layers
+
+class Image:
+
+    def sizeInBytes(self):
+        return 1024
+
+def context(*layer_ids, theme: str = ''):
+    return (layer_ids, 'EPSG:3857', theme, 800, 600, 96, 1.0)
+
+@pytest.fixture
+def cache(monkeypatch):
+    # entries are keyed by their context and view alone
+    monkeypatch.setattr(render_cache, 'renderExtent', lambda settings: settings)
+    return GamepadRenderCache()
+
+def test_repaint_drops_only_the_layer_renders(cache):
+    (roads, rivers, dem) = (Layer('roads'), Layer('rivers'), Layer('dem'))
+    project = Project([roads, rivers])
+    cache.watch(project)
+    cache.insert(context('roads', 'rivers'), 'view', Image())
+    cache.insert(context('rivers'), 'view', Image())
+    cache.insert(context('rivers', theme='water'), 'view', Image())
+
+    roads.repaintRequested.emit(False)
+    assert cache.get(context('roads', 'rivers'), 'view') is None
+    assert cache.get(context('rivers'), 'view') is not None
+    assert cache.get(context('rivers', theme='water'), 'view') is not None
+    assert (len(cache), cache.memoryUsage()) == (2, 2048)
+
+    # layers added later are watched too
+    project.layersAdded.emit([dem])
+    cache.insert(context('dem', 'rivers'), 'view', Image())
+    dem.repaintRequested.emit(True)
+    assert cache.get(context('dem', 'rivers'), 'view') is None
+    assert len(cache) == 2
+
+def test_removed_and_unwatched_layers(cache):
+    (roads, rivers) = (Layer('roads'), Layer('rivers'))
+    project = Project([roads, rivers])
+    cache.watch(project)
+    cache.insert(context('roads'), 'view', Image())
+    cache.insert(context('rivers'), 'view', Image())
+
+    project.layersWillBeRemoved.emit(['roads'])
+    assert not roads.repaintRequested.slots
+    assert cache.get(context('roads'), 'view') is None
+
+    cache.unwatch()
+    assert not rivers.repaintRequested.slots
+    assert not project.layersAdded.slots and not project.layersWillBeRemoved.slots
+    assert cache.get(context('rivers'), 'view') is not None
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Response Curves tests
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import math
+
+import pytest
+
+pytest.importorskip('qgis.core')
+
+from GamepadNavigation import GamepadResponseCurves
+from GamepadNavigation.GamepadBridge import AXES
+from GamepadNavigation.GamepadResponseCurves import CONTROLS, LUT_SIZE, GamepadResponseCurve, GamepadResponseProfile
+
+MAGNITUDES = [index / 100 for index in range(101)] + [0.1000001, 0.333333, 0.987654, 1.5]
+
+# signed axis values, including inputs beyond the [-1, 1] range
+INPUTS = [
+    [0.0] * len(AXES),
+    [0.05, -0.05, 0.15, -0.15, 0.05, 0.15],
+    [0.08, 0.08, -0.3, 0.3, 0.2, 0.0],
+    [0.5, -0.75, 0.9, -0.21, 1.0, 0.5],
+    [1.0, 1.0, -1.0, -1.0, 1.0, 1.0],
+    [-1.2, 0.4, 0.86, 0.0, 0.0, 1.1],
+]
+
+def defaultProfile(mode: str, **definitions):
+    curves = {}
+    for (name, axes, default) in CONTROLS[mode]:
+        curves[name] = GamepadResponseCurve.fromDefinition(dict(default, **definitions.get(name, {})))
+    return GamepadResponseProfile(mode, curves)
+
+def baseline(magnitude: float, deadzone: float, exponent: float, maximum: float):
+    # the curve navigation used before response curves were configurable
+    return maximum * pow(min(magnitude, 1.0), exponent) if magnitude > deadzone else 0.0
+
+@pytest.mark.parametrize('mode', sorted(CONTROLS))
+def test_default_curves_match_baseline(mode):
+    for (name, axes, default) in CONTROLS[mode]:
+        curve = GamepadResponseCurve.fromDefinition(default)
+        for magnitude in MAGNITUDES:
+            expected = baseline(magnitude, default['deadzone'], default['exponent'], default['maximum'])
+            assert curve.value(magnitude) == pytest.approx(expected, abs=default['maximum'] * 1e-5), (name, magnitude)
+
+def test_rotate_deadzone():
+    rotate = dict((name, default) for (name, axes, default) in CONTROLS['2d'])['rotate']
+    assert rotate['deadzone'] <= 0.2
+
+def test_spline_curve():
+    curve = GamepadResponseCurve(0.1, maximum=2.0, spline=[[1, 1], [0, 0], [0.5, 0.1]])
+    # the lookup table smooths the spline's kinks over one table step
+    tolerance = 2.0 * 2 / (LUT_SIZE - 1)
+    assert curve.value(0.05) == 0.0
+    assert curve.value(0.25) == pytest.approx(2.0 * 0.05, abs=tolerance)
+    assert curve.value(0.5) == pytest.approx(2.0 * 0.1, abs=tolerance)
+    assert curve.value(0.75) == pytest.approx(2.0 * 0.55, abs=tolerance)
+    assert curve.value(1.0) == pytest.approx(2.0)
+
+def test_fallback_radial_deadzone(monkeypatch):
+    monkeypatch.setattr(GamepadResponseCurves, '_NUMPY_SUPPORT', False)
+    axial = defaultProfile('2d')
+    radial = defaultProfile('2d', pan={'shape': 'radial'})
+    values = [0.08, -0.08, 0.0, 0.0, 0.0, 0.0]
+    # each axis is within the deadzone, the stick as a whole is not
+    assert axial.map(values)[0:2] == [0.0, 0.0]
+    outputs = radial.map(values)
+    magnitude = math.hypot(0.08, 0.08)
+    assert math.hypot(outputs[0], outputs[1]) == pytest.approx(baseline(magnitude, 0.1, 3, 50), rel=1e-4)
+    assert outputs[0] == pytest.approx(-outputs[1])
+    assert outputs[0] > 0
+
+@pytest.mark.parametrize('mode', sorted(CONTROLS))
+@pytest.mark.parametrize('shape', ['axial', 'radial'])
+def test_numpy_matches_fallback(mode, shape, monkeypatch):
+    pytest.importorskip('numpy')
+    monkeypatch.setattr(GamepadResponseCurves, '_NUMPY_SUPPORT', True)
+    profile = defaultProfile(mode, **{name: {'shape': shape} for (name, axes, default) in CONTROLS[mode]})
+    vectorized = [profile.map(values) for values in INPUTS]
+    monkeypatch.setattr(GamepadResponseCurves, '_NUMPY_SUPPORT', False)
+    fallback = [profile.map(values) for values in INPUTS]
+    for (values, expected) in zip(vectorized, fallback):
+        assert values == pytest.approx(expected, abs=1e-9)
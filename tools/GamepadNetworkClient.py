@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Gamepad Network Client
+
+Command line stand-in for a remote controller, sending frames to the plugin's
+network input server. Needs neither QGIS nor a gamepad:
+
+    python3 tools/GamepadNetworkClient.py --set axisLeftX=0.5 --duration 2
+    python3 tools/GamepadNetworkClient.py --circle --duration 5
+    python3 tools/GamepadNetworkClient.py --press buttonA
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__author__ = '(C) 2023 by Mathieu Pellerin'
+__date__ = '11/02/2023'
+__copyright__ = 'Copyright 2023, Mathieu Pellerin'
+# This will get replaced with a git SHA1 when you do a git archive
+__revision__ = '$Format:%H$'
+
+import argparse
+import math
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from GamepadNavigation.GamepadNetworkProtocol import BUTTON_BITS, DEFAULT_PORT, FLAG_DISCONNECT, STICKS, TRIGGERS, packFrame
+
+# seconds between repeated frames while the state does not change, keeping the gamepad alive
+KEEP_ALIVE_INTERVAL = 0.5
+
+class GamepadNetworkClient:
+    """
+    Sends gamepad states to a network input server, numbering frames in sequence.
+    """
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, device: int = 0):
+        self.address = (host, port)
+        self.device = device
+        self.sequence = 0
+        self.values = {}
+        self.last_sent = 0.0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, values: dict = None, flags: int = 0):
+        if values is not None:
+            self.values = dict(values)
+        self.sequence += 1
+        self.last_sent = time.monotonic()
+        self.socket.sendto(packFrame(self.values, self.sequence, self.device, time.time() * 1000, flags), self.address)
+
+    def keepAlive(self):
+        if time.monotonic() - self.last_sent >= KEEP_ALIVE_INTERVAL:
+            self.send()
+
+    def close(self):
+        self.send({}, FLAG_DISCONNECT)
+        self.socket.close()
+
+def parseValue(text: str):
+    (name, _, value) = text.partition('=')
+    if name not in STICKS + TRIGGERS + BUTTON_BITS:
+        raise argparse.ArgumentTypeError('unknown gamepad value \'{}\''.format(name))
+    try:
+        return (name, float(value) if value else 1.0)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid value \'{}\''.format(value))
+
+def main():
+    parser = argparse.ArgumentParser(description='Sends gamepad frames to the Gamepad Navigation network input server.')
+    parser.add_argument('--host', default='127.0.0.1', help='server host (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='server port (default: {})'.format(DEFAULT_PORT))
+    parser.add_argument('--device', type=int, default=0, help='gamepad number within this client (default: 0)')
+    parser.add_argument('--rate', type=float, default=60.0, help='frames per second while the state changes (default: 60)')
+    parser.add_argument('--duration', type=float, default=1.0, help='seconds to hold the state for (default: 1)')
+    parser.add_argument('--set', dest='values', type=parseValue, action='append', default=[], metavar='NAME=VALUE',
+                        help='hold a value, e.g. axisLeftX=0.5 or buttonL1 (repeatable)')
+    parser.add_argument('--press', type=parseValue, action='append', default=[], metavar='BUTTON',
+                        help='press and release a button once the state is held (repeatable)')
+    parser.add_argument('--circle', action='store_true', help='turn the left stick in circles')
+    args = parser.parse_args()
+
+    client = GamepadNetworkClient(args.host, args.port, args.device)
+    values = dict(args.values)
+    interval = 1.0 / max(1.0, args.rate)
+    start = time.monotonic()
+    try:
+        client.send(values)
+        while time.monotonic() - start < args.duration:
+            if args.circle:
+                angle = (time.monotonic() - start) * math.pi
+                values.update(axisLeftX=math.cos(angle), axisLeftY=math.sin(angle))
+                client.send(values)
+            else:
+                client.keepAlive()
+            time.sleep(interval)
+
+        for (name, value) in args.press:
+            client.send(dict(values, **{name: value}))
+            time.sleep(0.1)
+            client.send(values)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()